@@ -1,9 +1,26 @@
-from fastapi import FastAPI, HTTPException
-import joblib
-import pandas as pd
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+import hmac
 import logging
 import os
+import threading
+import time
+
+import numpy as np
+
+from serving.batching import MicroBatcher, QueueFullError
+from serving.bundle import MODEL_ARTIFACTS, REGISTRY_PATH, SERVING_ARTIFACTS, ArtifactWatcher, load_bundle
+from serving.cache import PredictionCache
+from serving.drift import DriftMonitor
+from serving.features import (
+    InvalidInputError, build_feature_matrix, field_specs, rows_to_columns, validate_columns
+)
+from serving.metrics import CONTENT_TYPE, MetricsMiddleware, ServiceMetrics
+from serving.schemas import InputData
+from serving.sweep import run_sweep
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -11,90 +28,587 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(title="NPV Prediction API", version="1.0")
 
-# Загрузка модели и энкодера из DVC-версионированных файлов
+# Метрики Prometheus (/metrics): счётчики и гистограммы в памяти процесса
+metrics = ServiceMetrics()
+
+# Ограничения пакетного инференса
+MAX_BATCH_SIZE = int(os.getenv('NPV_MAX_BATCH_SIZE', '100000'))  # максимум строк в одном запросе
+BATCH_CHUNK_SIZE = int(os.getenv('NPV_BATCH_CHUNK_SIZE', '10000'))  # строк на один вызов model.predict
+EXPLAIN_MAX_BATCH_SIZE = int(os.getenv('NPV_EXPLAIN_MAX_BATCH_SIZE', '1000'))  # TreeSHAP в сотни раз дороже predict
+
+# Микробатчинг одиночных /predict (NPV_MICROBATCH=0 - отключить)
+MICROBATCH_ENABLED = os.getenv('NPV_MICROBATCH', '1') == '1'
+MICROBATCH_MAX_SIZE = int(os.getenv('NPV_MICROBATCH_MAX_SIZE', '64'))  # запросов в пакете
+MICROBATCH_MAX_WAIT_MS = float(os.getenv('NPV_MICROBATCH_MAX_WAIT_MS', '2'))  # ожидание добора пакета
+MICROBATCH_QUEUE_SIZE = int(os.getenv('NPV_MICROBATCH_QUEUE_SIZE', '1024'))  # глубина очереди, дальше 429
+
+# Кэш предсказаний (NPV_CACHE_SIZE=0 - отключить)
+CACHE_SIZE = int(os.getenv('NPV_CACHE_SIZE', '10000'))  # максимум записей
+CACHE_TTL_S = float(os.getenv('NPV_CACHE_TTL_S', '3600'))  # время жизни записи
+CACHE_PRECISION = os.getenv('NPV_CACHE_PRECISION')  # знаков после запятой для квантования ключа
+CACHE_PRECISION = int(CACHE_PRECISION) if CACHE_PRECISION else None
+
+# What-if сетки /sweep
+SWEEP_MAX_POINTS = int(os.getenv('NPV_SWEEP_MAX_POINTS', '2000000'))  # максимум точек сетки
+SWEEP_CHUNK_SIZE = int(os.getenv('NPV_SWEEP_CHUNK_SIZE', '65536'))  # точек на один вызов модели
+SWEEP_MAX_SURFACE_POINTS = int(os.getenv('NPV_SWEEP_MAX_SURFACE_POINTS', '10000'))  # поверхность в ответе
+
+# Интервал прогноза по квантильной модели, если она обучена (NPV_QUANTILES=0 - не считать)
+QUANTILES_ENABLED = os.getenv('NPV_QUANTILES', '1') == '1'
+
+# Быстрый путь без pandas (NPV_FAST_PATH=0 - отключить)
+FAST_PATH_ENABLED = os.getenv('NPV_FAST_PATH', '1') == '1'
+
+# Serving-бандл models/serving (NPV_SERVING_BUNDLE=0 - загружать joblib-артефакты).
+# Эталонному DataFrame-пути нужны энкодер и pandas, поэтому при NPV_FAST_PATH=0 бандл не используется
+SERVING_BUNDLE_ENABLED = os.getenv('NPV_SERVING_BUNDLE', '1') == '1' and FAST_PATH_ENABLED
+
+# Бэкенд инференса основной модели serving-бандла: xgboost | onnx | compiled (см. serving/backends.py).
+# Если выбранный бэкенд не экспортирован или расходится с xgboost, используется xgboost
+INFERENCE_BACKEND = os.getenv('NPV_BACKEND', 'xgboost')
+
+# Потоки XGBoost на процесс (0 - все ядра); при gunicorn задаётся из gunicorn.conf.py
+XGB_NTHREAD = int(os.getenv('NPV_XGB_NTHREAD', '0'))
+
+# Мониторинг дрейфа входных данных относительно профиля обучающей выборки (NPV_DRIFT=0 - отключить)
+DRIFT_ENABLED = os.getenv('NPV_DRIFT', '1') == '1'
+DRIFT_PROFILE_PATH = os.getenv('NPV_DRIFT_PROFILE', 'models/drift_profile.json')  # пишет src/preprocess.py
+DRIFT_RESERVOIR_SIZE = int(os.getenv('NPV_DRIFT_RESERVOIR', '2000'))  # строк в равномерной выборке трафика
+DRIFT_QUEUE_SIZE = int(os.getenv('NPV_DRIFT_QUEUE_SIZE', '10000'))  # запросов в очереди, дальше отбрасываются
+DRIFT_MIN_ROWS = int(os.getenv('NPV_DRIFT_MIN_ROWS', '100'))  # меньше строк - статус insufficient_data
+
+# Горячая перезагрузка модели (NPV_RELOAD_INTERVAL_S=0 - отключить наблюдение за файлами)
+RELOAD_INTERVAL_S = float(os.getenv('NPV_RELOAD_INTERVAL_S', '10'))
+ADMIN_TOKEN = os.getenv('NPV_ADMIN_TOKEN')  # требуется в заголовке X-Admin-Token; без него admin-эндпоинты выключены
+
+# Загрузка модели из DVC-версионированных файлов: serving-бандл или модель с энкодером.
+# Все артефакты живут в одном ModelBundle и подменяются только целиком.
 try:
-    model = joblib.load('models/model.joblib')
-    encoder = joblib.load('models/encoder.joblib')
-    feature_columns = joblib.load('models/feature_columns.joblib')
-    logger.info("Модель и энкодер успешно загружены")
+    bundle = load_bundle(prefer_serving=SERVING_BUNDLE_ENABLED, backend=INFERENCE_BACKEND)
+    logger.info(f"Модель успешно загружена ({bundle.source}), версия {bundle.version}")
 except Exception as e:
     logger.error(f"Ошибка загрузки модели: {e}")
     # Модель может быть не обучена - это нормально для разработки
-    model = None
-    encoder = None
-    feature_columns = None
-
-# Модель входных данных
-class InputData(BaseModel):
-    Heff: float = Field(..., ge=0, description="Эффективная толщина")
-    Perm: float = Field(..., ge=0, description="Проницаемость")
-    Sg: float = Field(..., ge=0, le=1, description="Газонасыщенность")
-    L_hor: float = Field(..., ge=0, description="Горизонтальная длина")
-    GS: str = Field(..., description="Тип ствола")
-    temp: float = Field(..., ge=0, description="Темп падения")
-    C5: float = Field(..., ge=0, description="Содержание C5")
-    GRP: int = Field(..., ge=0, description="ГРП")
-    nGS: int = Field(..., ge=0, description="Количество стволов")
+    bundle = None
+metrics.set_model_version(bundle.version if bundle is not None else None)
+
+batcher = None
+watcher = None
+drift_monitor = None
+metrics.registry.gauge_callback(
+    'npv_microbatch_queue_depth', 'Запросы в очереди микробатчера',
+    lambda: batcher.queue_depth if batcher is not None else None
+)
+metrics.registry.gauge_callback(
+    'npv_drift_rows_observed', 'Строк входа, учтённых монитором дрейфа',
+    lambda: drift_monitor.n_rows if drift_monitor is not None else None
+)
+metrics.registry.gauge_callback(
+    'npv_drift_rows_dropped', 'Запросов, отброшенных монитором дрейфа при заполненной очереди',
+    lambda: drift_monitor.dropped if drift_monitor is not None else None
+)
+reload_lock = threading.Lock()
+
+def reload_bundle():
+    """Загружает и прогревает новый набор артефактов вне пути запроса, затем атомарно подменяет текущий"""
+    global bundle
+    with reload_lock:
+        new_bundle = load_bundle(prefer_serving=SERVING_BUNDLE_ENABLED, backend=INFERENCE_BACKEND).prepare(
+            nthread=XGB_NTHREAD, fast_path=FAST_PATH_ENABLED
+        )
+        previous = bundle
+        bundle = new_bundle
+        if prediction_cache is not None:
+            prediction_cache.set_version(new_bundle.version)
+        metrics.set_model_version(new_bundle.version)
+    if previous is None or previous.version != new_bundle.version:
+        logger.info(f"Загружена модель версии {new_bundle.version}")
+    return new_bundle
+
+def predict_quantiles(current, matrix, endpoint):
+    """Квантили для матрицы признаков одним вызовом квантильного бустера: {"P10": массив, ...} или None"""
+    if current.quantiles is None or not QUANTILES_ENABLED:
+        return None
+    start = time.perf_counter()
+    columns = current.quantiles.columns(matrix)
+    metrics.observe_stage('quantiles', endpoint, current.version, time.perf_counter() - start)
+    return columns
+
+def interval_at(columns, i):
+    """Интервал одной строки: {"P10": ..., "P50": ..., "P90": ...}"""
+    if columns is None:
+        return None
+    return {label: round(float(values[i]), 2) for label, values in columns.items()}
+
+def predict_microbatch(items):
+    """
+    Считает пакет микробатчера; каждая строка считается тем набором, с которым она была принята.
+
+    Результат строки - (прогноз, интервал или None).
+    """
+    results = [None] * len(items)
+    groups = {}
+    for i, (item_bundle, _) in enumerate(items):
+        groups.setdefault(id(item_bundle), (item_bundle, []))[1].append(i)
+    for item_bundle, idx in groups.values():
+        plan, version = item_bundle.plan, item_bundle.version
+        start = time.perf_counter()
+        matrix = plan.fill_rows([items[i][1] for i in idx])
+        encoded = time.perf_counter()
+        predictions = plan.predict_matrix(matrix).tolist()
+        metrics.observe_stage('encode', '/predict', version, encoded - start)
+        metrics.observe_stage('predict', '/predict', version, time.perf_counter() - encoded)
+        metrics.batch_size.labels('microbatch', version).observe(len(idx))
+        quantiles = predict_quantiles(item_bundle, matrix, '/predict')
+        for j, (i, value) in enumerate(zip(idx, predictions)):
+            results[i] = (value, interval_at(quantiles, j))
+    return results
+
+def predict_single(current, input_dict):
+    """Одиночное предсказание без микробатчера: быстрый путь или DataFrame-путь; (прогноз, интервал)"""
+    version = current.version
+    plan = current.plan
+    if plan is None:
+        from serving.parity import predict_dataframe
+
+        result = predict_dataframe(
+            current.model, current.encoder, current.feature_columns, input_dict,
+            observe=lambda stage, seconds: metrics.observe_stage(stage, '/predict', version, seconds)
+        )
+        if current.quantiles is None or not QUANTILES_ENABLED:
+            return result, None
+        matrix = current.feature_plan().fill_rows([input_dict])
+        return result, interval_at(predict_quantiles(current, matrix, '/predict'), 0)
+    start = time.perf_counter()
+    buf = plan.fill(input_dict)
+    encoded = time.perf_counter()
+    result = float(plan.predict_matrix(buf)[0])
+    metrics.observe_stage('encode', '/predict', version, encoded - start)
+    metrics.observe_stage('predict', '/predict', version, time.perf_counter() - encoded)
+    return result, interval_at(predict_quantiles(current, buf, '/predict'), 0)
+
+def explain_single(current, input_dict):
+    """Предсказание с вкладами полей (TreeSHAP); GS_* колонки свёрнуты в поле GS"""
+    version = current.version
+    plan = current.feature_plan()
+    start = time.perf_counter()
+    matrix = plan.fill_rows([input_dict])
+    encoded = time.perf_counter()
+    result = float(plan.predict_matrix(matrix)[0])
+    names, contributions = plan.contributions(matrix)
+    metrics.observe_stage('encode', '/predict', version, encoded - start)
+    metrics.observe_stage('explain', '/predict', version, time.perf_counter() - encoded)
+    return result, dict(zip(names, contributions[0].tolist()))
+
+# Инициализация выполняется в каждом процессе-воркере уже после fork:
+# в master (gunicorn --preload) модель только загружается и не запускает потоки OpenMP
+@app.on_event("startup")
+async def init_serving():
+    global batcher, watcher, drift_monitor
+
+    if bundle is not None:
+        bundle.prepare(nthread=XGB_NTHREAD, fast_path=FAST_PATH_ENABLED)
+        logger.info(f"Быстрый путь инференса: {'включён' if bundle.plan is not None else 'выключен'}, "
+                    f"бэкенд {bundle.backend}")
+
+    if FAST_PATH_ENABLED and MICROBATCH_ENABLED:
+        batcher = MicroBatcher(
+            predict_microbatch,
+            max_batch_size=MICROBATCH_MAX_SIZE,
+            max_wait_ms=MICROBATCH_MAX_WAIT_MS,
+            max_queue_size=MICROBATCH_QUEUE_SIZE
+        )
+        batcher.start()
+        logger.info(f"Микробатчинг включён: до {MICROBATCH_MAX_SIZE} запросов / {MICROBATCH_MAX_WAIT_MS} мс")
+
+    if RELOAD_INTERVAL_S > 0:
+        watcher = ArtifactWatcher(
+            MODEL_ARTIFACTS + SERVING_ARTIFACTS + [REGISTRY_PATH], reload_bundle, interval=RELOAD_INTERVAL_S
+        )
+        watcher.start()
+
+    if DRIFT_ENABLED:
+        try:
+            drift_monitor = DriftMonitor.from_file(
+                DRIFT_PROFILE_PATH,
+                reservoir_size=DRIFT_RESERVOIR_SIZE,
+                queue_size=DRIFT_QUEUE_SIZE,
+                min_rows=DRIFT_MIN_ROWS
+            )
+            drift_monitor.start()
+            logger.info(f"Мониторинг дрейфа включён: профиль {DRIFT_PROFILE_PATH}")
+        except Exception as e:
+            logger.warning(f"Мониторинг дрейфа выключен: {e}")
+
+@app.on_event("shutdown")
+async def stop_serving():
+    if watcher is not None:
+        watcher.stop()
+    if drift_monitor is not None:
+        drift_monitor.stop()
+    if batcher is not None:
+        await batcher.stop()
+
+INPUT_SPECS = field_specs(InputData)
+
+prediction_cache = None
+if CACHE_SIZE > 0:
+    prediction_cache = PredictionCache(
+        max_size=CACHE_SIZE,
+        ttl_seconds=CACHE_TTL_S,
+        precision=CACHE_PRECISION,
+        fields=InputData.model_fields
+    )
+    prediction_cache.set_version(bundle.version if bundle is not None else None)
+
+# Пакет скважин: списком объектов или в колоночном виде
+class BatchInput(BaseModel):
+    wells: Optional[List[Dict[str, Any]]] = Field(None, description="Список скважин в формате InputData")
+    columns: Optional[Dict[str, List[Any]]] = Field(None, description="Колонки: {поле: [значения]}")
 
 @app.get("/")
 async def root():
-    return {"message": "NPV Prediction API", "status": "active", "model_loaded": model is not None}
+    return {"message": "NPV Prediction API", "status": "active", "model_loaded": bundle is not None}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "model_loaded": model is not None}
+    return {"status": "healthy", "model_loaded": bundle is not None}
+
+def prediction_response(value, interval):
+    response = {"predicted_NPV": round(value, 2), "status": "success"}
+    if interval is not None:
+        response["interval"] = interval
+    return response
 
 @app.post("/predict")
-async def predict(data: InputData):
-    if model is None:
+async def predict(data: InputData, explain: bool = False):
+    current = bundle
+    if current is None:
         raise HTTPException(status_code=503, detail="Модель не загружена. Запустите пайплайн обучения.")
     
     try:
+        start = time.perf_counter()
         input_dict = data.dict()
-        
-        # Создаем DataFrame с правильным порядком изначально
-        numeric_data = {k: v for k, v in input_dict.items() if k != 'GS'}
-        
-        # Кодируем GS
-        gs_encoded = encoder.transform([[input_dict['GS']]])
-        gs_columns = encoder.get_feature_names_out(['GS'])
-        gs_data = dict(zip(gs_columns, gs_encoded[0]))
-        
-        # Объединяем данные
-        all_data = {**numeric_data, **gs_data}
-        
-        # Создаем DataFrame с правильным порядком
-        input_processed = pd.DataFrame([all_data])[feature_columns]
-        
-        # Предсказание
-        prediction = model.predict(input_processed)
-        result = float(prediction[0])
-        
-        return {"predicted_NPV": round(result, 2), "status": "success"}
-        
+        if drift_monitor is not None:
+            # Только постановка в очередь: скетчи обновляет фоновый поток
+            drift_monitor.observe(input_dict)
+
+        if explain:
+            # Вклады не кэшируются и не проходят через микробатчер: считаются отдельным вызовом TreeSHAP
+            if current.plan is not None:
+                current.plan.check(input_dict)
+            metrics.observe_stage('validate', '/predict', current.version, time.perf_counter() - start)
+            result, contributions = await run_in_threadpool(explain_single, current, input_dict)
+            bias = contributions.pop('bias')
+            return {
+                "predicted_NPV": round(result, 2),
+                "base_value": round(bias, 2),
+                "contributions": {name: round(value, 2) for name, value in contributions.items()},
+                "status": "success"
+            }
+
+        cache_key = None
+        if prediction_cache is not None:
+            cache_key = prediction_cache.key(input_dict)
+            cached = prediction_cache.get(cache_key)
+            if cached is not None:
+                return prediction_response(*cached)
+            if prediction_cache.precision is not None:
+                # Считаем в квантованной точке, чтобы значение в кэше не зависело от первого запроса
+                input_dict = dict(zip(prediction_cache.fields, cache_key))
+
+        # Модель считается вне event loop: пакетом через микробатчер или в пуле потоков
+        plan = current.plan
+        if plan is not None:
+            plan.check(input_dict)
+        metrics.observe_stage('validate', '/predict', current.version, time.perf_counter() - start)
+        if batcher is not None and plan is not None:
+            result = await batcher.submit((current, input_dict))
+        else:
+            result = await run_in_threadpool(predict_single, current, input_dict)
+
+        if cache_key is not None:
+            prediction_cache.put(cache_key, result, version=current.version)
+
+        return prediction_response(*result)
+
+    except InvalidInputError as e:
+        # Ошибка во входе клиента (неизвестная категория GS), как построчные ошибки /predict_batch
+        raise HTTPException(status_code=422, detail=str(e))
+    except QueueFullError:
+        raise HTTPException(status_code=429, detail="Сервис перегружен, повторите запрос позже")
     except Exception as e:
         logger.error(f"Ошибка предсказания: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Ошибка предсказания: {str(e)}")
 
+def score_columns(current, columns, n_rows, explain=False):
+    """
+    Валидирует колонки пакета и считает валидные строки чанками по BATCH_CHUNK_SIZE.
+
+    Квантили (если есть квантильная модель) и, при explain=True, вклады полей
+    возвращаются в колоночном виде (None для невалидных строк).
+    """
+    plan, version = current.plan, current.version
+    start = time.perf_counter()
+    arrays, errors = validate_columns(columns, INPUT_SPECS, current.categories, n_rows)
+    predictions = [None] * n_rows
+    metrics.observe_stage('validate', '/predict_batch', version, time.perf_counter() - start)
+    contributions = None
+    if explain:
+        plan = current.feature_plan()
+        names, _ = plan.contribution_groups()
+        contributions = {name: [None] * n_rows for name in names}
+    quantiles = None
+    if current.quantiles is not None and QUANTILES_ENABLED:
+        quantiles = {label: [None] * n_rows for label in current.quantiles.labels}
+
+    valid_idx = [i for i in range(n_rows) if i not in errors]
+    for offset in range(0, len(valid_idx), BATCH_CHUNK_SIZE):
+        chunk = valid_idx[offset:offset + BATCH_CHUNK_SIZE]
+        start = time.perf_counter()
+        chunk_arrays = {name: arr[chunk] for name, arr in arrays.items()}
+        if plan is not None:
+            features = plan.fill_columns(chunk_arrays)
+            encoded = time.perf_counter()
+            chunk_pred = plan.predict_matrix(features)
+        else:
+            features = build_feature_matrix(chunk_arrays, current.encoder, current.feature_columns)
+            encoded = time.perf_counter()
+            chunk_pred = current.model.predict(features)
+        metrics.observe_stage('encode', '/predict_batch', version, encoded - start)
+        metrics.observe_stage('predict', '/predict_batch', version, time.perf_counter() - encoded)
+        metrics.batch_size.labels('predict_batch', version).observe(len(chunk))
+        for i, value in zip(chunk, chunk_pred.tolist()):
+            predictions[i] = round(value, 2)
+
+        if quantiles is not None:
+            for label, values in predict_quantiles(current, features, '/predict_batch').items():
+                column = quantiles[label]
+                for i, value in zip(chunk, np.round(values.astype(np.float64), 2).tolist()):
+                    column[i] = value
+
+        if contributions is not None:
+            start = time.perf_counter()
+            names, chunk_contrib = plan.contributions(features)
+            metrics.observe_stage('explain', '/predict_batch', version, time.perf_counter() - start)
+            for name, values in zip(names, np.round(chunk_contrib, 2).T.tolist()):
+                column = contributions[name]
+                for i, value in zip(chunk, values):
+                    column[i] = value
+
+    result = {
+        "predicted_NPV": predictions,
+        "errors": [{"index": i, "errors": errors[i]} for i in sorted(errors)],
+        "n_rows": n_rows,
+        "n_valid": len(valid_idx),
+        "status": "success" if not errors else "partial"
+    }
+    if quantiles is not None:
+        result["quantiles"] = quantiles
+    if contributions is not None:
+        result["base_value"] = contributions.pop('bias')
+        result["contributions"] = contributions
+    return result
+
+@app.post("/predict_batch")
+async def predict_batch(batch: BatchInput, explain: bool = False):
+    current = bundle
+    if current is None:
+        raise HTTPException(status_code=503, detail="Модель не загружена. Запустите пайплайн обучения.")
+    if (batch.wells is None) == (batch.columns is None):
+        raise HTTPException(status_code=422, detail="Передайте ровно одно из полей: wells или columns")
+
+    if batch.wells is not None:
+        n_rows = len(batch.wells)
+        columns = rows_to_columns(batch.wells, INPUT_SPECS)
+    else:
+        lengths = {len(values) for values in batch.columns.values()}
+        if len(lengths) > 1:
+            raise HTTPException(status_code=422, detail="Колонки должны быть одинаковой длины")
+        n_rows = lengths.pop() if lengths else 0
+        columns = batch.columns
+
+    if n_rows > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Размер пакета {n_rows} превышает лимит {MAX_BATCH_SIZE}"
+        )
+    if explain and n_rows > EXPLAIN_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Размер пакета {n_rows} превышает лимит explain-режима {EXPLAIN_MAX_BATCH_SIZE}"
+        )
+
+    if drift_monitor is not None:
+        # До валидации: строки с неизвестными категориями тоже учитываются
+        drift_monitor.observe_columns(columns, n_rows)
+
+    try:
+        # Валидация и расчёт пакета выполняются в пуле потоков, чтобы не блокировать event loop
+        return await run_in_threadpool(score_columns, current, columns, n_rows, explain)
+    except Exception as e:
+        logger.error(f"Ошибка пакетного предсказания: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ошибка пакетного предсказания: {str(e)}")
+
+# What-if сетка: базовая скважина и оси {параметр: значения или диапазон}
+class SweepInput(BaseModel):
+    base: InputData
+    axes: Dict[str, Any] = Field(
+        ..., description='{"L_hor": {"start": 300, "stop": 1500, "num": 50}, "GRP": [0, 2, 4], "GS": {"values": [...]}}'
+    )
+    include_surface: bool = Field(True, description="Вернуть всю поверхность NPV (если точек не больше лимита)")
+
+def score_sweep(current, request):
+    """Считает what-if сетку текущим набором артефактов"""
+    plan = current.feature_plan()
+    version = current.version
+
+    def on_chunk(n_rows, seconds):
+        metrics.observe_stage('predict', '/sweep', version, seconds)
+        metrics.batch_size.labels('sweep', version).observe(n_rows)
+
+    return run_sweep(
+        plan, request.base.dict(), request.axes, INPUT_SPECS,
+        chunk_size=SWEEP_CHUNK_SIZE,
+        max_points=SWEEP_MAX_POINTS,
+        include_surface=request.include_surface,
+        max_surface_points=SWEEP_MAX_SURFACE_POINTS,
+        on_chunk=on_chunk
+    )
+
+@app.post("/sweep")
+async def sweep(request: SweepInput):
+    current = bundle
+    if current is None:
+        raise HTTPException(status_code=503, detail="Модель не загружена. Запустите пайплайн обучения.")
+    try:
+        # Сетка считается чанками в пуле потоков, чтобы не блокировать event loop
+        result = await run_in_threadpool(score_sweep, current, request)
+    except OverflowError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Ошибка расчёта сетки: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ошибка расчёта сетки: {str(e)}")
+    return {**result, "status": "success"}
+
+@app.get("/explain/global")
+async def explain_global():
+    """Глобальная важность полей (средний |вклад| TreeSHAP), один расчёт на версию модели"""
+    current = bundle
+    if current is None:
+        raise HTTPException(status_code=503, detail="Модель не загружена. Запустите пайплайн обучения.")
+    try:
+        return await run_in_threadpool(current.global_importance)
+    except Exception as e:
+        logger.error(f"Ошибка расчёта важности признаков: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ошибка расчёта важности признаков: {str(e)}")
+
+@app.get("/cache_stats")
+async def cache_stats():
+    """Статистика кэша предсказаний"""
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats()}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Метрики в текстовом формате Prometheus"""
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get("/drift")
+async def drift():
+    """Дрейф входных данных: PSI/KS по каждому полю против профиля обучающей выборки"""
+    if drift_monitor is None:
+        return {"enabled": False}
+    try:
+        report = await run_in_threadpool(drift_monitor.report)
+    except Exception as e:
+        logger.error(f"Ошибка расчёта дрейфа: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ошибка расчёта дрейфа: {str(e)}")
+    return {"enabled": True, **report}
+
+@app.get("/drift/sample")
+async def drift_sample():
+    """Равномерная выборка строк трафика, по которой считается KS"""
+    if drift_monitor is None:
+        return {"enabled": False, "rows": []}
+    return {"enabled": True, "rows": await run_in_threadpool(drift_monitor.sample)}
+
 @app.get("/model_info")
 async def model_info():
     """Информация о загруженной модели"""
     try:
+        model = bundle.model if bundle is not None else None
         features = []
         if hasattr(model, 'feature_names_in_'):
             features = model.feature_names_in_.tolist()
         elif hasattr(model, 'get_booster'):
             features = model.get_booster().feature_names
+        elif bundle is not None:
+            features = list(bundle.feature_columns)
+        model_type = "Booster (UBJSON)" if bundle is not None and bundle.source == 'serving' else type(model).__name__
         
         return {
-            "model_type": type(model).__name__,
+            "model_type": model_type,
             "n_features": len(features),
-            "features": features
+            "features": features,
+            "categories": [str(c) for c in bundle.categories] if bundle is not None else [],
+            "version": bundle.version if bundle is not None else None
         }
     except Exception as e:
         return {"error": str(e)}
 
 
+def check_admin_token(token):
+    """Admin-эндпоинты закрыты по умолчанию: без NPV_ADMIN_TOKEN - 404, с неверным токеном - 403"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin-эндпоинты выключены: задайте NPV_ADMIN_TOKEN")
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Неверный X-Admin-Token")
+
+@app.get("/admin/model_version")
+async def model_version(x_admin_token: Optional[str] = Header(None)):
+    """Версия загруженного набора артефактов"""
+    check_admin_token(x_admin_token)
+    if bundle is None:
+        return {"model_loaded": False}
+    return {"model_loaded": True, **bundle.describe()}
+
+@app.post("/admin/drift/reset")
+async def reset_drift(x_admin_token: Optional[str] = Header(None)):
+    """Обнуляет скетчи дрейфа (например, после переобучения на свежих данных)"""
+    check_admin_token(x_admin_token)
+    if drift_monitor is None:
+        return {"enabled": False}
+    drift_monitor.reset()
+    return {"enabled": True, "status": "reset"}
+
+@app.post("/admin/reload")
+async def reload_model(x_admin_token: Optional[str] = Header(None)):
+    """Перезагрузка модели без рестарта: новая версия подменяет текущую после прогрева"""
+    check_admin_token(x_admin_token)
+    previous = bundle.version if bundle is not None else None
+    try:
+        new_bundle = await run_in_threadpool(reload_bundle)
+    except Exception as e:
+        logger.error(f"Ошибка перезагрузки модели: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка перезагрузки модели: {str(e)}")
+    if watcher is not None:
+        watcher.mark_current()
+    return {"status": "reloaded", "previous_version": previous, **new_bundle.describe()}
+
+
+# Подключается после объявления маршрутов: метки endpoint ограничены известными путями
+app.add_middleware(
+    MetricsMiddleware,
+    metrics=metrics,
+    endpoints=[route.path for route in app.routes],
+    version=lambda: bundle.version if bundle is not None else None
+)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""
+Нагрузочный тест FastAPI-приложения в том же процессе, без сети:
+запросы идут через httpx.ASGITransport напрямую в app.
+
+    python -m benchmarks.asgi_load --concurrency 1 8 32 128 --requests 2000
+
+Для каждого уровня конкурентности отправляется --requests уникальных /predict
+(кэш предсказаний отключён), не более --concurrency одновременно.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+from benchmarks.common import random_wells, summarize
+
+DEFAULT_CONCURRENCY = [1, 8, 32, 128]
+
+
+async def run_level(client, payloads, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def call(payload):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/predict", json=payload)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code != 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(payload) for payload in payloads))
+    elapsed = time.perf_counter() - start
+    return {"requests": len(payloads), "errors": errors, "throughput_rps": len(payloads) / elapsed,
+            **summarize(latencies)}
+
+
+async def run_async(levels, n_requests):
+    # Настройки читаются app при импорте: кэш и наблюдение за файлами не участвуют в замере
+    os.environ.setdefault('NPV_CACHE_SIZE', '0')
+    os.environ.setdefault('NPV_RELOAD_INTERVAL_S', '0')
+    from app import app, init_serving, stop_serving
+
+    await init_serving()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            await run_level(client, random_wells(200, seed=0), max(levels))  # прогрев
+            results = {}
+            for i, concurrency in enumerate(levels):
+                payloads = random_wells(n_requests, seed=i + 1)
+                results[str(concurrency)] = await run_level(client, payloads, concurrency)
+        return results
+    finally:
+        await stop_serving()
+
+
+def run(levels=DEFAULT_CONCURRENCY, n_requests=2000):
+    return asyncio.run(run_async(levels, n_requests))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    results = run(args.concurrency, args.requests)
+    for concurrency, r in results.items():
+        print(f"concurrency={concurrency:>4}  {r['throughput_rps']:8.1f} req/s  "
+              f"p50={r['p50_ms']:.2f} мс  p99={r['p99_ms']:.2f} мс  ошибок: {r['errors']}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Общие функции бенчмарков: замеры времени, синтетические скважины, работа с отчётом."""
+import json
+import platform
+import random
+import time
+from datetime import datetime
+
+GS_TYPES = ["S-TYPE", "U-TYPE", "VGS", "GS", "NGS"]
+
+
+def random_well(rng):
+    return {
+        "Heff": rng.uniform(5, 30), "Perm": rng.uniform(0.1, 300), "Sg": rng.uniform(0.4, 0.9),
+        "L_hor": rng.uniform(300, 1500), "GS": rng.choice(GS_TYPES), "temp": rng.uniform(5, 40),
+        "C5": rng.uniform(0, 300), "GRP": rng.randint(0, 10), "nGS": rng.randint(1, 5)
+    }
+
+
+def random_wells(n, seed=42, categories=GS_TYPES):
+    rng = random.Random(seed)
+    wells = [random_well(rng) for _ in range(n)]
+    for well in wells:
+        if well["GS"] not in categories:
+            well["GS"] = categories[0]
+    return wells
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def summarize(latencies):
+    """p50/p99/среднее в миллисекундах по списку длительностей в секундах"""
+    latencies = sorted(latencies)
+    return {
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+    }
+
+
+def measure(fn, repeat=200, warmup=10):
+    """Многократный вызов fn() с прогревом"""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def environment():
+    return {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def flatten(report, prefix=''):
+    """{"a": {"b": 1}} -> {"a.b": 1}; берутся только числовые значения"""
+    flat = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+# Направление метрики по суффиксу имени: время и память - меньше лучше, пропускная способность - больше
+LOWER_IS_BETTER = ('_ms', '_s', '_mb')
+HIGHER_IS_BETTER = ('_rps', 'rows_per_s')
+# Хвостовые перцентили на коротких прогонах слишком шумные для порога регрессии
+NOT_COMPARED = ('p99_ms',)
+
+
+def compare(current, baseline, threshold=0.1):
+    """
+    Сравнивает отчёт с базовым.
+
+    Возвращает список строк {metric, baseline, current, change}; change - относительное
+    ухудшение (> threshold - регрессия, отрицательное значение - улучшение).
+    """
+    current, baseline = flatten(current), flatten(baseline)
+    rows = []
+    for metric, base in sorted(baseline.items()):
+        if metric not in current or not base or metric.endswith(NOT_COMPARED):
+            continue
+        value = current[metric]
+        if metric.endswith(HIGHER_IS_BETTER):
+            change = (base - value) / base
+        elif metric.endswith(LOWER_IS_BETTER):
+            change = (value - base) / base
+        else:
+            continue
+        rows.append({
+            "metric": metric, "baseline": base, "current": value,
+            "change": change, "regression": change > threshold
+        })
+    return rows
+
+
+def load_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_json(data, path):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
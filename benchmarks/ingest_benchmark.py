@@ -0,0 +1,66 @@
+"""
+Сравнение загрузки исходных данных: XLSX (pd.read_excel) против columnar-копии
+(pd.read_parquet), собранной стадией ingest.
+
+    python benchmarks/ingest_benchmark.py --repeat 3
+
+Каждая загрузка выполняется в отдельном процессе: время - по wall clock,
+пиковая память - прирост ru_maxrss относительно процесса после импорта pandas.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+import yaml
+
+LOADER = """
+import json, resource, time
+import pandas as pd
+import pyarrow.parquet
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+df = pd.{reader}({path!r})
+elapsed = time.perf_counter() - start
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": elapsed, "peak_mb": (after - before) / 1024, "rows": len(df),
+                   "memory_mb": df.memory_usage(deep=True).sum() / 2**20}}))
+"""
+
+
+def measure(reader, path, repeat):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', LOADER.format(reader=reader, path=path)],
+            capture_output=True, text=True, check=True
+        )
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    best = min(runs, key=lambda r: r['seconds'])
+    return {**best, "peak_mb": max(r['peak_mb'] for r in runs)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with open("params.yaml", "r") as f:
+        params = yaml.safe_load(f)
+
+    results = {
+        "xlsx": measure('read_excel', params['data']['raw_path'], args.repeat),
+        "parquet": measure('read_parquet', params['data']['ingested_path'], args.repeat),
+    }
+    results["speedup"] = results["xlsx"]["seconds"] / results["parquet"]["seconds"]
+
+    for name in ("xlsx", "parquet"):
+        r = results[name]
+        print(f"{name:>8}: {r['seconds'] * 1000:8.1f} мс, пик +{r['peak_mb']:.1f} МБ, "
+              f"DataFrame {r['memory_mb']:.2f} МБ, строк {r['rows']}")
+    print(f"Ускорение загрузки: x{results['speedup']:.1f}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Нагрузочный тест многопроцессного запуска API: пропускная способность /predict
+в зависимости от числа воркеров gunicorn.
+
+    python -m benchmarks.load_test --workers 1 2 4 --requests 2000 --concurrency 32
+
+Для каждого числа воркеров поднимается gunicorn с gunicorn.conf.py,
+после прогрева отправляется --requests запросов в --concurrency потоков.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from npv_client import NPVAPIError, NPVClient
+
+GS_TYPES = ["S-TYPE", "U-TYPE", "VGS", "GS", "NGS"]
+
+
+def random_well(rng):
+    return {
+        "Heff": rng.uniform(5, 30), "Perm": rng.uniform(0.1, 300), "Sg": rng.uniform(0.4, 0.9),
+        "L_hor": rng.uniform(300, 1500), "GS": rng.choice(GS_TYPES), "temp": rng.uniform(5, 40),
+        "C5": rng.uniform(0, 300), "GRP": rng.randint(0, 10), "nGS": rng.randint(1, 5)
+    }
+
+
+def wait_ready(url, timeout=120):
+    deadline = time.time() + timeout
+    with NPVClient(url, timeout=1) as client:
+        while time.time() < deadline:
+            if client.health():
+                return
+            time.sleep(0.5)
+    raise RuntimeError(f"API {url} не поднялся за {timeout} с")
+
+
+def run_load(url, n_requests, concurrency, seed=42):
+    rng = random.Random(seed)
+    # Уникальные скважины, чтобы не мерить кэш предсказаний
+    payloads = [random_well(rng) for _ in range(n_requests)]
+    latencies = []
+    errors = 0
+    # Повторы при 429 выключены: перегрузка должна попасть в число ошибок
+    client = NPVClient(url, timeout=30, max_concurrency=concurrency, retries=0)
+
+    def call(payload):
+        start = time.perf_counter()
+        try:
+            client.predict(payload)
+            ok = True
+        except NPVAPIError:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with client, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for ok, latency in pool.map(call, payloads):
+            latencies.append(latency)
+            errors += not ok
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": n_requests,
+        "errors": errors,
+        "throughput_rps": n_requests / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--port', type=int, default=8011)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}"
+    results = []
+    for n_workers in args.workers:
+        env = dict(os.environ, NPV_WORKERS=str(n_workers), NPV_BIND=f"127.0.0.1:{args.port}", NPV_CACHE_SIZE="0")
+        env.pop('NPV_XGB_NTHREAD', None)
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'app:app', '-c', 'gunicorn.conf.py'],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_ready(url)
+            run_load(url, min(200, args.requests), args.concurrency, seed=0)  # прогрев
+            result = {"workers": n_workers, **run_load(url, args.requests, args.concurrency)}
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        results.append(result)
+        print(f"workers={n_workers:>2}  {result['throughput_rps']:8.1f} req/s  "
+              f"p50={result['p50_ms']:.1f} мс  p99={result['p99_ms']:.1f} мс  ошибок: {result['errors']}")
+
+    base = results[0]['throughput_rps']
+    for result in results:
+        result['speedup'] = result['throughput_rps'] / base
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Микробенчмарки инференса: одиночная строка (подготовка признаков + predict),
+пакетный predict при разных размерах пакета, what-if сетка, накладные расходы
+explain-режима (TreeSHAP), бэкенды инференса serving-бандла (xgboost / onnx / compiled),
+монитор дрейфа (постановка строки в очередь и обновление скетчей) и загрузка артефактов (models/*.joblib, ModelBundle, serving-бандл).
+
+    python -m benchmarks.micro --batch-sizes 1 10 100 1000 10000
+
+Запуск из корня репозитория после dvc repro.
+"""
+import argparse
+import glob
+import json
+import os
+
+import joblib
+
+from benchmarks.common import measure, random_wells
+from serving.backends import BACKENDS
+from serving.bundle import SERVING_BUNDLE_SPEC, ModelBundle
+from serving.drift import DriftMonitor
+from serving.features import build_feature_matrix, field_specs, rows_to_columns, validate_columns
+from serving.parity import predict_dataframe
+from serving.sweep import run_sweep
+
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1000, 10000]
+DEFAULT_EXPLAIN_SIZES = [1, 10, 100]
+DRIFT_PROFILE = 'models/drift_profile.json'
+
+
+def bench_artifacts(repeat):
+    """Время joblib.load каждого артефакта и полной загрузки ModelBundle"""
+    results = {}
+    for path in sorted(glob.glob('models/*.joblib')):
+        results[path] = measure(lambda: joblib.load(path), repeat=repeat, warmup=1)
+    results['bundle'] = measure(lambda: ModelBundle.load().prepare(), repeat=repeat, warmup=1)
+    if os.path.exists(SERVING_BUNDLE_SPEC):
+        results['serving_bundle'] = measure(lambda: ModelBundle.load_serving().prepare(), repeat=repeat, warmup=1)
+    return results
+
+
+def bench_single(bundle, repeat):
+    """Одиночная скважина: быстрый путь (по этапам) и эталонный DataFrame-путь"""
+    wells = random_wells(repeat, categories=list(bundle.plan.category_slots))
+    plan = bundle.plan
+    it = iter(wells * 2)
+    buf = plan.fill(wells[0])
+    return {
+        "fast_path": measure(lambda: plan.predict_one(next(it)), repeat=repeat),
+        "fast_path_encode": measure(lambda: plan.fill(wells[0]), repeat=repeat),
+        "fast_path_predict": measure(lambda: plan.predict_matrix(buf), repeat=repeat),
+        "dataframe_path": measure(
+            lambda: predict_dataframe(bundle.model, bundle.encoder, bundle.feature_columns, wells[0]),
+            repeat=repeat
+        ),
+    }
+
+
+def bench_batch(bundle, batch_sizes, specs, repeat, encoder_baseline=False):
+    """
+    Путь /predict_batch, как в API: валидация колонок, plan.fill_columns, plan.predict_matrix
+    (inplace_predict). encoder_baseline=True - прежний путь (OneHotEncoder + model.predict) для сравнения.
+    """
+    plan = bundle.plan
+    categories = list(plan.categories)
+    results = {}
+    for size in batch_sizes:
+        columns = rows_to_columns(random_wells(size, categories=categories), specs)
+
+        def run():
+            arrays, _ = validate_columns(columns, specs, categories, size)
+            if encoder_baseline:
+                bundle.model.predict(build_feature_matrix(arrays, bundle.encoder, bundle.feature_columns))
+            else:
+                plan.predict_matrix(plan.fill_columns(arrays))
+
+        stats = measure(run, repeat=max(3, repeat // max(1, size // 100)), warmup=2)
+        stats["rows_per_s"] = size / (stats["p50_ms"] / 1000)
+        results[str(size)] = stats
+    return results
+
+
+def bench_sweep(bundle, n_points, repeat=3):
+    """What-if сетка из n_points точек по двум осям (serving.sweep)"""
+    side = int(round(n_points ** 0.5))
+    base = random_wells(1, categories=bundle.plan.categories)[0]
+    axes = {"L_hor": {"start": 300, "stop": 1500, "num": side}, "Perm": {"start": 0.1, "stop": 300, "num": side}}
+    stats = measure(
+        lambda: run_sweep(bundle.plan, base, axes, input_specs(), include_surface=False), repeat=repeat, warmup=1
+    )
+    stats["rows_per_s"] = side * side / (stats["p50_ms"] / 1000)
+    return {str(side * side): stats}
+
+
+def bench_explain(bundle, sizes, repeat=3):
+    """Вклады полей (plan.contributions) против обычного predict на тех же матрицах"""
+    plan = bundle.plan
+    results = {}
+    for size in sizes:
+        matrix = plan.fill_rows(random_wells(size, categories=plan.categories))
+        predict = measure(lambda: plan.predict_matrix(matrix), repeat=repeat * 10, warmup=2)
+        explain = measure(lambda: plan.contributions(matrix), repeat=repeat, warmup=1)
+        results[str(size)] = {
+            "predict_p50_ms": predict["p50_ms"],
+            "explain_p50_ms": explain["p50_ms"],
+            "explain_rows_per_s": size / (explain["p50_ms"] / 1000),
+            "overhead_x": explain["p50_ms"] / predict["p50_ms"],
+        }
+    return results
+
+
+def bench_backends(batch_sizes, repeat):
+    """
+    Бэкенды serving-бандла: одиночная строка (plan.predict_one) и пакет (plan.predict_matrix).
+    Берутся только бэкенды, которые экспортированы и загрузились (иначе load_serving откатывается на xgboost).
+    """
+    with open(SERVING_BUNDLE_SPEC, 'r') as f:
+        exported = json.load(f).get('backends', {})
+    results = {}
+    for name in BACKENDS:
+        if name != 'xgboost' and name not in exported:
+            continue
+        bundle = ModelBundle.load_serving(backend=name).prepare()
+        if bundle.backend != name:
+            continue
+        plan = bundle.plan
+        wells = random_wells(repeat, categories=plan.categories)
+        it = iter(wells * 2)
+        result = {"single_row": measure(lambda: plan.predict_one(next(it)), repeat=repeat)}
+        for size in batch_sizes:
+            matrix = plan.fill_rows(random_wells(size, categories=plan.categories))
+            stats = measure(lambda: plan.predict_matrix(matrix), repeat=max(3, repeat // max(1, size // 100)),
+                            warmup=2)
+            stats["rows_per_s"] = size / (stats["p50_ms"] / 1000)
+            result[f"batch_{size}"] = stats
+        results[name] = result
+    return results
+
+
+def print_backends(results):
+    """Таблица: p50 одиночной строки и строк/с на каждом размере пакета по бэкендам"""
+    if not results:
+        return
+    sizes = [key for key in next(iter(results.values())) if key.startswith('batch_')]
+    print(f"{'бэкенд':<10} {'1 строка, мс':>13}" + "".join(f" {key[6:] + ' строк/с':>16}" for key in sizes))
+    for name, result in results.items():
+        print(f"{name:<10} {result['single_row']['p50_ms']:>13.3f}"
+              + "".join(f" {result[key]['rows_per_s']:>16,.0f}" for key in sizes))
+
+
+def bench_drift(batch_sizes, repeat):
+    """
+    Монитор дрейфа: observe - всё, что добавляется к /predict (очередь без фонового потока),
+    update - фоновое обновление скетчей пакетом строк, report - расчёт PSI/KS для /drift.
+    """
+    monitor = DriftMonitor.from_file(DRIFT_PROFILE, queue_size=repeat * 2, seed=0)
+    categories = list(monitor.profile['categorical']['GS']['proportions'])
+    wells = random_wells(repeat, categories=categories)
+    it = iter(wells * 2)
+    results = {"observe": measure(lambda: monitor.observe(next(it)), repeat=repeat)}
+    for size in batch_sizes:
+        batch = [('columns', (rows_to_columns(random_wells(size, categories=categories), monitor.fields), size))]
+        stats = measure(lambda: monitor.update(batch), repeat=max(3, repeat // max(1, size // 100)), warmup=1)
+        stats["rows_per_s"] = size / (stats["p50_ms"] / 1000)
+        results[f"update_{size}"] = stats
+    results["report"] = measure(monitor.report, repeat=20, warmup=1)
+    return results
+
+
+def input_specs():
+    # Схема входа берётся из API, чтобы бенчмарк проверял тот же путь валидации
+    from serving.schemas import InputData
+    return field_specs(InputData)
+
+
+def run(batch_sizes=DEFAULT_BATCH_SIZES, repeat=200, load_repeat=5, sweep_points=100_000,
+        explain_sizes=DEFAULT_EXPLAIN_SIZES):
+    bundle = ModelBundle.load().prepare()
+    return {
+        "artifacts": bench_artifacts(load_repeat),
+        "single_row": bench_single(bundle, repeat),
+        "batch": bench_batch(bundle, batch_sizes, input_specs(), repeat),
+        "batch_encoder_baseline": bench_batch(bundle, batch_sizes, input_specs(), repeat, encoder_baseline=True),
+        "sweep": bench_sweep(bundle, sweep_points),
+        "explain": bench_explain(bundle, explain_sizes),
+        "backends": bench_backends(batch_sizes, repeat) if os.path.exists(SERVING_BUNDLE_SPEC) else {},
+        "drift": bench_drift(batch_sizes, repeat) if os.path.exists(DRIFT_PROFILE) else {},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--sweep-points', type=int, default=100_000)
+    parser.add_argument('--explain-sizes', type=int, nargs='+', default=DEFAULT_EXPLAIN_SIZES)
+    args = parser.parse_args()
+
+    results = run(args.batch_sizes, args.repeat, sweep_points=args.sweep_points, explain_sizes=args.explain_sizes)
+    for name, stats in results['single_row'].items():
+        print(f"{name:>18}: p50={stats['p50_ms']:.3f} мс  p99={stats['p99_ms']:.3f} мс")
+    for size, stats in results['batch'].items():
+        baseline = results['batch_encoder_baseline'][size]
+        print(f"batch {size:>6}: p50={stats['p50_ms']:.2f} мс  {stats['rows_per_s']:,.0f} строк/с "
+              f"(OneHotEncoder + model.predict: {baseline['rows_per_s']:,.0f} строк/с)")
+    for size, stats in results['sweep'].items():
+        print(f"sweep {size:>6}: p50={stats['p50_ms']:.0f} мс  {stats['rows_per_s']:,.0f} точек/с")
+    for size, stats in results['explain'].items():
+        print(f"explain {size:>4}: p50={stats['explain_p50_ms']:.1f} мс против predict "
+              f"{stats['predict_p50_ms']:.2f} мс (x{stats['overhead_x']:.0f})")
+    print_backends(results['backends'])
+    if results['drift']:
+        drift = results['drift']
+        print(f"drift observe: p50={drift['observe']['p50_ms'] * 1000:.1f} мкс, report {drift['report']['p50_ms']:.1f} мс, "
+              + ", ".join(f"update {key[7:]}: {stats['rows_per_s']:,.0f} строк/с"
+                          for key, stats in drift.items() if key.startswith('update_')))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Время стадий preprocess / train / evaluate на синтетических данных,
+увеличенных в 1x / 10x / 100x относительно data/raw/data.xlsx.
+
+    python -m benchmarks.stages --scales 1 10 100
+
+Для каждого масштаба во временном каталоге собирается копия src/ и params.yaml,
+data/interim/data.parquet заменяется синтетической выборкой, и стадии
+запускаются отдельными процессами. MLflow пишет в локальное хранилище
+во временном каталоге. Пиковая память - ru_maxrss процесса стадии.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import yaml
+
+DEFAULT_SCALES = [1, 10, 100]
+STAGES = ['preprocess', 'train', 'evaluate']
+INTEGER_COLUMNS = ['GRP', 'nGS']
+
+
+def load_source(params):
+    """Исходные данные: Parquet стадии ingest, если есть, иначе XLSX"""
+    if os.path.exists(params['data']['ingested_path']):
+        return pd.read_parquet(params['data']['ingested_path'])
+    return pd.read_excel(params['data']['raw_path'])
+
+
+def scale_dataset(df, scale, seed=42, noise=0.01):
+    """
+    Выборка в scale раз больше исходной: копии строк с мультипликативным шумом
+    numeric-признаков (целевая переменная и целочисленные признаки не меняются).
+    """
+    if scale == 1:
+        return df
+    rng = np.random.default_rng(seed)
+    copies = [df]
+    numeric = [c for c in df.select_dtypes('number').columns if c not in INTEGER_COLUMNS]
+    for _ in range(scale - 1):
+        copy = df.copy()
+        copy[numeric] = copy[numeric] * (1 + rng.normal(0, noise, size=(len(df), len(numeric))))
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def run_stage(workdir, stage, env):
+    """Запускает стадию и возвращает время и пиковую память процесса"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join('src', f'{stage}.py')],
+        cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    output = process.stdout.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(f"Стадия {stage} завершилась с ошибкой:\n{output.decode(errors='replace')[-2000:]}")
+    return {"wall_s": elapsed, "peak_rss_mb": usage.ru_maxrss / 1024}
+
+
+def run_scale(params, source, scale, keep=False):
+    workdir = tempfile.mkdtemp(prefix=f'npv_bench_x{scale}_')
+    try:
+        shutil.copytree('src', os.path.join(workdir, 'src'))
+        shutil.copy('params.yaml', workdir)
+        os.makedirs(os.path.join(workdir, 'models'))
+        ingested_path = os.path.join(workdir, params['data']['ingested_path'])
+        os.makedirs(os.path.dirname(ingested_path))
+        scale_dataset(source, scale).to_parquet(ingested_path, index=False)
+
+        env = dict(os.environ, MLFLOW_TRACKING_URI=f"sqlite:///{os.path.join(workdir, 'mlflow.db')}")
+        result = {"rows": len(source) * scale}
+        for stage in STAGES:
+            result[stage] = run_stage(workdir, stage, env)
+        return result
+    finally:
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(scales=DEFAULT_SCALES, keep=False):
+    with open("params.yaml", "r") as f:
+        params = yaml.safe_load(f)
+    source = load_source(params)
+    results = {}
+    for scale in scales:
+        print(f"Масштаб x{scale}: {len(source) * scale} строк...", flush=True)
+        results[f"x{scale}"] = run_scale(params, source, scale, keep)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES)
+    parser.add_argument('--keep', action='store_true', help='не удалять временные каталоги')
+    args = parser.parse_args()
+
+    results = run(args.scales, args.keep)
+    for scale, r in results.items():
+        print(f"{scale:>5} ({r['rows']} строк): " + "  ".join(
+            f"{stage} {r[stage]['wall_s']:.1f} с / {r[stage]['peak_rss_mb']:.0f} МБ" for stage in STAGES
+        ))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Время холодного старта API: от запуска интерпретатора до первого предсказания.
+
+    python -m benchmarks.startup --repeat 5 --target-s 1.5
+
+Каждый замер - отдельный процесс: import app (загрузка модели), startup-хук
+(подготовка бандла) и одно предсказание. Сравниваются serving-бандл
+(models/serving) и joblib-артефакты (NPV_SERVING_BUNDLE=0). Код возврата 1,
+если медиана для serving-бандла превышает --target-s.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+MODES = {
+    'serving_bundle': {'NPV_SERVING_BUNDLE': '1'},
+    'joblib': {'NPV_SERVING_BUNDLE': '0'},
+}
+DEFAULT_TARGET_S = 1.5
+
+PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+asyncio.run(app.init_serving())
+ready = time.perf_counter()
+well = {"Heff": 15.0, "Perm": 150.0, "Sg": 0.75, "L_hor": 600.0, "GS": app.bundle.categories[-1],
+        "temp": 25.0, "C5": 0.6, "GRP": 2, "nGS": 3}
+app.predict_single(app.bundle, well)
+done = time.perf_counter()
+print(json.dumps({"import_s": imported - start, "init_s": ready - imported, "first_prediction_s": done - ready,
+                  "source": app.bundle.source,
+                  "heavy_modules": [m for m in ("pandas", "sklearn", "scipy", "xgboost") if m in sys.modules]}),
+      flush=True)
+"""
+
+
+def measure_once(env):
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', PROBE], env=env, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True)
+    line = process.stdout.readline()
+    total = time.perf_counter() - start
+    process.wait()
+    if process.returncode != 0 or not line:
+        raise RuntimeError("Процесс замера старта завершился с ошибкой")
+    return {"total_s": total, **json.loads(line)}
+
+
+def run(repeat=5, modes=tuple(MODES)):
+    results = {}
+    for mode in modes:
+        # Микробатчер и наблюдение за файлами не нужны для одного предсказания
+        env = dict(os.environ, NPV_MICROBATCH='0', NPV_RELOAD_INTERVAL_S='0', PYTHONPATH=os.getcwd(),
+                   **MODES[mode])
+        runs = [measure_once(env) for _ in range(repeat)]
+        results[mode] = {
+            key: statistics.median(r[key] for r in runs)
+            for key in ("total_s", "import_s", "init_s", "first_prediction_s")
+        }
+        results[mode].update(source=runs[-1]["source"], heavy_modules=runs[-1]["heavy_modules"])
+    return results
+
+
+def check_target(results, target_s):
+    """Медианное время до первого предсказания serving-бандла не больше target_s"""
+    serving = results.get('serving_bundle')
+    return serving is None or serving['total_s'] <= target_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--target-s', type=float, default=DEFAULT_TARGET_S)
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    for mode, r in results.items():
+        print(f"{mode:>15} ({r['source']}): до первого предсказания {r['total_s']:.2f} с "
+              f"(import {r['import_s']:.2f} с, startup {r['init_s']:.2f} с, "
+              f"predict {r['first_prediction_s'] * 1000:.1f} мс), тяжёлые модули: {r['heavy_modules'] or 'нет'}")
+    print(json.dumps(results, indent=2))
+
+    if not check_target(results, args.target_s):
+        print(f"❌ Старт дольше цели {args.target_s} с")
+        sys.exit(1)
+    print(f"✅ Старт укладывается в цель {args.target_s} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Набор бенчмарков: микробенчмарки инференса, нагрузочный тест ASGI, холодный старт API,
+время стадий и операции MLflow.
+Результат пишется в JSON-отчёт и сравнивается с сохранённым базовым отчётом.
+
+    python -m benchmarks.suite                         # все части, сравнение с baseline
+    python -m benchmarks.suite --only micro asgi       # без стадий пайплайна
+    python -m benchmarks.suite --save-baseline         # сохранить отчёт как baseline
+
+Код возврата 1, если какая-либо метрика хуже базовой больше чем на --threshold
+или холодный старт API дольше --startup-target-s.
+"""
+import argparse
+import os
+import sys
+
+from benchmarks import asgi_load, micro, stages, startup, tracking
+from benchmarks.common import compare, environment, load_json, save_json
+
+PARTS = ['micro', 'asgi', 'startup', 'stages', 'tracking']
+REPORT_PATH = 'benchmarks/results/latest.json'
+BASELINE_PATH = 'benchmarks/baseline.json'
+
+
+def print_comparison(rows, threshold):
+    regressions = [row for row in rows if row['regression']]
+    for row in rows:
+        mark = '❌' if row['regression'] else ('✅' if row['change'] < -threshold else '  ')
+        print(f"{mark} {row['metric']:<60} {row['baseline']:>12.3f} -> {row['current']:>12.3f} "
+              f"({-row['change']:+.1%})")
+    print(f"Регрессий: {len(regressions)} из {len(rows)} метрик (порог {threshold:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='+', choices=PARTS, default=PARTS)
+    parser.add_argument('--output', default=REPORT_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.1, help='допустимое ухудшение, доля')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=micro.DEFAULT_BATCH_SIZES)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=asgi_load.DEFAULT_CONCURRENCY)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--startup-target-s', type=float, default=startup.DEFAULT_TARGET_S)
+    parser.add_argument('--scales', type=int, nargs='+', default=stages.DEFAULT_SCALES)
+    parser.add_argument('--runs', type=int, default=tracking.DEFAULT_RUNS, help='ранов в истории MLflow')
+    args = parser.parse_args()
+
+    report = {"environment": environment()}
+    if 'micro' in args.only:
+        print("Микробенчмарки...", flush=True)
+        report['micro'] = micro.run(args.batch_sizes)
+    if 'asgi' in args.only:
+        print("Нагрузочный тест ASGI...", flush=True)
+        report['asgi'] = asgi_load.run(args.concurrency, args.requests)
+    if 'startup' in args.only:
+        print("Холодный старт API...", flush=True)
+        report['startup'] = startup.run()
+    if 'stages' in args.only:
+        print("Стадии пайплайна...", flush=True)
+        report['stages'] = stages.run(args.scales)
+    if 'tracking' in args.only:
+        print("Операции MLflow...", flush=True)
+        report['tracking'] = tracking.run(args.runs)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    save_json(report, args.output)
+    print(f"✅ Отчёт сохранён: {args.output}")
+
+    target_missed = 'startup' in report and not startup.check_target(report['startup'], args.startup_target_s)
+    if target_missed:
+        print(f"❌ Холодный старт serving-бандла {report['startup']['serving_bundle']['total_s']:.2f} с "
+              f"дольше цели {args.startup_target_s} с")
+
+    regressions = []
+    if args.save_baseline:
+        save_json(report, args.baseline)
+        print(f"✅ Базовый отчёт сохранён: {args.baseline}")
+    elif not os.path.exists(args.baseline):
+        print(f"Базового отчёта {args.baseline} нет - сравнение пропущено")
+    else:
+        regressions = print_comparison(compare(report, load_json(args.baseline), args.threshold), args.threshold)
+
+    if regressions or target_missed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Операции MLflow стадий train/register на локальном хранилище с длинной историей.
+
+    python -m benchmarks.tracking --runs 2000
+
+Во временном каталоге создаётся файловое хранилище (или --store-uri) с --runs
+ранами: итоговые раны train и вложенные раны подбора (по TRIALS_PER_RUN на итоговый).
+Замеры (медиана по --repeat):
+  * поиск ран-а для регистрации: прежний запрос (вся история, сортировка) против
+    latest_training_run (фильтр + max_results=1);
+  * get_registered_model / create_model_version;
+  * логирование метрик train: log_metric на каждую метрику, один log_batch и
+    BatchLogger (время вызывающего потока и полное время до записи).
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# src/ - набор скриптов, а не пакет: tracking.py подключается по пути
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from mlflow.tracking import MlflowClient  # noqa: E402
+
+from tracking import (  # noqa: E402
+    PARENT_TAG, ROLE_TAG, TRAIN_ROLE, BatchLogger, latest_training_run, to_entities
+)
+
+DEFAULT_RUNS = 2000
+TRIALS_PER_RUN = 4
+EXPERIMENT = 'npv_tracking_benchmark'
+MODEL_NAME = 'npv_tracking_benchmark_model'
+# Набор метрик и параметров одного обучения, как в src/train.py
+TRAIN_METRICS = {'mae': 21.3, 'r2': 0.99, 'mape': 0.08, 'cv_mean': 0.98, 'cv_std': 0.01, 'train_time_s': 0.9,
+                 'peak_rss_mb': 320.0, 'best_iteration': 249, 'quantile_train_time_s': 1.4}
+TRAIN_PARAMS = {'n_estimators': 1000, 'max_depth': 15, 'learning_rate': 0.1, 'subsample': 0.7,
+                'colsample_bytree': 0.9, 'min_child_weight': 3, 'reg_lambda': 0.4, 'reg_alpha': 0.2}
+
+
+def populate(client, experiment_id, n_runs):
+    """История эксперимента: итоговые раны train, у каждого TRIALS_PER_RUN вложенных ранов"""
+    metrics, params, _ = to_entities(TRAIN_METRICS, TRAIN_PARAMS)
+    created = 0
+    while created < n_runs:
+        parent = client.create_run(experiment_id, tags={ROLE_TAG: TRAIN_ROLE}).info.run_id
+        client.log_batch(parent, metrics=metrics, params=params)
+        created += 1
+        for _ in range(min(TRIALS_PER_RUN, n_runs - created)):
+            child = client.create_run(experiment_id, tags={PARENT_TAG: parent}).info.run_id
+            client.log_batch(child, metrics=metrics[:4], params=params)
+            client.set_terminated(child)
+            created += 1
+        client.set_terminated(parent)
+    return parent
+
+
+def median_time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2] * 1000
+
+
+def bench_search(client, experiment_id, repeat):
+    def unbounded():
+        # Как было в register_model.py: все раны эксперимента, затем runs[0]
+        return client.search_runs(experiment_id, order_by=["attributes.start_time DESC"])[0]
+
+    return {
+        "search_unbounded_ms": median_time(unbounded, repeat),
+        "search_latest_ms": median_time(lambda: latest_training_run(client, experiment_id), repeat),
+    }
+
+
+def bench_registry(client, run_id, repeat):
+    client.create_registered_model(MODEL_NAME)
+    return {
+        "get_registered_model_ms": median_time(lambda: client.get_registered_model(MODEL_NAME), repeat),
+        "create_model_version_ms": median_time(
+            lambda: client.create_model_version(MODEL_NAME, source=f"runs:/{run_id}/model", run_id=run_id), repeat
+        ),
+    }
+
+
+def bench_logging(client, experiment_id, repeat):
+    run_id = client.create_run(experiment_id).info.run_id
+
+    def per_metric():
+        for key, value in TRAIN_METRICS.items():
+            client.log_metric(run_id, key, value)
+
+    def batch():
+        metrics, _, _ = to_entities(TRAIN_METRICS)
+        client.log_batch(run_id, metrics=metrics)
+
+    enqueue, total = [], []
+    with BatchLogger(run_id, client) as logger:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            logger.log(metrics=TRAIN_METRICS)
+            enqueue.append(time.perf_counter() - start)
+            logger.flush()
+            total.append(time.perf_counter() - start)
+    client.set_terminated(run_id)
+    return {
+        "log_metric_loop_ms": median_time(per_metric, repeat),
+        "log_batch_ms": median_time(batch, repeat),
+        "batch_logger_caller_ms": sorted(enqueue)[repeat // 2] * 1000,
+        "batch_logger_total_ms": sorted(total)[repeat // 2] * 1000,
+    }
+
+
+def run(n_runs=DEFAULT_RUNS, repeat=5, store_uri=None):
+    workdir = tempfile.mkdtemp(prefix='npv_tracking_')
+    try:
+        client = MlflowClient(store_uri or Path(workdir, 'mlruns').as_uri())
+        experiment_id = client.create_experiment(EXPERIMENT)
+        start = time.perf_counter()
+        last_run = populate(client, experiment_id, n_runs)
+        result = {"runs": n_runs, "populate_s": time.perf_counter() - start}
+        result.update(bench_search(client, experiment_id, repeat))
+        result.update(bench_registry(client, last_run, repeat))
+        result.update(bench_logging(client, experiment_id, repeat))
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--store-uri', default=None,
+                        help='хранилище MLflow (по умолчанию файловое во временном каталоге), '
+                             'например sqlite:////tmp/bench.db - должно быть пустым')
+    args = parser.parse_args()
+
+    r = run(args.runs, args.repeat, args.store_uri)
+    print(f"История: {r['runs']} ранов (создание {r['populate_s']:.1f} с)")
+    print(f"Поиск ран-а: вся история {r['search_unbounded_ms']:.1f} мс, "
+          f"фильтр + max_results=1 {r['search_latest_ms']:.1f} мс")
+    print(f"Реестр: get_registered_model {r['get_registered_model_ms']:.1f} мс, "
+          f"create_model_version {r['create_model_version_ms']:.1f} мс")
+    print(f"Логирование {len(TRAIN_METRICS)} метрик: log_metric по одной {r['log_metric_loop_ms']:.1f} мс, "
+          f"log_batch {r['log_batch_ms']:.1f} мс, BatchLogger {r['batch_logger_caller_ms']:.3f} мс "
+          f"в вызывающем потоке ({r['batch_logger_total_ms']:.1f} мс до записи)")
+
+
+if __name__ == "__main__":
+    main()
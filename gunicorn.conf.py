@@ -0,0 +1,35 @@
+"""
+Конфигурация gunicorn для многопроцессного запуска API:
+
+    gunicorn app:app -c gunicorn.conf.py
+
+Модель загружается один раз в master-процессе (preload_app), воркеры получают её
+через fork и делят страницы памяти по copy-on-write. Ядра делятся между воркерами:
+каждому воркеру XGBoost выделяется cpu // workers потоков.
+"""
+import gc
+import os
+
+try:
+    cpu_count = len(os.sched_getaffinity(0))
+except AttributeError:
+    cpu_count = os.cpu_count() or 1
+
+bind = os.getenv('NPV_BIND', '0.0.0.0:8001')
+workers = int(os.getenv('NPV_WORKERS', cpu_count))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+timeout = int(os.getenv('NPV_WORKER_TIMEOUT', '60'))
+
+# Читается в app.py при импорте, до fork
+os.environ.setdefault('NPV_XGB_NTHREAD', str(max(1, cpu_count // workers)))
+
+
+def when_ready(server):
+    # Объекты, загруженные в master, исключаются из обхода GC,
+    # чтобы воркеры не копировали их страницы при сборке мусора
+    gc.freeze()
+    server.log.info(
+        f"Модель загружена в master, воркеров: {workers}, "
+        f"потоков XGBoost на воркер: {os.environ['NPV_XGB_NTHREAD']}"
+    )
@@ -0,0 +1,13 @@
+"""
+Клиент NPV API: синхронный (NPVClient, requests) и асинхронный (AsyncNPVClient, httpx).
+
+    from npv_client import NPVClient
+    with NPVClient() as client:  # URL из API_URL или http://localhost:8001
+        client.predict_batch(wells)
+"""
+from npv_client.aio import AsyncNPVClient
+from npv_client.base import NPVAPIError
+from npv_client.history import PredictionHistory
+from npv_client.sync import NPVClient
+
+__all__ = ['AsyncNPVClient', 'NPVAPIError', 'NPVClient', 'PredictionHistory']
@@ -0,0 +1,127 @@
+"""Асинхронный клиент NPV API на httpx.AsyncClient с пулом соединений."""
+import asyncio
+
+import httpx
+
+from npv_client.base import (
+    DEFAULT_CACHE_TTL_S, DEFAULT_CHUNK_SIZE, DEFAULT_MAX_CONCURRENCY, DEFAULT_TIMEOUT_S, RETRY_STATUSES,
+    NPVAPIError, TTLCache, chunk_columns, default_url, error_detail, merge_batches, parse_metrics, retry_delay,
+    to_columns
+)
+
+
+class AsyncNPVClient:
+    """
+    Асинхронный вариант NPVClient с тем же набором методов; одновременных запросов
+    не больше max_concurrency (семафор), соединения берутся из пула httpx.
+
+        async with AsyncNPVClient('http://localhost:8001') as client:
+            results = await client.predict_many(wells)
+    """
+
+    def __init__(self, base_url=None, timeout=DEFAULT_TIMEOUT_S, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 chunk_size=DEFAULT_CHUNK_SIZE, cache_ttl_s=DEFAULT_CACHE_TTL_S, retries=2, backoff_s=0.1,
+                 transport=None):
+        self.base_url = (base_url or default_url()).rstrip('/')
+        self.max_concurrency = max(1, max_concurrency)
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.cache = TTLCache(cache_ttl_s)
+        # transport - для тестов и бенчмарков (httpx.ASGITransport без сети)
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=self.max_concurrency,
+                                max_keepalive_connections=self.max_concurrency),
+            transport=transport
+        )
+        # Создаётся в цикле событий при первом запросе (в Python 3.9 семафор привязан к циклу)
+        self._semaphore = None
+
+    async def close(self):
+        await self.http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _request(self, method, path, **kwargs):
+        """Запрос с повтором при 429/503; ответ - JSON или текст (для /metrics)"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await self.http.request(method, path, **kwargs)
+            except httpx.HTTPError as e:
+                raise NPVAPIError(None, f"Ошибка соединения: {e}") from e
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                await asyncio.sleep(retry_delay(attempt, self.backoff_s))
+                continue
+            if response.status_code >= 400:
+                try:
+                    payload = response.json()
+                except ValueError:
+                    payload = None
+                raise NPVAPIError(response.status_code, error_detail(payload, response.text))
+            if response.headers.get('content-type', '').startswith('application/json'):
+                return response.json()
+            return response.text
+
+    async def _cached(self, key, load, refresh=False):
+        value = None if refresh else self.cache.get(key)
+        if value is None:
+            value = await load()
+            self.cache.put(key, value)
+        return value
+
+    async def health(self):
+        """True, если API отвечает и модель загружена"""
+        try:
+            return bool((await self._request('GET', '/health')).get('model_loaded'))
+        except NPVAPIError:
+            return False
+
+    async def model_info(self, refresh=False):
+        return await self._cached('model_info', lambda: self._request('GET', '/model_info'), refresh)
+
+    async def explain_global(self, refresh=False):
+        return await self._cached('explain_global', lambda: self._request('GET', '/explain/global'), refresh)
+
+    async def metrics(self, refresh=False):
+        """Метрики сервиса (/metrics) в виде {'имя{метки}': значение}"""
+        async def load():
+            return parse_metrics(await self._request('GET', '/metrics'))
+        return await self._cached('metrics', load, refresh)
+
+    async def predict(self, well, explain=False):
+        """Одна скважина через /predict (на сервере - микробатчер)"""
+        return await self._request('POST', '/predict', json=well, params={'explain': 'true'} if explain else None)
+
+    async def predict_batch(self, wells, explain=False, on_progress=None):
+        """
+        Пакет через /predict_batch чанками по chunk_size строк, до max_concurrency одновременно;
+        on_progress(готово строк, всего строк) - после каждого чанка.
+        """
+        columns, n_rows = to_columns(wells)
+        params = {'explain': 'true'} if explain else None
+        done = 0
+
+        async def send(offset, part):
+            nonlocal done
+            result = await self._request('POST', '/predict_batch', json={'columns': part}, params=params)
+            done += result['n_rows']
+            if on_progress is not None:
+                on_progress(done, n_rows)
+            return offset, result
+
+        parts = await asyncio.gather(*(send(offset, part) for offset, part in
+                                       chunk_columns(columns, n_rows, self.chunk_size)))
+        return merge_batches(parts, n_rows)
+
+    async def predict_many(self, wells, explain=False):
+        """Много одиночных /predict параллельно (не больше max_concurrency); результаты в порядке wells"""
+        return await asyncio.gather(*(self.predict(well, explain) for well in wells))
@@ -0,0 +1,128 @@
+"""Общие части синхронного и асинхронного клиентов: ошибки, TTL-кэш, нарезка и склейка пакетов."""
+import os
+import threading
+import time
+
+DEFAULT_URL = 'http://localhost:8001'
+DEFAULT_TIMEOUT_S = 10.0
+DEFAULT_CHUNK_SIZE = 5000  # строк в одном запросе /predict_batch
+DEFAULT_MAX_CONCURRENCY = 4  # одновременных запросов от одного клиента
+DEFAULT_CACHE_TTL_S = 30.0  # время жизни model_info / metrics / explain_global
+RETRY_STATUSES = (429, 503)  # очередь микробатчера переполнена / модель ещё не загружена
+
+
+class NPVAPIError(Exception):
+    """Ошибка API: status_code - HTTP-статус (None - нет соединения), detail - текст ошибки"""
+
+    def __init__(self, status_code, detail):
+        super().__init__(f"{status_code}: {detail}" if status_code is not None else str(detail))
+        self.status_code = status_code
+        self.detail = detail
+
+
+def default_url():
+    return os.getenv('API_URL', DEFAULT_URL).rstrip('/')
+
+
+def error_detail(payload, text):
+    """detail из JSON-ответа FastAPI или сырой текст"""
+    if isinstance(payload, dict) and 'detail' in payload:
+        return payload['detail']
+    return text
+
+
+def retry_delay(attempt, backoff_s):
+    return backoff_s * (2 ** attempt)
+
+
+class TTLCache:
+    """Кэш ответов справочных эндпоинтов: значение живёт ttl секунд, доступ из нескольких потоков"""
+
+    def __init__(self, ttl_seconds=DEFAULT_CACHE_TTL_S):
+        self.ttl = ttl_seconds
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return None
+            return value
+
+    def put(self, key, value):
+        if self.ttl > 0:
+            with self._lock:
+                self._data[key] = (value, time.monotonic() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def to_columns(wells):
+    """
+    Приводит пакет к колоночному виду {поле: [значения]}: список скважин,
+    словарь колонок или DataFrame. Возвращает (колонки, число строк).
+    """
+    if hasattr(wells, 'to_dict') and hasattr(wells, 'columns'):
+        # Пропуски DataFrame (NaN) уходят как null и возвращаются построчными ошибками валидации
+        wells = wells.astype(object).where(wells.notna(), None).to_dict('list')
+    if isinstance(wells, dict):
+        columns = {name: list(values) for name, values in wells.items()}
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("Колонки должны быть одинаковой длины")
+        return columns, lengths.pop() if lengths else 0
+    wells = list(wells)
+    names = []
+    for well in wells:
+        for name in well:
+            if name not in names:
+                names.append(name)
+    return {name: [well.get(name) for well in wells] for name in names}, len(wells)
+
+
+def chunk_columns(columns, n_rows, chunk_size):
+    """[(смещение, колонки чанка)] по chunk_size строк"""
+    return [
+        (offset, {name: values[offset:offset + chunk_size] for name, values in columns.items()})
+        for offset in range(0, n_rows, chunk_size)
+    ] or [(0, columns)]
+
+
+def merge_batches(parts, n_rows):
+    """Склеивает ответы /predict_batch по чанкам [(смещение, ответ)] в один ответ на весь пакет"""
+    merged = {"predicted_NPV": [], "errors": [], "n_rows": n_rows, "n_valid": 0}
+    for offset, part in sorted(parts, key=lambda p: p[0]):
+        merged["predicted_NPV"].extend(part["predicted_NPV"])
+        merged["errors"].extend({**e, "index": e["index"] + offset} for e in part["errors"])
+        merged["n_valid"] += part["n_valid"]
+        # Колоночные блоки (quantiles, contributions) и списки (base_value) склеиваются поэлементно
+        for key in ("quantiles", "contributions"):
+            if key in part:
+                block = merged.setdefault(key, {})
+                for name, values in part[key].items():
+                    block.setdefault(name, []).extend(values)
+        if "base_value" in part:
+            merged.setdefault("base_value", []).extend(part["base_value"])
+    merged["status"] = "success" if not merged["errors"] else "partial"
+    return merged
+
+
+def parse_metrics(text):
+    """Текст Prometheus (/metrics) -> {'имя{метки}': значение}"""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        name, _, value = line.rpartition(' ')
+        try:
+            samples[name] = float(value)
+        except ValueError:
+            continue
+    return samples
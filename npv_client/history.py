@@ -0,0 +1,61 @@
+"""История предсказаний фиксированного размера в колоночном виде."""
+import time
+
+import numpy as np
+
+
+class PredictionHistory:
+    """
+    Кольцевой буфер последних capacity предсказаний: по массиву numpy на поле.
+
+    Добавление записи - запись в заранее выделенные массивы без роста памяти,
+    старые записи вытесняются. DataFrame собирается только при показе.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.columns = None
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _allocate(self, inputs):
+        self.columns = {'timestamp': np.zeros(self.capacity)}
+        for name, value in inputs.items():
+            numeric = isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+            self.columns[name] = np.full(self.capacity, np.nan) if numeric else np.empty(self.capacity, dtype=object)
+        self.columns['prediction'] = np.full(self.capacity, np.nan)
+
+    def append(self, inputs, prediction, timestamp=None):
+        if self.columns is None:
+            self._allocate(inputs)
+        i = self._next
+        self.columns['timestamp'][i] = time.time() if timestamp is None else timestamp
+        for name, values in self.columns.items():
+            if name in inputs:
+                values[i] = inputs[name]
+        self.columns['prediction'][i] = prediction
+        self._next = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def clear(self):
+        self._next = 0
+        self._size = 0
+
+    def _order(self, last=None):
+        """Индексы записей от старых к новым (последние last)"""
+        n = self._size if last is None else min(last, self._size)
+        return np.arange(self._next - n, self._next) % self.capacity
+
+    def to_frame(self, last=None):
+        """Последние last записей как DataFrame (новые снизу)"""
+        import pandas as pd
+
+        if self.columns is None or self._size == 0:
+            return pd.DataFrame()
+        index = self._order(last)
+        frame = pd.DataFrame({name: values[index] for name, values in self.columns.items()})
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'], unit='s')
+        return frame
@@ -0,0 +1,135 @@
+"""Синхронный клиент NPV API на одной requests.Session с пулом соединений."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from npv_client.base import (
+    DEFAULT_CACHE_TTL_S, DEFAULT_CHUNK_SIZE, DEFAULT_MAX_CONCURRENCY, DEFAULT_TIMEOUT_S, RETRY_STATUSES,
+    NPVAPIError, TTLCache, chunk_columns, default_url, error_detail, merge_batches, parse_metrics, retry_delay,
+    to_columns
+)
+
+
+class NPVClient:
+    """
+    Клиент NPV API: соединения переиспользуются между запросами (keep-alive),
+    большие пакеты режутся на чанки и отправляются в /predict_batch не больше
+    чем max_concurrency запросами одновременно, справочные ответы кэшируются на cache_ttl_s.
+
+        with NPVClient('http://localhost:8001') as client:
+            client.predict(well)["predicted_NPV"]
+            client.predict_batch(wells)["predicted_NPV"]
+    """
+
+    def __init__(self, base_url=None, timeout=DEFAULT_TIMEOUT_S, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 chunk_size=DEFAULT_CHUNK_SIZE, cache_ttl_s=DEFAULT_CACHE_TTL_S, retries=2, backoff_s=0.1):
+        self.base_url = (base_url or default_url()).rstrip('/')
+        self.timeout = timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.cache = TTLCache(cache_ttl_s)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _pool(self):
+        # Потоки пула ограничивают число одновременных запросов; пул соединений того же размера
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='npv-client')
+        return self._executor
+
+    def _request(self, method, path, **kwargs):
+        """Запрос с повтором при 429/503; ответ - JSON или текст (для /metrics)"""
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                raise NPVAPIError(None, f"Ошибка соединения: {e}") from e
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                time.sleep(retry_delay(attempt, self.backoff_s))
+                continue
+            if response.status_code >= 400:
+                try:
+                    payload = response.json()
+                except ValueError:
+                    payload = None
+                raise NPVAPIError(response.status_code, error_detail(payload, response.text))
+            if response.headers.get('content-type', '').startswith('application/json'):
+                return response.json()
+            return response.text
+
+    def _cached(self, key, load, refresh=False):
+        value = None if refresh else self.cache.get(key)
+        if value is None:
+            value = load()
+            self.cache.put(key, value)
+        return value
+
+    def health(self):
+        """True, если API отвечает и модель загружена"""
+        try:
+            return bool(self._request('GET', '/health').get('model_loaded'))
+        except NPVAPIError:
+            return False
+
+    def model_info(self, refresh=False):
+        return self._cached('model_info', lambda: self._request('GET', '/model_info'), refresh)
+
+    def explain_global(self, refresh=False):
+        return self._cached('explain_global', lambda: self._request('GET', '/explain/global'), refresh)
+
+    def metrics(self, refresh=False):
+        """Метрики сервиса (/metrics) в виде {'имя{метки}': значение}"""
+        return self._cached('metrics', lambda: parse_metrics(self._request('GET', '/metrics')), refresh)
+
+    def predict(self, well, explain=False):
+        """Одна скважина через /predict (на сервере - микробатчер)"""
+        return self._request('POST', '/predict', json=well, params={'explain': 'true'} if explain else None)
+
+    def predict_batch(self, wells, explain=False, on_progress=None):
+        """
+        Пакет (список скважин, колонки или DataFrame) через /predict_batch.
+
+        Пакет уходит колоночными чанками по chunk_size строк, до max_concurrency одновременно;
+        ответ склеивается в один с индексами ошибок относительно всего пакета.
+        on_progress(готово строк, всего строк) вызывается в вызывающем потоке после каждого чанка.
+        """
+        columns, n_rows = to_columns(wells)
+        chunks = chunk_columns(columns, n_rows, self.chunk_size)
+        params = {'explain': 'true'} if explain else None
+
+        def send(chunk):
+            offset, part = chunk
+            return offset, self._request('POST', '/predict_batch', json={'columns': part}, params=params)
+
+        parts = []
+        done = 0
+        for offset, part in (map(send, chunks) if len(chunks) == 1 else self._pool().map(send, chunks)):
+            parts.append((offset, part))
+            done += part['n_rows']
+            if on_progress is not None:
+                on_progress(done, n_rows)
+        return merge_batches(parts, n_rows)
+
+    def predict_many(self, wells, explain=False):
+        """Много одиночных /predict параллельно (не больше max_concurrency); результаты в порядке wells"""
+        return list(self._pool().map(lambda well: self.predict(well, explain), wells))
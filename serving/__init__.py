@@ -0,0 +1 @@
+"""Вспомогательные модули сервиса инференса NPV (app.py)."""
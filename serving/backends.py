@@ -0,0 +1,128 @@
+"""
+Бэкенды инференса основной модели serving-бандла.
+
+* xgboost  - NativeBooster (C API libxgboost), эталон;
+* onnx     - граф TreeEnsembleRegressor (models/serving/model.onnx) в onnxruntime;
+* compiled - разделяемая библиотека, собранная Treelite/TL2cgen (models/serving/model.so).
+
+Файлы onnx/compiled пишет src/export_serving.py (export.backends в params.yaml) после
+проверки совпадения с model.joblib. Интерфейс совпадает с NativeBooster, поэтому
+FeaturePlan, микробатчер и /sweep работают с любым бэкендом; вклады признаков
+(explain) всегда считает исходный бустер. Пакеты onnxruntime и tl2cgen
+импортируются только при выборе соответствующего бэкенда.
+"""
+import os
+import platform
+
+import numpy as np
+
+BACKENDS = ('xgboost', 'onnx', 'compiled')
+# Деревья в onnxruntime и скомпилированном коде суммируются во float32 в другом порядке,
+# чем в XGBoost: расхождение ~1e-6 от величины прогноза
+PARITY_RTOL = 1e-5
+PARITY_ATOL = 1e-3
+
+
+def predictions_match(predictions, reference, rtol=PARITY_RTOL, atol=PARITY_ATOL):
+    """(максимальное |расхождение|, совпадают ли прогнозы в пределах допуска)"""
+    predictions = np.asarray(predictions, dtype=np.float64).reshape(-1)
+    reference = np.asarray(reference, dtype=np.float64).reshape(-1)
+    if len(reference) == 0:
+        return 0.0, True
+    max_diff = float(np.max(np.abs(predictions - reference)))
+    return max_diff, bool(np.allclose(predictions, reference, rtol=rtol, atol=atol))
+
+
+class DelegatingBooster:
+    """Общая часть бэкендов: всё, кроме inplace_predict, делает исходный бустер"""
+
+    name = None
+
+    def __init__(self, path, reference):
+        self.path = path
+        self.reference = reference
+        self.nthread = 0
+
+    def set_param(self, params):
+        if 'nthread' in params:
+            self.nthread = int(params['nthread'])
+            self._configure()
+        self.reference.set_param(params)
+
+    def _configure(self):
+        pass
+
+    def num_features(self):
+        return self.reference.num_features()
+
+    def predict_contribs(self, data, iteration_range=(0, 0)):
+        return self.reference.predict_contribs(data, iteration_range)
+
+
+class OnnxBooster(DelegatingBooster):
+    """
+    Модель в ONNX под onnxruntime. Диапазон деревьев (iteration_range) применён
+    при экспорте, поэтому аргумент inplace_predict игнорируется.
+    """
+
+    name = 'onnx'
+
+    def __init__(self, path, reference):
+        super().__init__(path, reference)
+        self._configure()
+
+    def _configure(self):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.nthread
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(self.path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def inplace_predict(self, data, iteration_range=(0, 0)):
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        return self.session.run(None, {self.input_name: data})[0].reshape(-1)
+
+
+class CompiledBooster(DelegatingBooster):
+    """Библиотека, скомпилированная TL2cgen из модели Treelite; деревья - развёрнутый C-код"""
+
+    name = 'compiled'
+
+    def __init__(self, path, reference):
+        super().__init__(path, reference)
+        self._configure()
+
+    def _configure(self):
+        import tl2cgen
+
+        self._tl2cgen = tl2cgen
+        self.predictor = tl2cgen.Predictor(self.path, nthread=self.nthread or None)
+
+    def inplace_predict(self, data, iteration_range=(0, 0)):
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        matrix = self._tl2cgen.DMatrix(data, missing=float('nan'))
+        return self.predictor.predict(matrix).reshape(-1)
+
+
+BOOSTER_CLASSES = {'onnx': OnnxBooster, 'compiled': CompiledBooster}
+
+
+def load_backend(name, reference, spec, directory):
+    """
+    Бустер выбранного бэкенда поверх исходного NativeBooster.
+
+    spec - bundle.json; ValueError, если бэкенд неизвестен или не экспортирован для этой модели.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд {name!r}, допустимы {list(BACKENDS)}")
+    if name == 'xgboost':
+        return reference
+    exported = spec.get('backends', {}).get(name)
+    if exported is None:
+        raise ValueError(f"Бэкенд {name} не экспортирован (export.backends в params.yaml)")
+    machine = exported.get('machine')
+    if machine and machine != platform.machine():
+        raise ValueError(f"Бэкенд {name} собран для {machine}, текущая платформа {platform.machine()}")
+    return BOOSTER_CLASSES[name](os.path.join(directory, exported['file']), reference)
@@ -0,0 +1,93 @@
+"""Динамический микробатчинг одиночных запросов /predict."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Очередь микробатчинга переполнена"""
+
+
+class MicroBatcher:
+    """
+    Собирает одиночные запросы в пакет и выполняет его в рабочем потоке.
+
+    Пакет отправляется в модель, когда набрано max_batch_size запросов или
+    с момента первого запроса прошло max_wait_ms. Пока модель считает пакет,
+    в очереди копится следующий. При заполненной очереди submit бросает
+    QueueFullError (API отвечает 429).
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0, max_queue_size=1024):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        self._queue = None
+        self._task = None
+        self._executor = None
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='npv-batch')
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Сервис останавливается"))
+        self._executor.shutdown(wait=False)
+        self._task = None
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, item):
+        """Ставит запрос в очередь и ждёт его результат"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Очередь запросов заполнена ({self.max_queue_size})")
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.predict_fn, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
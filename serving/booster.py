@@ -0,0 +1,134 @@
+"""
+Бустер XGBoost через C API libxgboost без импорта пакета xgboost.
+
+Пакет xgboost при импорте подтягивает pandas, scikit-learn и scipy; для
+инференса по готовой модели достаточно разделяемой библиотеки из того же пакета.
+"""
+import ctypes
+import importlib.util
+import json
+import os
+
+import numpy as np
+
+LIBRARY_NAMES = ('libxgboost.so', 'libxgboost.dylib', 'xgboost.dll')
+
+_LIB = None
+
+
+def find_library():
+    """Путь к libxgboost: NPV_XGBOOST_LIB или lib/ установленного пакета xgboost (без его импорта)"""
+    path = os.getenv('NPV_XGBOOST_LIB')
+    if path:
+        return path
+    spec = importlib.util.find_spec('xgboost')
+    if spec is None or spec.origin is None:
+        raise FileNotFoundError("Пакет xgboost не установлен")
+    base = os.path.dirname(spec.origin)
+    for directory in (os.path.join(base, 'lib'), base):
+        for name in LIBRARY_NAMES:
+            candidate = os.path.join(directory, name)
+            if os.path.exists(candidate):
+                return candidate
+    raise FileNotFoundError(f"libxgboost не найдена в {base}")
+
+
+def _lib():
+    global _LIB
+    if _LIB is None:
+        lib = ctypes.cdll.LoadLibrary(find_library())
+        lib.XGBGetLastError.restype = ctypes.c_char_p
+        _LIB = lib
+    return _LIB
+
+
+def _check(ret):
+    if ret != 0:
+        raise RuntimeError(_lib().XGBGetLastError().decode())
+
+
+class NativeBooster:
+    """
+    Модель, загруженная из файла XGBoost (UBJSON/JSON), с inplace_predict по плотной матрице.
+
+    Интерфейс совпадает с используемой частью xgboost.Booster: inplace_predict,
+    set_param, num_features; predict_contribs - вклады признаков TreeSHAP.
+    """
+
+    def __init__(self, path):
+        lib = _lib()
+        self.handle = ctypes.c_void_p()
+        _check(lib.XGBoosterCreate(None, ctypes.c_uint64(0), ctypes.byref(self.handle)))
+        _check(lib.XGBoosterLoadModel(self.handle, ctypes.c_char_p(os.fsencode(path))))
+        self._configs = {}
+
+    def __del__(self):
+        if _LIB is not None and getattr(self, 'handle', None):
+            _LIB.XGBoosterFree(self.handle)
+            self.handle = None
+
+    def set_param(self, params):
+        for name, value in params.items():
+            _check(_lib().XGBoosterSetParam(
+                self.handle, ctypes.c_char_p(name.encode()), ctypes.c_char_p(str(value).encode())
+            ))
+
+    def num_features(self):
+        n = ctypes.c_uint64()
+        _check(_lib().XGBoosterGetNumFeature(self.handle, ctypes.byref(n)))
+        return n.value
+
+    def _config(self, iteration_range):
+        config = self._configs.get(iteration_range)
+        if config is None:
+            # NaN - обозначение пропуска, как у xgboost.Booster.inplace_predict по умолчанию
+            config = self._configs[iteration_range] = json.dumps({
+                "type": 0, "training": False,
+                "iteration_begin": int(iteration_range[0]), "iteration_end": int(iteration_range[1]),
+                "missing": float('nan'), "strict_shape": False, "cache_id": 0
+            }).encode()
+        return config
+
+    def inplace_predict(self, data, iteration_range=(0, 0)):
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        interface = json.dumps(data.__array_interface__).encode()
+        shape = ctypes.POINTER(ctypes.c_uint64)()
+        dims = ctypes.c_uint64()
+        preds = ctypes.POINTER(ctypes.c_float)()
+        _check(_lib().XGBoosterPredictFromDense(
+            self.handle, interface, self._config(tuple(iteration_range)), None,
+            ctypes.byref(shape), ctypes.byref(dims), ctypes.byref(preds)
+        ))
+        return _copy_result(shape, dims, preds)
+
+    def predict_contribs(self, data, iteration_range=(0, 0)):
+        """TreeSHAP: матрица (строки, признаки + 1), последняя колонка - базовое значение"""
+        lib = _lib()
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        interface = json.dumps(data.__array_interface__).encode()
+        dmatrix = ctypes.c_void_p()
+        _check(lib.XGDMatrixCreateFromDense(
+            interface, json.dumps({"missing": float('nan'), "nthread": 0}).encode(), ctypes.byref(dmatrix)
+        ))
+        try:
+            config = json.dumps({
+                "type": 2, "training": False, "strict_shape": False,
+                "iteration_begin": int(iteration_range[0]), "iteration_end": int(iteration_range[1])
+            }).encode()
+            shape = ctypes.POINTER(ctypes.c_uint64)()
+            dims = ctypes.c_uint64()
+            preds = ctypes.POINTER(ctypes.c_float)()
+            _check(lib.XGBoosterPredictFromDMatrix(
+                self.handle, dmatrix, config, ctypes.byref(shape), ctypes.byref(dims), ctypes.byref(preds)
+            ))
+            return _copy_result(shape, dims, preds).reshape(len(data), -1)
+        finally:
+            lib.XGDMatrixFree(dmatrix)
+
+
+def _copy_result(shape, dims, preds):
+    size = 1
+    for i in range(dims.value):
+        size *= shape[i]
+    # Буфер результата принадлежит бустеру и переиспользуется следующим вызовом в этом потоке
+    return np.ctypeslib.as_array(preds, shape=(size,)).copy()
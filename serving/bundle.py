@@ -0,0 +1,314 @@
+"""Загрузка, проверка и горячая замена набора артефактов модели."""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from serving.backends import load_backend, predictions_match
+from serving.booster import NativeBooster
+from serving.features import FeaturePlan
+from serving.parity import check_parity, synthetic_rows
+from serving.quantiles import QUANTILES_SPEC, QuantileModel, load_quantiles
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = 'models/model.joblib'
+ENCODER_PATH = 'models/encoder.joblib'
+FEATURE_COLUMNS_PATH = 'models/feature_columns.joblib'
+REGISTRY_PATH = 'registry/model_info.json'
+MODEL_ARTIFACTS = [MODEL_PATH, ENCODER_PATH, FEATURE_COLUMNS_PATH]
+
+# Serving-бандл (src/export_serving.py): бустер в UBJSON + JSON со схемой признаков
+SERVING_DIR = 'models/serving'
+SERVING_MODEL_PATH = os.path.join(SERVING_DIR, 'model.ubj')
+SERVING_BUNDLE_SPEC = os.path.join(SERVING_DIR, 'bundle.json')
+SERVING_ARTIFACTS = [SERVING_MODEL_PATH, SERVING_BUNDLE_SPEC]
+# Опорная выборка обучающих строк (матрица признаков) для глобальной важности полей
+EXPLAIN_REFERENCE_PATH = os.path.join(SERVING_DIR, 'reference.npy')
+
+
+def artifact_fingerprint(paths):
+    """Дешёвый отпечаток файлов по размеру и времени изменения"""
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        except OSError:
+            digest.update(f"{path}:missing;".encode())
+    return digest.hexdigest()[:12]
+
+
+def content_hash(paths):
+    """Версия набора артефактов - хэш содержимого файлов"""
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def read_registry(path=REGISTRY_PATH):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_serving_plan(spec_path=SERVING_BUNDLE_SPEC, model_path=SERVING_MODEL_PATH, backend='xgboost'):
+    """
+    План признаков serving-бандла с бустером, загруженным через C API.
+
+    backend - onnx/compiled (serving.backends): если бэкенд не экспортирован или
+    его пакет не установлен, план остаётся на xgboost с записью в лог.
+    """
+    with open(spec_path, 'r') as f:
+        spec = json.load(f)
+    native = NativeBooster(model_path)
+    plan = FeaturePlan.from_spec(native, spec)
+    n_features = plan.booster.num_features()
+    if n_features != plan.n_features:
+        raise ValueError(f"Модель ждёт {n_features} признаков, в bundle.json их {plan.n_features}")
+    try:
+        plan.booster = load_backend(backend, native, spec, os.path.dirname(spec_path))
+    except (ImportError, OSError, ValueError) as e:
+        logger.error(f"Бэкенд {backend} недоступен ({e}), используется xgboost")
+    return plan
+
+
+def load_serving_quantiles(spec_path=SERVING_BUNDLE_SPEC):
+    """Квантильная модель из serving-бандла (ключ quantiles в bundle.json) или None"""
+    with open(spec_path, 'r') as f:
+        spec = json.load(f).get('quantiles')
+    return QuantileModel.from_spec(spec, os.path.dirname(spec_path)) if spec else None
+
+
+def load_bundle(prefer_serving=True, backend='xgboost'):
+    """Serving-бандл, если он экспортирован (старт без pandas/scikit-learn), иначе joblib-артефакты"""
+    if prefer_serving and os.path.exists(SERVING_BUNDLE_SPEC):
+        return ModelBundle.load_serving(backend=backend)
+    if backend != 'xgboost':
+        logger.warning(f"Бэкенд {backend} работает только с serving-бандлом, используется xgboost")
+    return ModelBundle.load()
+
+
+class ModelBundle:
+    """
+    Согласованный набор: модель, энкодер, порядок признаков и план быстрого пути.
+
+    API держит ссылку на один текущий набор и подменяет её целиком, поэтому
+    запрос никогда не видит энкодер от одной версии, а модель от другой.
+    """
+
+    def __init__(self, model, encoder, feature_columns, version, registry=None, plan=None, source='joblib',
+                 quantiles=None):
+        self.model = model
+        self.encoder = encoder
+        self.feature_columns = feature_columns
+        self.version = version
+        self.registry = registry or {}
+        self.plan = plan
+        self.source = source
+        self.quantiles = quantiles
+        self.loaded_at = datetime.now().isoformat()
+        self._importance = None
+        self._importance_lock = threading.Lock()
+        self._fallback_plan = None
+        self._fallback_plan_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        """Бэкенд инференса основной модели: xgboost, onnx или compiled"""
+        if self.plan is None:
+            return 'xgboost'
+        return getattr(self.plan.booster, 'name', 'xgboost')
+
+    @property
+    def categories(self):
+        if self.plan is not None:
+            return self.plan.categories
+        return list(self.encoder.categories_[0])
+
+    @classmethod
+    def load(cls, paths=MODEL_ARTIFACTS, registry_path=REGISTRY_PATH, quantiles_path=QUANTILES_SPEC):
+        import joblib
+
+        model_path, encoder_path, feature_columns_path = paths
+        quantiles = load_quantiles(quantiles_path)
+        version = content_hash(list(paths) + ([quantiles_path] if quantiles is not None else []))
+        model = joblib.load(model_path)
+        encoder = joblib.load(encoder_path)
+        feature_columns = joblib.load(feature_columns_path)
+
+        model_features = model.get_booster().feature_names
+        if model_features and list(model_features) != list(feature_columns):
+            raise ValueError(
+                f"Признаки модели {model_features} не совпадают с feature_columns {feature_columns}"
+            )
+        return cls(model, encoder, feature_columns, version, read_registry(registry_path), quantiles=quantiles)
+
+    @classmethod
+    def load_serving(cls, paths=SERVING_ARTIFACTS, registry_path=REGISTRY_PATH, backend='xgboost'):
+        """Загрузка serving-бандла: ни pandas, ни scikit-learn, ни пакет xgboost не импортируются"""
+        model_path, spec_path = paths
+        plan = load_serving_plan(spec_path, model_path, backend)
+        return cls(None, None, plan.feature_columns, content_hash(paths), read_registry(registry_path),
+                   plan=plan, source='serving', quantiles=load_serving_quantiles(spec_path))
+
+    def prepare(self, nthread=0, fast_path=True):
+        """Настраивает потоки XGBoost, собирает быстрый путь и прогревает модель"""
+        if self.quantiles is not None:
+            if nthread > 0:
+                self.quantiles.booster.set_param({'nthread': nthread})
+            self.quantiles.predict(np.zeros((1, len(self.feature_columns)), dtype=np.float32))
+
+        if self.source == 'serving':
+            if nthread > 0:
+                self.plan.booster.set_param({'nthread': nthread})
+            # Совпадение с моделью проверено при экспорте (src/export_serving.py), здесь только прогрев
+            matrix = self.plan.fill_rows(synthetic_rows(self.plan))
+            predictions = self.plan.predict_matrix(matrix)
+            if self.backend != 'xgboost':
+                # Другой бэкенд дополнительно сверяется с исходным бустером на тех же строках
+                reference = self.plan.booster.reference
+                max_diff, ok = predictions_match(
+                    predictions, reference.inplace_predict(matrix, iteration_range=self.plan.iteration_range)
+                )
+                if not ok:
+                    logger.error(f"Бэкенд {self.backend} расходится с xgboost (max diff {max_diff:.3e}), отключён")
+                    self.plan.booster = reference
+            return self
+
+        if nthread > 0:
+            self.model.set_params(n_jobs=nthread)
+            self.model.get_booster().set_param({'nthread': nthread})
+
+        if not fast_path:
+            return self
+        try:
+            plan = FeaturePlan.from_encoder(self.model, self.encoder, self.feature_columns)
+            # Сверка с DataFrame-путём заодно прогревает модель
+            max_diff, mismatches = check_parity(
+                plan, self.model, self.encoder, self.feature_columns, synthetic_rows(plan)
+            )
+            if mismatches:
+                logger.error(f"Быстрый путь расходится с DataFrame-путём (max diff {max_diff:.3e}), отключён")
+            else:
+                self.plan = plan
+        except Exception as e:
+            logger.error(f"Не удалось собрать план признаков: {e}")
+        return self
+
+    def feature_plan(self):
+        """
+        План признаков: быстрый путь или план по энкодеру, если быстрый путь выключен (explain, квантили).
+
+        План по энкодеру собирается один раз на набор артефактов и переиспользуется запросами.
+        """
+        if self.plan is not None:
+            return self.plan
+        with self._fallback_plan_lock:
+            if self._fallback_plan is None:
+                self._fallback_plan = FeaturePlan.from_encoder(self.model, self.encoder, self.feature_columns)
+            return self._fallback_plan
+
+    def global_importance(self, reference_path=EXPLAIN_REFERENCE_PATH):
+        """
+        Глобальная важность полей - средний |вклад| TreeSHAP на опорной выборке.
+
+        Считается один раз при первом запросе и живёт вместе с набором артефактов,
+        то есть пересчитывается только для новой версии модели.
+        """
+        with self._importance_lock:
+            if self._importance is None:
+                self._importance = self._compute_importance(reference_path)
+            return self._importance
+
+    def _compute_importance(self, reference_path):
+        start = time.perf_counter()
+        plan = self.feature_plan()
+        matrix, reference = None, 'synthetic'
+        if os.path.exists(reference_path):
+            matrix = np.load(reference_path)
+            if matrix.ndim != 2 or matrix.shape[1] != plan.n_features:
+                logger.warning(f"{reference_path}: {matrix.shape} не совпадает с моделью, берутся синтетические строки")
+                matrix = None
+            else:
+                reference = 'training_sample'
+        if matrix is None:
+            matrix = plan.fill_rows(synthetic_rows(plan))
+
+        names, contributions = plan.contributions(matrix)
+        mean_abs = np.abs(contributions[:, :-1]).mean(axis=0)
+        mean = contributions[:, :-1].mean(axis=0)
+        order = np.argsort(-mean_abs)
+        return {
+            "version": self.version,
+            "reference": reference,
+            "n_rows": len(matrix),
+            "base_value": round(float(contributions[:, -1].mean()), 2),
+            "mean_abs_contribution": {names[i]: round(float(mean_abs[i]), 2) for i in order},
+            "mean_contribution": {names[i]: round(float(mean[i]), 2) for i in order},
+            "computed_at": datetime.now().isoformat(),
+            "elapsed_s": time.perf_counter() - start
+        }
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "registry_version": self.registry.get('model_version'),
+            "run_id": self.registry.get('run_id'),
+            "loaded_at": self.loaded_at,
+            "source": self.source,
+            "fast_path": self.plan is not None,
+            "backend": self.backend,
+            "quantiles": self.quantiles.labels if self.quantiles is not None else None
+        }
+
+
+class ArtifactWatcher(threading.Thread):
+    """
+    Фоновый поток, следящий за артефактами модели и registry/model_info.json.
+
+    Перезагрузка вызывается, только когда отпечаток файлов изменился и не менялся
+    между двумя опросами подряд - так не подхватываются наполовину записанные файлы.
+    """
+
+    def __init__(self, paths, on_change, interval=10.0):
+        super().__init__(name='npv-artifact-watcher', daemon=True)
+        self.paths = list(paths)
+        self.on_change = on_change
+        self.interval = interval
+        self.current = artifact_fingerprint(self.paths)
+        self._stop_event = threading.Event()
+
+    def mark_current(self):
+        """Запоминает текущее состояние файлов (после ручной перезагрузки)"""
+        self.current = artifact_fingerprint(self.paths)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        pending = None
+        while not self._stop_event.wait(self.interval):
+            fingerprint = artifact_fingerprint(self.paths)
+            if fingerprint == self.current:
+                pending = None
+                continue
+            if fingerprint != pending:
+                pending = fingerprint
+                continue
+            try:
+                self.on_change()
+            except Exception as e:
+                logger.error(f"Ошибка автоматической перезагрузки модели: {e}")
+            self.current = fingerprint
+            pending = None
@@ -0,0 +1,95 @@
+"""Ограниченный LRU-кэш предсказаний с TTL и инвалидацией по версии модели."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    LRU-кэш предсказаний, ключ - канонизированный вектор признаков скважины.
+
+    При precision != None числовые поля округляются до precision знаков,
+    и близкие запросы (например, из параметрических перечётов) делят одну запись.
+    Кэш сбрасывается при смене версии загруженной модели (set_version).
+    """
+
+    def __init__(self, max_size=10000, ttl_seconds=3600.0, precision=None, fields=()):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.precision = precision
+        self.fields = tuple(fields)
+        self.version = None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def key(self, values):
+        """Канонический ключ: значения полей в фиксированном порядке"""
+        if self.precision is None:
+            return tuple(
+                v if isinstance(v, str) else float(v) for v in (values[f] for f in self.fields)
+            )
+        return tuple(
+            v if isinstance(v, str) else round(float(v), self.precision)
+            for v in (values[f] for f in self.fields)
+        )
+
+    def set_version(self, version):
+        """Привязывает кэш к версии модели; при смене версии кэш очищается"""
+        with self._lock:
+            if version != self.version:
+                if self._data:
+                    self.invalidations += 1
+                self._data.clear()
+                self.version = version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version=None):
+        """Сохраняет значение; результат устаревшей версии модели не сохраняется"""
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "precision": self.precision,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,302 @@
+"""
+Мониторинг дрейфа входных данных API относительно обучающей выборки.
+
+Опорный профиль (models/drift_profile.json) пишет src/preprocess.py: для числовых
+полей - границы децилей и доли строк в них, перцентили, среднее; для категориальных -
+доли категорий. DriftMonitor копит по живому трафику скетчи постоянного размера:
+
+  * счётчики строк по бинам опорных децилей (PSI) и вне диапазона обучающей выборки;
+  * счётчики категорий, включая неизвестные энкодеру (не больше MAX_UNKNOWN_CATEGORIES);
+  * равномерную выборку строк фиксированного размера (reservoir sampling, алгоритм R):
+    по ней считаются KS-статистика и живые перцентили.
+
+В пути запроса строка только кладётся в ограниченную очередь (put_nowait); скетчи
+обновляет фоновый поток пакетами. При заполненной очереди строки отбрасываются
+и учитываются в dropped - запрос никогда не ждёт монитор.
+"""
+import json
+import logging
+import queue
+import threading
+
+import numpy as np
+
+from serving.features import to_float_array
+
+logger = logging.getLogger(__name__)
+
+# Пороги PSI: < 0.1 - без дрейфа, 0.1-0.25 - умеренный, >= 0.25 - значимый
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+PSI_EPS = 1e-4  # сглаживание пустых бинов
+# Критическое значение KS при уровне 5 %: KS_COEFFICIENT * sqrt((n + m) / (n * m))
+KS_COEFFICIENT = 1.36
+MAX_UNKNOWN_CATEGORIES = 100
+OTHER_CATEGORY = '__other__'
+REPORT_PERCENTILES = (5, 50, 95)
+
+
+def as_float(values):
+    """
+    Значения колонки как float32 - в той же точности, что видит модель и что записана
+    в профиле (0.1 из запроса совпадает с границей 0.1 обучающей выборки); нечисловые - NaN.
+    """
+    return to_float_array(values).astype(np.float32)
+
+
+def psi(expected, actual):
+    """Population Stability Index между долями expected (профиль) и actual (трафик)"""
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), PSI_EPS)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), PSI_EPS)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks_statistic(sample, quantiles):
+    """
+    KS-статистика выборки трафика против опорного распределения, заданного перцентилями.
+
+    Обе функции распределения непрерывны справа и сравниваются во всех точках выборки
+    и сетки перцентилей; точность опорной - шаг сетки (1 %).
+    """
+    sample = np.sort(sample)
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    points = np.concatenate([sample, quantiles])
+    live = np.searchsorted(sample, points, side='right') / len(sample)
+    reference = np.clip(np.searchsorted(quantiles, points, side='right') - 1, 0, None) / (len(quantiles) - 1)
+    return float(np.max(np.abs(live - reference)))
+
+
+def status(psi_value, ks_value=None, ks_critical=None):
+    if psi_value >= PSI_SIGNIFICANT:
+        return 'significant'
+    if psi_value >= PSI_MODERATE or (ks_value is not None and ks_value > ks_critical):
+        return 'moderate'
+    return 'none'
+
+
+class DriftMonitor(threading.Thread):
+    """
+    Фоновый поток со скетчами распределения входных полей.
+
+    observe / observe_columns вызываются из обработчиков запросов и только ставят
+    данные в очередь; report() собирает PSI/KS по текущим скетчам.
+    """
+
+    def __init__(self, profile, reservoir_size=2000, queue_size=10000, max_items=1000, min_rows=100, seed=None):
+        super().__init__(name='npv-drift-monitor', daemon=True)
+        self.profile = profile
+        self.numeric = list(profile['numeric'])
+        self.categorical = list(profile['categorical'])
+        self.fields = self.numeric + self.categorical
+        self.reservoir_size = reservoir_size
+        self.max_items = max_items
+        self.min_rows = min_rows
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.dropped = 0
+        self.errors = 0
+        self.reset()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path, 'r') as f:
+            return cls(json.load(f), **kwargs)
+
+    def reset(self):
+        """Обнуляет скетчи (например, после переобучения на новых данных)"""
+        with self._lock:
+            self.n_rows = 0
+            self.bin_counts = {
+                name: np.zeros(len(spec['edges']) + 1, dtype=np.int64) for name, spec in self.profile['numeric'].items()
+            }
+            self.below = dict.fromkeys(self.numeric, 0)
+            self.above = dict.fromkeys(self.numeric, 0)
+            self.missing = dict.fromkeys(self.fields, 0)
+            self.sums = dict.fromkeys(self.numeric, 0.0)
+            self.category_counts = {name: {} for name in self.categorical}
+            self.reservoir = np.full((self.reservoir_size, len(self.numeric)), np.nan)
+            self.reservoir_categories = np.empty((self.reservoir_size, len(self.categorical)), dtype=object)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    # --- путь запроса: только очередь ---
+
+    def observe(self, row):
+        """Одна строка входа ({поле: значение}); не блокирует"""
+        self._put(('row', row))
+
+    def observe_columns(self, columns, n_rows):
+        """Пакет в колоночном виде ({поле: [значения]}); не блокирует"""
+        self._put(('columns', (columns, n_rows)))
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    # --- фоновый поток ---
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                items = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(items) < self.max_items:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.update(items)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Ошибка обновления скетчей дрейфа: {e}")
+
+    def update(self, items):
+        """Одиночные строки собираются в колонки, каждый пакет - отдельным векторным обновлением"""
+        rows = [payload for kind, payload in items if kind == 'row']
+        batches = [payload for kind, payload in items if kind == 'columns']
+        if rows:
+            batches.append(({name: [row.get(name) for row in rows] for name in self.fields}, len(rows)))
+        for columns, n_rows in batches:
+            if n_rows:
+                self._update_columns(columns, n_rows)
+
+    def _update_columns(self, columns, n_rows):
+        numeric = np.column_stack([
+            as_float(columns[name]) if name in columns else np.full(n_rows, np.nan, dtype=np.float32) for name in self.numeric
+        ]) if self.numeric else np.empty((n_rows, 0))
+        categorical = np.empty((n_rows, len(self.categorical)), dtype=object)
+        for j, name in enumerate(self.categorical):
+            categorical[:, j] = columns.get(name, [None] * n_rows)
+
+        with self._lock:
+            for j, name in enumerate(self.numeric):
+                values = numeric[:, j]
+                present = values[~np.isnan(values)]
+                spec = self.profile['numeric'][name]
+                self.missing[name] += n_rows - len(present)
+                self.sums[name] += float(present.sum(dtype=np.float64))
+                self.below[name] += int(np.count_nonzero(present < spec['quantiles'][0]))
+                self.above[name] += int(np.count_nonzero(present > spec['quantiles'][-1]))
+                self.bin_counts[name] += np.bincount(
+                    np.searchsorted(spec['edges'], present, side='right'), minlength=len(spec['edges']) + 1
+                )
+            for j, name in enumerate(self.categorical):
+                self._count_categories(name, categorical[:, j])
+            self._sample(numeric, categorical)
+            self.n_rows += n_rows
+
+    def _count_categories(self, name, values):
+        counts = self.category_counts[name]
+        known = self.profile['categorical'][name]['proportions']
+        labels, frequencies = np.unique(np.array([str(v) for v in values if v is not None]), return_counts=True)
+        self.missing[name] += sum(v is None for v in values)
+        n_unknown = sum(label not in known for label in counts)
+        for label, frequency in zip(labels.tolist(), frequencies.tolist()):
+            if label not in known and label not in counts:
+                if n_unknown >= MAX_UNKNOWN_CATEGORIES:
+                    label = OTHER_CATEGORY
+                else:
+                    n_unknown += 1
+            counts[label] = counts.get(label, 0) + frequency
+
+    def _sample(self, numeric, categorical):
+        """Reservoir sampling (алгоритм R) для пакета строк одним векторным шагом"""
+        seen = self.n_rows + np.arange(len(numeric))
+        slots = np.where(seen < self.reservoir_size, seen, self._rng.integers(0, seen + 1))
+        keep = slots < self.reservoir_size
+        self.reservoir[slots[keep]] = numeric[keep]
+        self.reservoir_categories[slots[keep]] = categorical[keep]
+
+    # --- отчёт ---
+
+    def sample(self):
+        """Строки равномерной выборки трафика ({поле: значение})"""
+        with self._lock:
+            n = min(self.n_rows, self.reservoir_size)
+            numeric = self.reservoir[:n].copy()
+            categorical = self.reservoir_categories[:n].copy()
+        return [
+            {**dict(zip(self.numeric, (None if np.isnan(v) else float(v) for v in numeric[i]))),
+             **dict(zip(self.categorical, categorical[i].tolist()))}
+            for i in range(n)
+        ]
+
+    def report(self):
+        """PSI/KS и сводка по каждому полю: {"n_rows": ..., "features": {...}, "drifted": [...]}"""
+        with self._lock:
+            n_rows = self.n_rows
+            n_sample = min(n_rows, self.reservoir_size)
+            reservoir = self.reservoir[:n_sample].copy()
+            bin_counts = {name: counts.copy() for name, counts in self.bin_counts.items()}
+            category_counts = {name: dict(counts) for name, counts in self.category_counts.items()}
+            below, above, missing, sums = dict(self.below), dict(self.above), dict(self.missing), dict(self.sums)
+
+        sufficient = n_rows >= self.min_rows
+        features = {}
+        for j, name in enumerate(self.numeric):
+            spec = self.profile['numeric'][name]
+            present = int(bin_counts[name].sum())
+            values = reservoir[:, j][~np.isnan(reservoir[:, j])]
+            result = {'type': 'numeric', 'n': present, 'missing': missing[name]}
+            if present:
+                ks_critical = float(KS_COEFFICIENT * np.sqrt(
+                    (len(values) + self.profile['n_rows']) / (len(values) * self.profile['n_rows'])
+                )) if len(values) else None
+                result.update(
+                    psi=psi(spec['proportions'], bin_counts[name] / present),
+                    ks=ks_statistic(values, spec['quantiles']) if len(values) else None,
+                    ks_critical=ks_critical,
+                    out_of_range_share=(below[name] + above[name]) / present,
+                    live={'mean': sums[name] / present,
+                          **{f'p{p:02d}': float(np.percentile(values, p)) for p in REPORT_PERCENTILES if len(values)}},
+                    reference={'mean': spec['mean'], **{
+                        f'p{p:02d}': spec['quantiles'][round(p / 100 * (len(spec['quantiles']) - 1))]
+                        for p in REPORT_PERCENTILES
+                    }},
+                )
+                result['status'] = status(result['psi'], result['ks'], ks_critical) if sufficient else 'insufficient_data'
+            features[name] = result
+
+        for name in self.categorical:
+            known = self.profile['categorical'][name]['proportions']
+            counts = category_counts[name]
+            present = sum(counts.values())
+            unknown = {label: count for label, count in counts.items() if label not in known}
+            result = {'type': 'categorical', 'n': present, 'missing': missing[name], 'unknown': unknown}
+            if present:
+                labels = list(known) + list(unknown)
+                result.update(
+                    psi=psi([known.get(label, 0.0) for label in labels],
+                            [counts.get(label, 0) / present for label in labels]),
+                    live={label: counts.get(label, 0) / present for label in labels},
+                    reference=dict(known),
+                )
+                # Неизвестные категории энкодер отвергает: такие запросы модель не считает
+                result['status'] = (
+                    'significant' if unknown else status(result['psi'])
+                ) if sufficient else 'insufficient_data'
+            features[name] = result
+
+        return {
+            'n_rows': n_rows,
+            'min_rows': self.min_rows,
+            'sample_size': n_sample,
+            'queue_depth': self.queue_depth,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'reference_rows': self.profile['n_rows'],
+            'reference_data_hash': self.profile.get('data_hash'),
+            'features': features,
+            'drifted': [name for name, result in features.items() if result.get('status') in ('moderate', 'significant')],
+        }
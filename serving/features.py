@@ -0,0 +1,257 @@
+"""Векторизованная валидация и подготовка признаков для инференса."""
+import threading
+
+import numpy as np
+
+
+def field_specs(input_model):
+    """Ограничения полей pydantic-модели: {поле: (тип, ge, le)}"""
+    specs = {}
+    for name, field in input_model.model_fields.items():
+        ge = le = None
+        for constraint in field.metadata:
+            ge = getattr(constraint, 'ge', ge)
+            le = getattr(constraint, 'le', le)
+        specs[name] = (field.annotation, ge, le)
+    return specs
+
+
+class InvalidInputError(ValueError):
+    """Вход скважины не может быть посчитан моделью (например, неизвестная категория)"""
+
+
+def rows_to_columns(rows, names):
+    """Переводит список словарей-скважин в колоночное представление"""
+    return {
+        name: [row.get(name) if isinstance(row, dict) else None for row in rows]
+        for name in names
+    }
+
+
+def to_float_array(values):
+    """Приводит список значений к float64; нечисловые значения становятся NaN"""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        arr = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                arr[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return arr
+
+
+def validate_columns(columns, specs, categories, n_rows):
+    """
+    Проверяет колонки целиком по ограничениям InputData.
+
+    Возвращает (arrays, errors): arrays - {поле: np.ndarray},
+    errors - {индекс строки: [сообщения]} для невалидных строк.
+    """
+    errors = {}
+    arrays = {}
+
+    def report(mask, message):
+        for i in np.flatnonzero(mask):
+            errors.setdefault(int(i), []).append(message)
+
+    for name, (annotation, ge, le) in specs.items():
+        values = columns.get(name)
+        if values is None:
+            report(np.ones(n_rows, dtype=bool), f"{name}: обязательное поле")
+            continue
+
+        if annotation is str:
+            arr = np.asarray([v if isinstance(v, str) else None for v in values], dtype=object)
+            report(arr == None, f"{name}: ожидается строка")  # noqa: E711
+            unknown = (arr != None) & ~np.isin(arr, categories)  # noqa: E711
+            report(unknown, f"{name}: неизвестная категория, допустимы {list(categories)}")
+            arrays[name] = arr
+            continue
+
+        arr = to_float_array(values)
+        missing = np.isnan(arr)
+        report(missing, f"{name}: ожидается число")
+        if annotation is int:
+            report(~missing & (arr != np.floor(arr)), f"{name}: ожидается целое число")
+        if ge is not None:
+            report(arr < ge, f"{name}: значение должно быть >= {ge}")
+        if le is not None:
+            report(arr > le, f"{name}: значение должно быть <= {le}")
+        arrays[name] = arr
+
+    return arrays, errors
+
+
+def build_feature_matrix(arrays, encoder, feature_columns, categorical_column='GS'):
+    """
+    Собирает матрицу признаков в порядке feature_columns.
+
+    Категориальный признак кодируется одним вызовом encoder.transform на весь пакет.
+    """
+    encoded = encoder.transform(arrays[categorical_column].reshape(-1, 1))
+    encoded_names = encoder.get_feature_names_out([categorical_column])
+    columns = {name: encoded[:, j] for j, name in enumerate(encoded_names)}
+    columns.update({k: v for k, v in arrays.items() if k != categorical_column})
+    return np.column_stack([columns[name] for name in feature_columns])
+
+
+def iteration_range(model):
+    """Диапазон деревьев, который использует model.predict (учитывает early stopping)"""
+    try:
+        return (0, model.best_iteration + 1)
+    except AttributeError:
+        return (0, 0)
+
+
+class FeaturePlan:
+    """
+    Скомпилированная при старте схема заполнения строки признаков.
+
+    Каждому числовому полю InputData и каждой категории GS сопоставлен
+    фиксированный слот в строке float32 в порядке feature_columns, поэтому
+    одиночный запрос обходится без pandas и идёт сразу в booster.inplace_predict.
+
+    Схему можно собрать из обученного OneHotEncoder (from_encoder) или из
+    JSON-описания serving-бандла (from_spec) - тогда scikit-learn не нужен.
+    """
+
+    def __init__(self, booster, feature_columns, category_slots, iteration_range=(0, 0),
+                 categorical_column='GS'):
+        self.feature_columns = list(feature_columns)
+        self.categorical_column = categorical_column
+        self.n_features = len(self.feature_columns)
+        # Для каждой категории - слоты, в которые encoder ставит ненулевые значения
+        self.category_slots = {
+            category: tuple((int(slot), float(value)) for slot, value in slots)
+            for category, slots in category_slots.items()
+        }
+        encoded_slots = {slot for slots in self.category_slots.values() for slot, _ in slots}
+        self.numeric_slots = tuple(
+            (name, slot) for slot, name in enumerate(self.feature_columns) if slot not in encoded_slots
+        )
+        self.booster = booster
+        self.iteration_range = tuple(iteration_range)
+        self._local = threading.local()
+
+    @classmethod
+    def from_encoder(cls, model, encoder, feature_columns, categorical_column='GS'):
+        """Схема по обученной модели и OneHotEncoder"""
+        slots = {name: i for i, name in enumerate(feature_columns)}
+        encoded_names = list(encoder.get_feature_names_out([categorical_column]))
+        category_slots = {}
+        for category in encoder.categories_[0]:
+            encoded = encoder.transform(np.array([[category]], dtype=object))[0]
+            category_slots[category] = [
+                (slots[encoded_names[j]], float(encoded[j])) for j in np.flatnonzero(encoded)
+            ]
+        return cls(model.get_booster(), feature_columns, category_slots, iteration_range(model),
+                   categorical_column)
+
+    @classmethod
+    def from_spec(cls, booster, spec):
+        """Схема из bundle.json serving-бандла"""
+        return cls(booster, spec['feature_columns'], spec['category_slots'], spec['iteration_range'],
+                   spec['categorical_column'])
+
+    def to_spec(self):
+        return {
+            "feature_columns": self.feature_columns,
+            "categorical_column": self.categorical_column,
+            "category_slots": {category: [list(s) for s in slots] for category, slots in self.category_slots.items()},
+            "iteration_range": list(self.iteration_range),
+        }
+
+    @property
+    def categories(self):
+        return list(self.category_slots)
+
+    def _buffer(self):
+        buf = getattr(self._local, 'buf', None)
+        if buf is None:
+            buf = self._local.buf = np.zeros((1, self.n_features), dtype=np.float32)
+        return buf
+
+    def check(self, values):
+        """Проверяет, что категория скважины известна энкодеру"""
+        category = values[self.categorical_column]
+        if category not in self.category_slots:
+            raise InvalidInputError(f"Неизвестная категория {self.categorical_column}: {category!r}")
+
+    def _fill_row(self, row, values):
+        self.check(values)
+        row.fill(0.0)
+        for name, slot in self.numeric_slots:
+            row[slot] = values[name]
+        for slot, value in self.category_slots[values[self.categorical_column]]:
+            row[slot] = value
+
+    def fill(self, values):
+        """Заполняет переиспользуемый буфер потока значениями одной скважины"""
+        buf = self._buffer()
+        self._fill_row(buf[0], values)
+        return buf
+
+    def fill_columns(self, arrays):
+        """Матрица признаков float32 по провалидированным колонкам пакета (см. validate_columns)"""
+        values = arrays[self.categorical_column]
+        matrix = np.zeros((len(values), self.n_features), dtype=np.float32)
+        for name, slot in self.numeric_slots:
+            matrix[:, slot] = arrays[name]
+        for category, slots in self.category_slots.items():
+            if not slots:
+                continue
+            mask = values == category
+            for slot, value in slots:
+                matrix[mask, slot] = value
+        return matrix
+
+    def fill_rows(self, rows):
+        """Матрица признаков float32 для списка скважин"""
+        matrix = np.zeros((len(rows), self.n_features), dtype=np.float32)
+        for row, values in zip(matrix, rows):
+            self._fill_row(row, values)
+        return matrix
+
+    def predict_matrix(self, matrix):
+        """booster.inplace_predict по заполненной матрице признаков"""
+        return self.booster.inplace_predict(matrix, iteration_range=self.iteration_range)
+
+    def contribution_groups(self):
+        """Имена исходных полей (+ bias) и матрица, суммирующая вклады GS_* колонок в поле GS"""
+        groups = getattr(self, '_groups', None)
+        if groups is None:
+            numeric = dict((slot, name) for name, slot in self.numeric_slots)
+            names = [name for name, _ in self.numeric_slots] + [self.categorical_column, 'bias']
+            index = {name: i for i, name in enumerate(names)}
+            matrix = np.zeros((self.n_features + 1, len(names)), dtype=np.float64)
+            for slot in range(self.n_features):
+                matrix[slot, index[numeric.get(slot, self.categorical_column)]] = 1.0
+            matrix[self.n_features, index['bias']] = 1.0
+            groups = self._groups = (names, matrix)
+        return groups
+
+    def contributions(self, matrix):
+        """
+        Вклады исходных полей в предсказание (TreeSHAP, pred_contribs) по заполненной матрице.
+
+        Возвращает (имена полей + 'bias', массив (строки, поля + 1)); сумма по строке равна предсказанию.
+        """
+        if hasattr(self.booster, 'predict_contribs'):
+            raw = self.booster.predict_contribs(matrix, self.iteration_range)
+        else:
+            import xgboost as xgb
+
+            dmatrix = xgb.DMatrix(matrix, feature_names=self.feature_columns)
+            raw = self.booster.predict(dmatrix, pred_contribs=True, iteration_range=self.iteration_range)
+        names, groups = self.contribution_groups()
+        return names, raw @ groups
+
+    def predict_one(self, values):
+        """Предсказание для одной скважины (словарь полей InputData)"""
+        return float(self.predict_matrix(self.fill(values))[0])
+
+    def predict_rows(self, rows):
+        """Предсказания для списка скважин одним вызовом booster.inplace_predict"""
+        return self.predict_matrix(self.fill_rows(rows)).tolist()
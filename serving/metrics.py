@@ -0,0 +1,245 @@
+"""Метрики сервиса в текстовом формате Prometheus (без внешних зависимостей)."""
+import bisect
+import math
+import threading
+import time
+
+# Границы корзин: задержки в секундах и размеры пакетов в строках
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096, 16384, 65536)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+# Значения изменяются без блокировок: под GIL гонка потоков может потерять
+# единичный инкремент, что допустимо для мониторинга и дешевле lock на каждый запрос.
+class _CounterValue:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # последняя корзина - +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    """Метрика с набором меток; дочерние значения создаются при первом обращении"""
+
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def _new_value(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_value())
+        return child
+
+    def clear(self):
+        with self._lock:
+            self._children = {}
+
+    def _samples(self, values, child):
+        yield self.name + _labels(self.labelnames, values), child.value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        for values, child in list(self._children.items()):
+            lines.extend(f'{name} {_number(value)}' for name, value in self._samples(values, child))
+        return lines
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def _new_value(self):
+        return _CounterValue()
+
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def _new_value(self):
+        return _GaugeValue()
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_value(self):
+        return _HistogramValue(self.bounds)
+
+    def _samples(self, values, child):
+        counts = list(child.counts)
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), counts):
+            cumulative += count
+            yield self.name + '_bucket' + _labels(self.labelnames, values, [('le', _number(bound))]), cumulative
+        yield self.name + '_sum' + _labels(self.labelnames, values), child.sum
+        yield self.name + '_count' + _labels(self.labelnames, values), cumulative
+
+
+class MetricsRegistry:
+    """Набор метрик и вычисляемых при выдаче gauge"""
+
+    def __init__(self):
+        self._metrics = []
+        self._callbacks = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name, documentation, fn):
+        """Gauge, значение которого считается при каждой выдаче /metrics (None - пропустить)"""
+        self._callbacks.append((name, documentation, fn))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, documentation, fn in self._callbacks:
+            value = fn()
+            if value is not None:
+                lines.extend([f'# HELP {name} {documentation}', f'# TYPE {name} gauge', f'{name} {_number(value)}'])
+        return '\n'.join(lines) + '\n'
+
+
+class ServiceMetrics:
+    """Метрики API: запросы, ошибки, задержки по этапам, размеры пакетов, версия модели"""
+
+    def __init__(self):
+        self.registry = registry = MetricsRegistry()
+        self.requests = registry.register(Counter(
+            'npv_requests_total', 'Число HTTP-запросов', ('endpoint', 'status')
+        ))
+        self.errors = registry.register(Counter(
+            'npv_request_errors_total', 'Число запросов с ответом 4xx/5xx', ('endpoint', 'status')
+        ))
+        self.in_flight = registry.register(Gauge(
+            'npv_requests_in_flight', 'Запросы в обработке'
+        )).labels()
+        self.latency = registry.register(Histogram(
+            'npv_request_latency_seconds', 'Полное время обработки запроса', ('endpoint', 'model_version')
+        ))
+        self.stage_latency = registry.register(Histogram(
+            'npv_stage_latency_seconds', 'Время этапа обработки: validate, encode, frame, predict',
+            ('stage', 'endpoint', 'model_version')
+        ))
+        self.batch_size = registry.register(Histogram(
+            'npv_batch_size', 'Строк в одном вызове модели', ('source', 'model_version'), buckets=BATCH_SIZE_BUCKETS
+        ))
+        self.model_info = registry.register(Gauge(
+            'npv_model_info', 'Загруженная версия модели', ('model_version',)
+        ))
+
+    def observe_stage(self, stage, endpoint, version, seconds):
+        self.stage_latency.labels(stage, endpoint, version).observe(seconds)
+
+    def set_model_version(self, version):
+        self.model_info.clear()
+        if version is not None:
+            self.model_info.labels(version).set(1)
+
+    def render(self):
+        return self.registry.render()
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: счётчики запросов и ошибок, запросы в обработке и полная задержка.
+
+    Путь, не входящий в endpoints, учитывается как "other", чтобы число рядов было ограничено.
+    """
+
+    def __init__(self, app, metrics, endpoints, version=lambda: None):
+        self.app = app
+        self.metrics = metrics
+        self.endpoints = frozenset(endpoints)
+        self.version = version
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        path = scope['path']
+        endpoint = path if path in self.endpoints else 'other'
+        status = 500
+        metrics = self.metrics
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        metrics.in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.in_flight.dec()
+            metrics.requests.labels(endpoint, status).inc()
+            if status >= 400:
+                metrics.errors.labels(endpoint, status).inc()
+            metrics.latency.labels(endpoint, self.version()).observe(elapsed)
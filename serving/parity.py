@@ -0,0 +1,119 @@
+"""
+Проверка совпадения быстрого пути FeaturePlan с эталонным DataFrame-путём.
+
+Запуск: python -m serving.parity (из корня репозитория, после dvc repro).
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from serving.features import FeaturePlan
+
+TOLERANCE = 1e-6
+
+
+def predict_dataframe(model, encoder, feature_columns, input_dict, observe=None):
+    """
+    Эталонный путь: словарь -> одна строка DataFrame -> model.predict.
+
+    observe(stage, seconds), если задан, получает время этапов encode, frame и predict.
+    """
+    # pandas нужен только эталонному пути: serving-бандл стартует без него
+    import pandas as pd
+
+    start = time.perf_counter()
+    numeric_data = {k: v for k, v in input_dict.items() if k != 'GS'}
+
+    gs_encoded = encoder.transform([[input_dict['GS']]])
+    gs_columns = encoder.get_feature_names_out(['GS'])
+    gs_data = dict(zip(gs_columns, gs_encoded[0]))
+    encoded = time.perf_counter()
+
+    all_data = {**numeric_data, **gs_data}
+    input_processed = pd.DataFrame([all_data])[feature_columns]
+    framed = time.perf_counter()
+
+    prediction = model.predict(input_processed)
+    if observe is not None:
+        observe('encode', encoded - start)
+        observe('frame', framed - encoded)
+        observe('predict', time.perf_counter() - framed)
+    return float(prediction[0])
+
+
+def synthetic_rows(plan, n_per_category=5, seed=42):
+    """Синтетические скважины: по n_per_category на каждую категорию GS"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for category in plan.category_slots:
+        for _ in range(n_per_category):
+            row = {name: round(float(rng.uniform(0, 1000)), 3) for name, _ in plan.numeric_slots}
+            row[plan.categorical_column] = category
+            rows.append(row)
+    return rows
+
+
+def dataset_rows(X, encoder, plan, limit=None):
+    """Восстанавливает исходные поля скважин из обработанной матрицы признаков"""
+    X = X if limit is None else X.iloc[:limit]
+    encoded_names = encoder.get_feature_names_out([plan.categorical_column])
+    categories = encoder.inverse_transform(X[encoded_names].to_numpy())[:, 0]
+    numeric_names = [name for name, _ in plan.numeric_slots]
+    rows = X[numeric_names].to_dict('records')
+    for row, category in zip(rows, categories):
+        row[plan.categorical_column] = category
+    return rows
+
+
+def check_parity(plan, model, encoder, feature_columns, rows, tolerance=TOLERANCE):
+    """Возвращает (максимальное расхождение, индексы строк с расхождением > tolerance)"""
+    max_diff = 0.0
+    mismatches = []
+    for i, row in enumerate(rows):
+        diff = abs(plan.predict_one(row) - predict_dataframe(model, encoder, feature_columns, row))
+        max_diff = max(max_diff, diff)
+        if diff > tolerance:
+            mismatches.append(i)
+    return max_diff, mismatches
+
+
+def main():
+    import joblib
+    import yaml
+
+    from serving.bundle import SERVING_BUNDLE_SPEC, load_serving_plan
+    from src.dataset import as_frame, load_processed
+
+    with open("params.yaml", "r") as f:
+        params = yaml.safe_load(f)
+
+    model = joblib.load('models/model.joblib')
+    encoder = joblib.load('models/encoder.joblib')
+    feature_columns = joblib.load('models/feature_columns.joblib')
+    data = load_processed(params['data']['processed_path'])
+
+    plans = {'joblib': FeaturePlan.from_encoder(model, encoder, feature_columns)}
+    if os.path.exists(SERVING_BUNDLE_SPEC):
+        # План serving-бандла (UBJSON + bundle.json) сверяется с тем же эталоном
+        plans['serving_bundle'] = load_serving_plan()
+    suites = {
+        'synthetic': synthetic_rows(plans['joblib'], n_per_category=50),
+        'test_split': dataset_rows(as_frame(data['X_test'], data['feature_names']), encoder, plans['joblib']),
+    }
+
+    failed = False
+    for plan_name, plan in plans.items():
+        for name, rows in suites.items():
+            max_diff, mismatches = check_parity(plan, model, encoder, feature_columns, rows)
+            status = "✅" if not mismatches else "❌"
+            print(f"{status} {plan_name}/{name}: {len(rows)} строк, max |diff| = {max_diff:.3e}, "
+                  f"расхождений: {len(mismatches)}")
+            failed = failed or bool(mismatches)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Квантильная модель для интервала прогноза (P10/P50/P90).
+
+Все квантили даёт один бустер reg:quantileerror с вектором quantile_alpha
+(src/train.py), поэтому интервал для строки или пакета считается одним вызовом
+inplace_predict по той же матрице признаков, что и точечный прогноз.
+"""
+import json
+import os
+
+import numpy as np
+
+from serving.booster import NativeBooster
+
+QUANTILES_DIR = 'models/quantiles'
+QUANTILES_SPEC = os.path.join(QUANTILES_DIR, 'quantiles.json')
+
+
+def quantile_label(alpha):
+    """0.1 -> 'P10'"""
+    return f"P{round(alpha * 100):g}"
+
+
+class QuantileModel:
+    """Бустер с выходом на каждый квантиль; выход упорядочен по возрастанию alpha"""
+
+    def __init__(self, booster, alphas, iteration_range=(0, 0)):
+        self.booster = booster
+        self.alphas = [float(a) for a in alphas]
+        self.order = np.argsort(self.alphas)
+        self.labels = [quantile_label(self.alphas[i]) for i in self.order]
+        self.iteration_range = tuple(iteration_range)
+
+    @classmethod
+    def from_spec(cls, spec, directory):
+        """По описанию {"alphas", "model_file", "iteration_range"} из quantiles.json или bundle.json"""
+        booster = NativeBooster(os.path.join(directory, spec['model_file']))
+        return cls(booster, spec['alphas'], spec.get('iteration_range', (0, 0)))
+
+    def to_spec(self, model_file):
+        return {
+            'alphas': self.alphas,
+            'model_file': model_file,
+            'iteration_range': list(self.iteration_range),
+        }
+
+    def predict(self, matrix):
+        """Матрица (строки, квантили) по возрастанию alpha; пересечения квантилей устраняются сортировкой"""
+        raw = self.booster.inplace_predict(matrix, iteration_range=self.iteration_range)
+        raw = raw.reshape(len(matrix), -1)[:, self.order]
+        return np.sort(raw, axis=1)
+
+    def columns(self, matrix):
+        """{"P10": массив, "P50": ..., "P90": ...}"""
+        values = self.predict(matrix)
+        return {label: values[:, j] for j, label in enumerate(self.labels)}
+
+
+def load_quantiles(spec_path=QUANTILES_SPEC):
+    """Квантильная модель из models/quantiles или None, если она не обучалась"""
+    try:
+        with open(spec_path, 'r') as f:
+            spec = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not spec.get('enabled', False):
+        return None
+    return QuantileModel.from_spec(spec, os.path.dirname(spec_path))
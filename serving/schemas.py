@@ -0,0 +1,15 @@
+"""Схема входных данных скважины (общая для API, what-if сетки и бенчмарков)."""
+from pydantic import BaseModel, Field
+
+
+# Модель входных данных
+class InputData(BaseModel):
+    Heff: float = Field(..., ge=0, description="Эффективная толщина")
+    Perm: float = Field(..., ge=0, description="Проницаемость")
+    Sg: float = Field(..., ge=0, le=1, description="Газонасыщенность")
+    L_hor: float = Field(..., ge=0, description="Горизонтальная длина")
+    GS: str = Field(..., description="Тип ствола")
+    temp: float = Field(..., ge=0, description="Темп падения")
+    C5: float = Field(..., ge=0, description="Содержание C5")
+    GRP: int = Field(..., ge=0, description="ГРП")
+    nGS: int = Field(..., ge=0, description="Количество стволов")
@@ -0,0 +1,203 @@
+"""
+What-if анализ: NPV на декартовой сетке значений параметров скважины.
+
+Сетка не материализуется целиком: точки генерируются чанками по плоскому
+индексу (np.unravel_index), каждый чанк собирается в матрицу float32 и
+считается одним вызовом booster.inplace_predict. Кривые по осям и argmax
+накапливаются потоково, поэтому память ограничена размером чанка
+(плюс поверхность NPV, если она запрошена и не больше max_surface_points).
+
+    from serving.sweep import sweep
+    result = sweep(base_well, {"L_hor": {"start": 300, "stop": 1500, "num": 100},
+                               "GRP": {"start": 0, "stop": 10, "step": 1},
+                               "GS": ["S-TYPE", "VGS"]})
+"""
+import math
+import time
+
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 65536
+DEFAULT_MAX_POINTS = 2_000_000
+DEFAULT_MAX_SURFACE_POINTS = 10_000
+
+
+def expand_axis(name, spec, field_spec, categories):
+    """
+    Значения одной оси: список, {"values": [...]}, {"start", "stop", "num"}
+    (равномерно, включая stop) или {"start", "stop", "step"} (с шагом, включая stop).
+    """
+    if field_spec is None:
+        raise ValueError(f"{name}: неизвестный параметр")
+    annotation, ge, le = field_spec
+
+    if isinstance(spec, dict) and 'values' in spec:
+        values = spec['values']
+    elif isinstance(spec, dict):
+        try:
+            start, stop = float(spec['start']), float(spec['stop'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{name}: ожидается values или start/stop с num или step")
+        if 'num' in spec:
+            values = np.linspace(start, stop, int(spec['num']))
+        elif 'step' in spec and float(spec['step']) > 0:
+            step = float(spec['step'])
+            values = start + step * np.arange(int(math.floor((stop - start) / step + 1e-9)) + 1)
+        else:
+            raise ValueError(f"{name}: задайте num или положительный step")
+    else:
+        values = spec
+
+    values = list(values) if not isinstance(values, np.ndarray) else values.tolist()
+    if not values:
+        raise ValueError(f"{name}: пустая ось")
+
+    if annotation is str:
+        unknown = [v for v in values if v not in categories]
+        if unknown:
+            raise ValueError(f"{name}: неизвестные категории {unknown}, допустимы {list(categories)}")
+        return values
+
+    try:
+        array = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name}: ожидаются числа")
+    if not np.all(np.isfinite(array)):
+        raise ValueError(f"{name}: ожидаются конечные числа")
+    if annotation is int and np.any(array != np.round(array)):
+        raise ValueError(f"{name}: ожидаются целые числа")
+    if ge is not None and np.any(array < ge):
+        raise ValueError(f"{name}: значения должны быть >= {ge}")
+    if le is not None and np.any(array > le):
+        raise ValueError(f"{name}: значения должны быть <= {le}")
+    return [int(v) for v in array] if annotation is int else array.tolist()
+
+
+class SweepGrid:
+    """Декартова сетка по осям с ленивой сборкой матриц признаков по плоскому индексу"""
+
+    def __init__(self, plan, base, axes):
+        self.plan = plan
+        self.base = dict(base)
+        self.names = list(axes)
+        self.values = [axes[name] for name in self.names]
+        self.shape = tuple(len(v) for v in self.values)
+        self.size = math.prod(self.shape)
+
+        # Строка базовой скважины и колонки (или блоки колонок для категории) для каждой оси
+        self.base_row = plan.fill_rows([self.base])[0]
+        slots = dict(plan.numeric_slots)
+        encoded = sorted({slot for s in plan.category_slots.values() for slot, _ in s})
+        self.columns = []
+        for name, values in zip(self.names, self.values):
+            if name == plan.categorical_column:
+                block = np.zeros((len(values), len(encoded)), dtype=np.float32)
+                for i, category in enumerate(values):
+                    for slot, value in plan.category_slots[category]:
+                        block[i, encoded.index(slot)] = value
+                self.columns.append((encoded, block))
+            else:
+                self.columns.append((slots[name], np.asarray(values, dtype=np.float32)))
+
+    def chunk(self, start, stop):
+        """(индексы по осям, матрица признаков) для точек [start, stop)"""
+        index = np.unravel_index(np.arange(start, stop), self.shape)
+        matrix = np.repeat(self.base_row[None, :], stop - start, axis=0)
+        for axis_index, (slot, values) in zip(index, self.columns):
+            matrix[:, slot] = values[axis_index]
+        return index, matrix
+
+    def point(self, flat_index):
+        """Скважина (словарь полей) в точке сетки"""
+        well = dict(self.base)
+        for name, values, i in zip(self.names, self.values, np.unravel_index(flat_index, self.shape)):
+            well[name] = values[int(i)]
+        return well
+
+
+def run_sweep(plan, base, axes, specs, chunk_size=DEFAULT_CHUNK_SIZE, max_points=DEFAULT_MAX_POINTS,
+              include_surface=True, max_surface_points=DEFAULT_MAX_SURFACE_POINTS, on_chunk=None):
+    """
+    Считает NPV на сетке: кривые по каждой оси (среднее/мин/макс по остальным осям),
+    argmax/argmin и, для небольших сеток, всю поверхность в порядке осей (C-order).
+
+    on_chunk(n_rows, predict_seconds) вызывается после каждого чанка.
+    """
+    if not axes:
+        raise ValueError("Задайте хотя бы одну ось")
+    categories = plan.categories
+    expanded = {name: expand_axis(name, spec, specs.get(name), categories) for name, spec in axes.items()}
+    grid = SweepGrid(plan, base, expanded)
+    if grid.size > max_points:
+        raise OverflowError(f"Сетка из {grid.size} точек превышает лимит {max_points}")
+
+    started = time.perf_counter()
+    sums = [np.zeros(n) for n in grid.shape]
+    mins = [np.full(n, np.inf) for n in grid.shape]
+    maxs = [np.full(n, -np.inf) for n in grid.shape]
+    keep_surface = include_surface and grid.size <= max_surface_points
+    surface = np.empty(grid.size, dtype=np.float32) if keep_surface else None
+    best = (-np.inf, None)
+    worst = (np.inf, None)
+
+    for start in range(0, grid.size, chunk_size):
+        stop = min(start + chunk_size, grid.size)
+        index, matrix = grid.chunk(start, stop)
+        predict_start = time.perf_counter()
+        predictions = plan.predict_matrix(matrix)
+        if on_chunk is not None:
+            on_chunk(stop - start, time.perf_counter() - predict_start)
+
+        for axis, axis_index in enumerate(index):
+            sums[axis] += np.bincount(axis_index, weights=predictions, minlength=grid.shape[axis])
+            np.minimum.at(mins[axis], axis_index, predictions)
+            np.maximum.at(maxs[axis], axis_index, predictions)
+        i_max, i_min = int(np.argmax(predictions)), int(np.argmin(predictions))
+        if predictions[i_max] > best[0]:
+            best = (float(predictions[i_max]), start + i_max)
+        if predictions[i_min] < worst[0]:
+            worst = (float(predictions[i_min]), start + i_min)
+        if surface is not None:
+            surface[start:stop] = predictions
+
+    per_value = grid.size // np.asarray(grid.shape)
+    return {
+        "n_points": grid.size,
+        "shape": list(grid.shape),
+        "axes": {name: values for name, values in zip(grid.names, grid.values)},
+        "argmax": {"well": grid.point(best[1]), "predicted_NPV": round(best[0], 2)},
+        "argmin": {"well": grid.point(worst[1]), "predicted_NPV": round(worst[0], 2)},
+        "marginals": {
+            name: {
+                "values": values,
+                "mean": np.round(sums[axis] / per_value[axis], 2).tolist(),
+                "min": np.round(mins[axis], 2).tolist(),
+                "max": np.round(maxs[axis], 2).tolist(),
+            }
+            for axis, (name, values) in enumerate(zip(grid.names, grid.values))
+        },
+        "surface": np.round(surface, 2).tolist() if surface is not None else None,
+        "elapsed_s": time.perf_counter() - started,
+    }
+
+
+def sweep(base, axes, bundle=None, **kwargs):
+    """
+    Python API: what-if сетка по загруженной (или переданной) модели.
+
+    base - скважина в формате InputData, axes - {параметр: описание оси} (см. expand_axis).
+    """
+    from serving.bundle import load_bundle
+
+    if bundle is None:
+        bundle = load_bundle().prepare()
+    plan = bundle.feature_plan()
+    return run_sweep(plan, base, axes, input_specs(), **kwargs)
+
+
+def input_specs():
+    """Ограничения полей скважины из схемы API"""
+    from serving.schemas import InputData
+    from serving.features import field_specs
+
+    return field_specs(InputData)
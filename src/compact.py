@@ -0,0 +1,239 @@
+"""
+Стадия compact: уменьшенная модель-кандидат для serving и отчёт о том, чего она стоит.
+
+Шаги (секция compaction в params.yaml):
+  * truncate - только деревья до best_iteration (есть при early stopping, training.mode: fast);
+  * prune    - штатный updater XGBoost 'prune' схлопывает сплиты с приростом loss ниже
+               квантиля prune_gain_quantile и глубже max_depth; значение нового листа -
+               вес узла, сохранённый при обучении; удалённые узлы затем вычищаются из
+               массивов деревьев, иначе файл модели не уменьшается;
+  * distil   - вместо прунинга: неглубокий ансамбль, обученный на прогнозах модели.
+
+Пороги и листья деревьев XGBoost уже хранятся во float32, отдельного квантования нет.
+Отчёт models/compaction.json: размер, число узлов, задержка и метрики на тесте
+(как в src/evaluate.py) исходной модели и кандидата, с разницей. В serving кандидат
+попадает только при compaction.use_for_serving: true (src/export_serving.py).
+"""
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import xgboost as xgb
+import yaml
+
+from dataset import load_processed
+from evaluate import test_metrics
+
+COMPACT_DIR = 'models/compact'
+COMPACT_MODEL_PATH = os.path.join(COMPACT_DIR, 'model.joblib')
+REPORT_PATH = 'models/compaction.json'
+# Поля узла в JSON-модели XGBoost, которые перенумеровываются при вычистке удалённых узлов
+NODE_FIELDS = ('base_weights', 'default_left', 'loss_changes', 'split_conditions', 'split_indices',
+               'split_type', 'sum_hessian')
+NO_PARENT = 2147483647
+
+def load_params():
+    with open("params.yaml", "r") as f:
+        return yaml.safe_load(f)
+
+def model_trees(model_json):
+    return model_json['learner']['gradient_booster']['model']['trees']
+
+def split_gains(booster):
+    """Приросты loss всех сплитов модели"""
+    gains = [
+        np.asarray(tree['loss_changes'])[np.asarray(tree['left_children']) != -1]
+        for tree in model_trees(json.loads(booster.save_raw('json')))
+    ]
+    return np.concatenate(gains) if gains else np.zeros(0)
+
+def compact_tree(tree):
+    """Перенумеровывает достижимые от корня узлы подряд; узлы, удалённые прунингом, выбрасываются"""
+    order, index = [0], {0: 0}
+    for node in order:
+        if tree['left_children'][node] != -1:
+            for child in (tree['left_children'][node], tree['right_children'][node]):
+                index[child] = len(order)
+                order.append(child)
+    remap = lambda node: index[node] if node != -1 else -1  # noqa: E731
+    for field in NODE_FIELDS:
+        tree[field] = [tree[field][node] for node in order]
+    tree['left_children'] = [remap(tree['left_children'][node]) for node in order]
+    tree['right_children'] = [remap(tree['right_children'][node]) for node in order]
+    parents = [NO_PARENT] * len(order)
+    for new, node in enumerate(order):
+        for child in (tree['left_children'][new], tree['right_children'][new]):
+            if child != -1:
+                parents[child] = new
+    tree['parents'] = parents
+    tree['categories_nodes'] = [index[node] for node in tree['categories_nodes'] if node in index]
+    tree['tree_param']['num_nodes'] = str(len(order))
+    tree['tree_param']['num_deleted'] = '0'
+    return tree
+
+def compact_booster(booster):
+    """Копия бустера без удалённых узлов (save_model прунингового бустера хранит их как есть)"""
+    model_json = json.loads(booster.save_raw('json'))
+    for tree in model_trees(model_json):
+        compact_tree(tree)
+    compacted = xgb.Booster(model_file=bytearray(json.dumps(model_json).encode()))
+    compacted.feature_names = booster.feature_names
+    return compacted
+
+def truncate(model):
+    """Бустер только с деревьями до best_iteration (как model.predict при early stopping)"""
+    booster = model.get_booster()
+    try:
+        return booster[:model.best_iteration + 1], True
+    except AttributeError:
+        return booster.copy(), False
+
+def prune(booster, X_train, y_train, gain_quantile, max_depth, learning_rate):
+    """
+    Updater 'prune' поверх готовых деревьев: сплит схлопывается, если оба потомка - листья
+    и прирост loss меньше gamma, или если он глубже max_depth.
+    """
+    gains = split_gains(booster)
+    gamma = float(np.quantile(gains, gain_quantile)) if gain_quantile > 0 and len(gains) else 0.0
+    dtrain = xgb.DMatrix(X_train, label=y_train, feature_names=booster.feature_names)
+    pruned = xgb.train(
+        {'process_type': 'update', 'updater': 'prune', 'gamma': gamma, 'max_depth': max_depth,
+         'learning_rate': learning_rate},
+        dtrain, num_boost_round=booster.num_boosted_rounds(), xgb_model=booster
+    )
+    return compact_booster(pruned), gamma
+
+def distil(teacher, X_train, settings, random_state):
+    """Неглубокий ансамбль, обученный на прогнозах исходной модели по обучающей выборке"""
+    student = xgb.XGBRegressor(
+        max_depth=settings.get('max_depth', 6),
+        n_estimators=settings.get('n_estimators', 300),
+        learning_rate=settings.get('learning_rate', 0.1),
+        tree_method='hist',
+        random_state=random_state
+    )
+    student.fit(X_train, teacher.predict(X_train))
+    return student.get_booster()
+
+def as_regressor(booster, feature_names):
+    """XGBRegressor вокруг бустера: export_serving и API загружают кандидата как model.joblib"""
+    model = xgb.XGBRegressor()
+    model.load_model(bytearray(booster.save_raw('ubj')))
+    # Как в src/train.py: имена признаков в бустере для проверки согласованности при загрузке
+    model.get_booster().feature_names = list(feature_names)
+    return model
+
+def count_nodes(booster):
+    trees = model_trees(json.loads(booster.save_raw('json')))
+    return len(trees), sum(int(tree['tree_param']['num_nodes']) - int(tree['tree_param']['num_deleted'])
+                           for tree in trees)
+
+def median_time(fn, repeat, warmup):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def measure_latency(booster, X, repeat=300, batch_repeat=5):
+    """p50 одной строки и строк/с на пакете X (inplace_predict, один поток)"""
+    booster = booster.copy()
+    booster.set_param({'nthread': 1})
+    row = np.ascontiguousarray(X[:1])
+    single_s = median_time(lambda: booster.inplace_predict(row), repeat, warmup=20)
+    batch_s = median_time(lambda: booster.inplace_predict(X), batch_repeat, warmup=1)
+    return {'single_row_p50_ms': single_s * 1000, 'batch_rows_per_s': len(X) / batch_s}
+
+def describe(model, X_test, y_test, path):
+    """Размер, деревья/узлы, задержка и метрики теста модели"""
+    booster = model.get_booster()
+    n_trees, n_nodes = count_nodes(booster)
+    return {
+        'model_kb': os.path.getsize(path) / 1024,
+        'ubj_kb': len(booster.save_raw('ubj')) / 1024,
+        'n_trees': n_trees,
+        'n_nodes': n_nodes,
+        **measure_latency(booster, X_test),
+        **test_metrics(y_test, model.predict(X_test)),
+    }
+
+def deltas(original, candidate):
+    """Относительная разница размера/узлов/задержки и абсолютная - метрик качества"""
+    result = {}
+    for key in ('model_kb', 'n_nodes', 'single_row_p50_ms', 'batch_rows_per_s'):
+        result[f'{key}_change'] = candidate[key] / original[key] - 1 if original[key] else None
+    for key in ('mae', 'r2', 'mape'):
+        result[f'{key}_delta'] = candidate[key] - original[key]
+    return result
+
+def main():
+    params = load_params()
+    settings = params.get('compaction', {})
+    os.makedirs(COMPACT_DIR, exist_ok=True)
+    if os.path.exists(COMPACT_MODEL_PATH):
+        os.remove(COMPACT_MODEL_PATH)
+    if not settings.get('enabled', False):
+        with open(REPORT_PATH, 'w') as f:
+            json.dump({'enabled': False}, f, indent=2)
+        print("Сжатие модели выключено (compaction.enabled)")
+        return
+
+    data = load_processed(params['data']['processed_path'])
+    X_train = np.asarray(data['X_train'], dtype=np.float32)
+    X_test = np.asarray(data['X_test'], dtype=np.float32)
+    y_train, y_test = data['y_train'], data['y_test']
+    model = joblib.load('models/model.joblib')
+    hyperparameters = model.get_xgb_params()
+
+    start = time.perf_counter()
+    steps = {}
+    booster, truncated = truncate(model) if settings.get('truncate', True) else (model.get_booster().copy(), False)
+    steps['truncate'] = {'applied': truncated, 'n_trees': booster.num_boosted_rounds()}
+
+    distillation = settings.get('distil', {})
+    if distillation.get('enabled', False):
+        print("Дистилляция в неглубокий ансамбль...")
+        booster = distil(model, X_train, distillation, params['preprocessing']['random_state'])
+        steps['distil'] = {key: distillation.get(key) for key in ('max_depth', 'n_estimators', 'learning_rate')}
+    else:
+        print("Прунинг сплитов...")
+        max_depth = settings.get('max_depth', 0) or hyperparameters.get('max_depth') or 6
+        booster, gamma = prune(booster, X_train, y_train, settings.get('prune_gain_quantile', 0.5), max_depth,
+                               hyperparameters.get('learning_rate') or 0.3)
+        steps['prune'] = {'gamma': gamma, 'gain_quantile': settings.get('prune_gain_quantile', 0.5),
+                          'max_depth': max_depth}
+    compact_s = time.perf_counter() - start
+
+    candidate = as_regressor(booster, data['feature_names'])
+    joblib.dump(candidate, COMPACT_MODEL_PATH)
+
+    original = describe(model, X_test, y_test, 'models/model.joblib')
+    compacted = describe(candidate, X_test, y_test, COMPACT_MODEL_PATH)
+    report = {
+        'enabled': True,
+        'use_for_serving': settings.get('use_for_serving', False),
+        'steps': steps,
+        'compact_time_s': compact_s,
+        'original': original,
+        'compact': compacted,
+        'change': deltas(original, compacted),
+    }
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    change = report['change']
+    print(f"✅ Сжатая модель сохранена в {COMPACT_MODEL_PATH}")
+    print(f"   Размер {original['model_kb']:.0f} -> {compacted['model_kb']:.0f} КБ ({change['model_kb_change']:+.0%}), "
+          f"узлов {original['n_nodes']} -> {compacted['n_nodes']}")
+    print(f"   Одна строка {original['single_row_p50_ms']:.3f} -> {compacted['single_row_p50_ms']:.3f} мс, "
+          f"пакет {original['batch_rows_per_s']:,.0f} -> {compacted['batch_rows_per_s']:,.0f} строк/с")
+    print(f"   R² {original['r2']:.4f} -> {compacted['r2']:.4f} ({change['r2_delta']:+.4f}), "
+          f"MAE {original['mae']:.2f} -> {compacted['mae']:.2f} ({change['mae_delta']:+.2f})")
+
+if __name__ == "__main__":
+    main()
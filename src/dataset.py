@@ -0,0 +1,98 @@
+"""
+Обработанная выборка в виде непрерывных .npy-массивов для загрузки через mmap.
+
+Структура каталога data.processed_path:
+    X_train.npy, X_test.npy    - признаки, float32, C-порядок
+    y_train.npy, y_test.npy    - целевая переменная, float64
+    train_idx.npy, test_idx.npy - номера строк исходных данных в каждой части
+    train_hash.npy, test_hash.npy - хэши исходных строк (для инкрементальной предобработки)
+    meta.json                  - имена признаков, целевая переменная, размеры
+"""
+import json
+import os
+
+import numpy as np
+
+FEATURE_DTYPE = np.float32
+TARGET_DTYPE = np.float64
+ARRAYS = ('X_train', 'X_test', 'y_train', 'y_test', 'train_idx', 'test_idx')
+HASH_ARRAYS = ('train_hash', 'test_hash')
+
+
+def row_hashes(df):
+    """
+    Хэш каждой строки исходных данных (uint64).
+
+    Повторяющиеся строки различаются номером повторения, поэтому ключи уникальны.
+    """
+    import pandas as pd
+
+    content = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    occurrence = pd.Series(content).groupby(content).cumcount().to_numpy()
+    return pd.util.hash_pandas_object(
+        pd.DataFrame({'content': content, 'occurrence': occurrence}), index=False
+    ).to_numpy()
+
+
+def save_processed(path, X_train, X_test, y_train, y_test, feature_names, target,
+                   train_hash=None, test_hash=None, extra_meta=None):
+    """Сохраняет части выборки (DataFrame/Series) как .npy и meta.json"""
+    os.makedirs(path, exist_ok=True)
+    arrays = {
+        'X_train': np.ascontiguousarray(X_train, dtype=FEATURE_DTYPE),
+        'X_test': np.ascontiguousarray(X_test, dtype=FEATURE_DTYPE),
+        'y_train': np.ascontiguousarray(y_train, dtype=TARGET_DTYPE),
+        'y_test': np.ascontiguousarray(y_test, dtype=TARGET_DTYPE),
+        'train_idx': np.asarray(X_train.index, dtype=np.int64),
+        'test_idx': np.asarray(X_test.index, dtype=np.int64),
+    }
+    if train_hash is not None:
+        arrays['train_hash'] = np.asarray(train_hash, dtype=np.uint64)
+        arrays['test_hash'] = np.asarray(test_hash, dtype=np.uint64)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), array)
+
+    meta = {
+        'feature_names': list(feature_names),
+        'target': target,
+        'n_train': len(arrays['X_train']),
+        'n_test': len(arrays['X_test']),
+        'feature_dtype': np.dtype(FEATURE_DTYPE).name,
+        'target_dtype': np.dtype(TARGET_DTYPE).name,
+        **(extra_meta or {}),
+    }
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_processed(path, mmap_mode='r'):
+    """
+    Открывает выборку без копирования: массивы отображаются в память (mmap_mode='r').
+
+    Возвращает словарь с ключами ARRAYS (и HASH_ARRAYS, если есть), а также feature_names и meta.
+    """
+    with open(os.path.join(path, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    data = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAYS}
+    for name in HASH_ARRAYS:
+        hash_path = os.path.join(path, f"{name}.npy")
+        if os.path.exists(hash_path):
+            data[name] = np.load(hash_path, mmap_mode=mmap_mode)
+    data['feature_names'] = meta['feature_names']
+    data['meta'] = meta
+    return data
+
+
+def make_dmatrix(X, y=None, feature_names=None, quantile=False, **kwargs):
+    """DMatrix (или QuantileDMatrix) прямо из отображённых в память массивов"""
+    import xgboost as xgb
+
+    cls = xgb.QuantileDMatrix if quantile else xgb.DMatrix
+    return cls(X, label=y, feature_names=feature_names, **kwargs)
+
+
+def as_frame(X, feature_names):
+    """DataFrame поверх массива признаков (для кода, которому нужны имена колонок)"""
+    import pandas as pd
+
+    return pd.DataFrame(X, columns=feature_names, copy=False)
@@ -1,32 +1,215 @@
 import joblib
 import json
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
 import pandas as pd
+import xgboost as xgb
 from sklearn.metrics import mean_absolute_error, r2_score, mean_absolute_percentage_error
 import yaml
 
+from dataset import load_processed
+from search import core_budget
+
+QUANTILES_SPEC = 'models/quantiles/quantiles.json'
+METRICS = ('mae', 'r2', 'mape')
+# Элементов в одной матрице индексов бутстрепа (~32 МБ на int64/float64): число
+# ресэмплов в пачке подбирается под размер теста, память не растёт с n_resamples
+BOOTSTRAP_CHUNK_ELEMENTS = 1 << 22
+# Как в sklearn.metrics.mean_absolute_percentage_error: защита от деления на 0
+MAPE_EPS = np.finfo(np.float64).eps
+
+_worker_arrays = None
+
 def load_params():
     with open("params.yaml", "r") as f:
         return yaml.safe_load(f)
 
+def test_metrics(y_true, y_pred):
+    """MAE / R² / MAPE на тесте (ими же сравнивает модели стадия compact)"""
+    return {
+        'mae': float(mean_absolute_error(y_true, y_pred)),
+        'r2': float(r2_score(y_true, y_pred)),
+        'mape': float(mean_absolute_percentage_error(y_true, y_pred))
+    }
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Пиковый RSS (ru_maxrss в Linux - в КБ); RUSAGE_CHILDREN - максимум по завершённым процессам пула"""
+    return resource.getrusage(who).ru_maxrss / 1024
+
+def resampled_metrics(y_true, y_pred, idx):
+    """MAE / R² / MAPE для каждой строки матрицы индексов idx (ресэмпл x строки теста)"""
+    y = y_true[idx]
+    errors = y - y_pred[idx]
+    abs_errors = np.abs(errors)
+    ss_res = np.einsum('ij,ij->i', errors, errors)
+    ss_tot = y.var(axis=1) * idx.shape[1]
+    return np.column_stack([
+        abs_errors.mean(axis=1),
+        1 - ss_res / np.where(ss_tot > 0, ss_tot, np.nan),
+        (abs_errors / np.maximum(np.abs(y), MAPE_EPS)).mean(axis=1),
+    ])
+
+def bootstrap_chunk(y_true, y_pred, seed, size):
+    """size ресэмплов одной матрицей индексов; seed - SeedSequence пачки"""
+    idx = np.random.default_rng(seed).integers(0, len(y_true), size=(size, len(y_true)))
+    return resampled_metrics(y_true, y_pred, idx)
+
+def _init_worker(y_true, y_pred):
+    global _worker_arrays
+    _worker_arrays = (y_true, y_pred)
+
+def _bootstrap_task(task):
+    """Пачка ресэмплов в процессе пула: массивы переданы один раз в initializer"""
+    return bootstrap_chunk(*_worker_arrays, *task)
+
+def bootstrap_intervals(y_true, y_pred, n_resamples=1000, confidence=0.95, random_state=None, n_jobs=0,
+                        parallel_min_rows=100000):
+    """
+    Бутстреп-интервалы MAE / R² / MAPE (перцентильный метод) по готовым прогнозам.
+
+    Ресэмплы считаются пачками по BOOTSTRAP_CHUNK_ELEMENTS индексов; у каждой пачки
+    свой SeedSequence, поэтому результат не зависит от числа процессов. Тест от
+    parallel_min_rows строк считается в пуле процессов (n_jobs, 0 - все ядра).
+    """
+    y_true = np.ascontiguousarray(y_true, dtype=np.float64)
+    y_pred = np.ascontiguousarray(y_pred, dtype=np.float64)
+    chunk = max(1, min(n_resamples, BOOTSTRAP_CHUNK_ELEMENTS // max(len(y_true), 1)))
+    sizes = [min(chunk, n_resamples - start) for start in range(0, n_resamples, chunk)]
+    tasks = list(zip(np.random.SeedSequence(random_state).spawn(len(sizes)), sizes))
+
+    workers = min(core_budget(n_jobs), len(tasks)) if len(y_true) >= parallel_min_rows else 1
+    if workers > 1:
+        # spawn, как в src/search.py: дочерние процессы не наследуют состояние OpenMP родителя
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                                 initializer=_init_worker, initargs=(y_true, y_pred)) as pool:
+            samples = np.concatenate(list(pool.map(_bootstrap_task, tasks)))
+    else:
+        samples = np.concatenate([bootstrap_chunk(y_true, y_pred, *task) for task in tasks])
+
+    tail = (1 - confidence) / 2
+    lower, upper = np.nanquantile(samples, [tail, 1 - tail], axis=0)
+    intervals = {
+        name: {'lower': float(lower[j]), 'upper': float(upper[j]), 'std': float(np.nanstd(samples[:, j]))}
+        for j, name in enumerate(METRICS)
+    }
+    return {'n_resamples': n_resamples, 'confidence': confidence, 'chunk_resamples': chunk,
+            'workers': workers, 'metrics': intervals}
+
+def grouped_metrics(codes, labels, y_true, y_pred):
+    """Метрики по группам: codes - номер группы строки, все суммы - один np.bincount на величину"""
+    n_groups = len(labels)
+    y_true = np.asarray(y_true, dtype=np.float64)
+    errors = y_true - np.asarray(y_pred, dtype=np.float64)
+    sums = lambda weights: np.bincount(codes, weights=weights, minlength=n_groups)  # noqa: E731
+    count = np.bincount(codes, minlength=n_groups)
+    abs_errors = np.abs(errors)
+    y_sum = sums(y_true)
+    ss_tot = sums(y_true ** 2) - y_sum ** 2 / np.maximum(count, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mae = sums(abs_errors) / count
+        r2 = 1 - sums(errors ** 2) / np.where(ss_tot > 0, ss_tot, np.nan)
+        mape = sums(abs_errors / np.maximum(np.abs(y_true), MAPE_EPS)) / count
+        bias = sums(errors) / count
+    nullable = lambda value: float(value) if np.isfinite(value) else None  # noqa: E731
+    return {
+        str(label): {'n': int(count[g]), 'mae': nullable(mae[g]), 'r2': nullable(r2[g]),
+                     'mape': nullable(mape[g]), 'residuals_mean': nullable(bias[g])}
+        for g, label in enumerate(labels) if count[g]
+    }
+
+def bucket_codes(values, n_buckets):
+    """
+    Номера бакетов числового признака: каждое значение - свой бакет, если значений
+    не больше n_buckets, иначе квантильные бакеты [a, b) по тесту.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    distinct = np.unique(values)
+    if len(distinct) <= n_buckets:
+        return np.searchsorted(distinct, values), [f"{v:g}" for v in distinct]
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, n_buckets + 1)))
+    codes = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+    labels = [f"[{lo:g}, {hi:g})" for lo, hi in zip(edges[:-2], edges[1:-1])] + [f"[{edges[-2]:g}, {edges[-1]:g}]"]
+    return codes, labels
+
+def slice_metrics(X_test, y_test, y_pred, feature_names, encoder, categorical_columns, buckets):
+    """
+    Метрики по срезам: категории (восстанавливаются из OHE-колонок энкодером)
+    и бакеты числовых признаков buckets = {признак: число бакетов}.
+    """
+    X_test = np.asarray(X_test)
+    positions = {name: i for i, name in enumerate(feature_names)}
+    encoded = X_test[:, [positions[name] for name in encoder.get_feature_names_out(categorical_columns)]]
+    categories = encoder.inverse_transform(encoded)
+    slices = {}
+    for j, column in enumerate(categorical_columns):
+        labels, codes = np.unique(categories[:, j].astype(str), return_inverse=True)
+        slices[column] = grouped_metrics(codes, labels, y_test, y_pred)
+    for column, n_buckets in buckets.items():
+        codes, labels = bucket_codes(X_test[:, positions[column]], n_buckets)
+        slices[column] = grouped_metrics(codes, labels, y_test, y_pred)
+    return slices
+
+def evaluate_quantiles(X_test, y_test, spec_path=QUANTILES_SPEC):
+    """
+    Покрытие интервала квантильной модели на тесте: доля y в [min alpha, max alpha]
+    против номинальной, калибровка каждого квантиля и pinball loss.
+    """
+    if not os.path.exists(spec_path):
+        return None
+    with open(spec_path, 'r') as f:
+        spec = json.load(f)
+    if not spec.get('enabled', False):
+        return None
+
+    booster = xgb.Booster(model_file=os.path.join(os.path.dirname(spec_path), spec['model_file']))
+    alphas = np.asarray(spec['alphas'], dtype=float)
+    order = np.argsort(alphas)
+    alphas = alphas[order]
+    raw = booster.inplace_predict(np.asarray(X_test, dtype=np.float32)).reshape(len(X_test), -1)
+    # Как в API: квантили по возрастанию alpha, пересечения устраняются сортировкой
+    q = np.sort(raw[:, order], axis=1)
+    y = np.asarray(y_test, dtype=float)
+
+    lower, upper = q[:, 0], q[:, -1]
+    errors = y[:, None] - q
+    pinball = np.maximum(alphas * errors, (alphas - 1) * errors).mean(axis=0)
+    labels = [f"P{round(a * 100):g}" for a in alphas]
+    return {
+        'alphas': alphas.tolist(),
+        'nominal_coverage': float(alphas[-1] - alphas[0]),
+        'interval_coverage': float(np.mean((y >= lower) & (y <= upper))),
+        'mean_interval_width': float(np.mean(upper - lower)),
+        'crossing_rate': float(np.mean(np.any(np.diff(raw[:, order], axis=1) < 0, axis=1))),
+        'quantile_calibration': {label: float(np.mean(y <= q[:, j])) for j, label in enumerate(labels)},
+        'pinball_loss': {label: float(pinball[j]) for j, label in enumerate(labels)},
+    }
+
 def main():
     params = load_params()
+    settings = params.get('evaluation', {})
+    timings = {}
+    start = time.perf_counter()
     
     # Загрузка данных и модели
-    data = joblib.load(params['data']['processed_path'])
+    data = load_processed(params['data']['processed_path'])
     model = joblib.load('models/model.joblib')
+    encoder = joblib.load('models/encoder.joblib')
     
     X_test, y_test = data['X_test'], data['y_test']
     
-    # Предсказания
+    # Предсказания: один проход модели, все метрики ниже считаются по y_pred
+    step = time.perf_counter()
     y_pred = model.predict(X_test)
+    timings['predict_s'] = time.perf_counter() - step
     
     # Детальная оценка
     evaluation = {
-        'test_metrics': {
-            'mae': mean_absolute_error(y_test, y_pred),
-            'r2': r2_score(y_test, y_pred),
-            'mape': mean_absolute_percentage_error(y_test, y_pred)
-        },
+        'test_metrics': test_metrics(y_test, y_pred),
         'predictions_stats': {
             'actual_mean': float(y_test.mean()),
             'predicted_mean': float(y_pred.mean()),
@@ -39,12 +222,58 @@ def main():
         }
     }
     
+    bootstrap = settings.get('bootstrap', {})
+    if bootstrap.get('n_resamples', 0) > 0:
+        step = time.perf_counter()
+        evaluation['bootstrap'] = bootstrap_intervals(
+            y_test, y_pred,
+            n_resamples=bootstrap['n_resamples'],
+            confidence=bootstrap.get('confidence', 0.95),
+            random_state=params['preprocessing']['random_state'],
+            n_jobs=bootstrap.get('n_jobs', 0),
+            parallel_min_rows=bootstrap.get('parallel_min_rows', 100000)
+        )
+        timings['bootstrap_s'] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    evaluation['slices'] = slice_metrics(
+        X_test, y_test, y_pred, data['feature_names'], encoder,
+        params['features']['categorical_columns'], settings.get('slices', {}).get('buckets', {})
+    )
+    timings['slices_s'] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    quantiles = evaluate_quantiles(X_test, y_test)
+    if quantiles is not None:
+        evaluation['quantiles'] = quantiles
+        timings['quantiles_s'] = time.perf_counter() - step
+
+    evaluation['runtime'] = {
+        **timings,
+        'total_s': time.perf_counter() - start,
+        'n_test': len(y_test),
+        'peak_rss_mb': peak_rss_mb(),
+        'workers_peak_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
     # Сохранение детальной оценки
     with open('models/evaluation.json', 'w') as f:
         json.dump(evaluation, f, indent=2)
     
     print("✅ Детальная оценка завершена")
     print(f"R² на тесте: {evaluation['test_metrics']['r2']:.4f}")
+    if 'bootstrap' in evaluation:
+        interval = evaluation['bootstrap']['metrics']['r2']
+        print(f"{bootstrap.get('confidence', 0.95):.0%} интервал R² ({bootstrap['n_resamples']} ресэмплов): "
+              f"[{interval['lower']:.4f}, {interval['upper']:.4f}]")
+    for column, groups in evaluation['slices'].items():
+        worst = max(groups, key=lambda label: groups[label]['mae'])
+        print(f"Срез {column}: {len(groups)} групп, наибольшая MAE {groups[worst]['mae']:.2f} ({worst})")
+    if quantiles is not None:
+        print(f"Покрытие интервала {quantiles['alphas'][0]:g}-{quantiles['alphas'][-1]:g}: "
+              f"{quantiles['interval_coverage']:.1%} (номинально {quantiles['nominal_coverage']:.0%}), "
+              f"средняя ширина {quantiles['mean_interval_width']:.2f}")
+    print(f"Время {evaluation['runtime']['total_s']:.2f} с, пиковая память {evaluation['runtime']['peak_rss_mb']:.0f} МБ")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import xgboost as xgb
+import yaml
+
+from dataset import load_processed
+
+# Схема признаков собирается тем же кодом, которым её читает API (serving/features.py):
+# экспорт и рантайм не могут разойтись. src/ - набор скриптов, корень репозитория подключается по пути
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from serving.features import FeaturePlan  # noqa: E402
+
+SERVING_DIR = 'models/serving'
+MODEL_FILE = 'model.ubj'
+QUANTILES_DIR = 'models/quantiles'
+QUANTILES_FILE = 'quantiles.ubj'
+REFERENCE_FILE = 'reference.npy'
+COMPACT_MODEL_PATH = 'models/compact/model.joblib'  # кандидат стадии compact
+REFERENCE_SIZE = 256  # TreeSHAP по глубоким деревьям - десятки мс на строку
+TOLERANCE = 1e-6
+# Дополнительные бэкенды инференса (serving/backends.py) и допуск их сверки с model.predict:
+# деревья суммируются во float32 в другом порядке, чем в XGBoost
+BACKEND_FILES = {'onnx': 'model.onnx', 'compiled': 'model.so'}
+BACKEND_RTOL = 1e-5
+BACKEND_ATOL = 1e-3
+ONNX_OPSET = 15
+
+def load_params():
+    with open("params.yaml", "r") as f:
+        return yaml.safe_load(f)
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def export_onnx(booster, path):
+    """Граф TreeEnsembleRegressor для onnxruntime (onnxmltools)"""
+    import onnxmltools
+    from onnxmltools.convert.common.data_types import FloatTensorType
+
+    # Конвертер ждёт признаки f0..fN: имена убираются в копии бустера
+    booster = booster.copy()
+    booster.feature_names = None
+    booster.feature_types = None
+    graph = onnxmltools.convert_xgboost(
+        booster, initial_types=[('input', FloatTensorType([None, booster.num_features()]))], target_opset=ONNX_OPSET
+    )
+    with open(path, 'wb') as f:
+        f.write(graph.SerializeToString())
+
+def predict_onnx(path, X):
+    import onnxruntime
+
+    session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+    return session.run(None, {session.get_inputs()[0].name: X})[0].reshape(-1)
+
+def export_compiled(booster, path):
+    """Разделяемая библиотека: модель Treelite -> C-код TL2cgen -> gcc"""
+    import tl2cgen
+    import treelite
+
+    nthread = os.cpu_count() or 1
+    model = treelite.frontend.from_xgboost(booster)
+    # Деревья делятся на несколько единиц трансляции, чтобы компилировать их параллельно
+    tl2cgen.export_lib(model, toolchain='gcc', libpath=path, params={'parallel_comp': max(nthread, 8)},
+                       nthread=nthread)
+
+def predict_compiled(path, X):
+    import tl2cgen
+
+    return tl2cgen.Predictor(path).predict(tl2cgen.DMatrix(X, missing=float('nan'))).reshape(-1)
+
+BACKEND_EXPORTERS = {'onnx': (export_onnx, predict_onnx), 'compiled': (export_compiled, predict_compiled)}
+
+def export_backends(booster, iteration_range, names, X, expected):
+    """
+    Экспортирует бэкенды names в SERVING_DIR и сверяет их с model.predict на X.
+
+    Бэкенд без пакета/компилятора или с расхождением сверх допуска пропускается:
+    API тогда остаётся на xgboost. Возвращает описания бэкендов для bundle.json.
+    """
+    for file in BACKEND_FILES.values():
+        path = os.path.join(SERVING_DIR, file)
+        if os.path.exists(path):
+            os.remove(path)
+    # Только деревья, которые использует model.predict (early stopping): в ONNX и C-коде диапазона нет
+    begin, end = iteration_range
+    trees = booster[begin:end] if end > 0 else booster
+
+    exported = {}
+    for name in names:
+        if name not in BACKEND_EXPORTERS:
+            raise ValueError(f"Неизвестный бэкенд {name!r}, допустимы {list(BACKEND_EXPORTERS)}")
+        export, predict = BACKEND_EXPORTERS[name]
+        path = os.path.join(SERVING_DIR, BACKEND_FILES[name])
+        print(f"Экспорт бэкенда {name}...")
+        start = time.perf_counter()
+        try:
+            export(trees, path)
+        except Exception as e:
+            print(f"⚠️ Бэкенд {name} не экспортирован: {e}")
+            continue
+        export_s = time.perf_counter() - start
+
+        predictions = predict(path, X)
+        max_diff = float(np.max(np.abs(predictions - expected))) if len(X) else 0.0
+        if not np.allclose(predictions, expected, rtol=BACKEND_RTOL, atol=BACKEND_ATOL):
+            os.remove(path)
+            print(f"❌ Бэкенд {name} расходится с model.joblib: max |diff| = {max_diff:.3e}, не экспортирован")
+            continue
+        exported[name] = {
+            'file': BACKEND_FILES[name],
+            'parity_max_diff': max_diff,
+            'export_s': export_s,
+            'size_kb': os.path.getsize(path) / 1024,
+        }
+        if name == 'compiled':
+            # Машинный код: библиотека годится только для той же архитектуры
+            exported[name]['machine'] = platform.machine()
+        print(f"✅ Бэкенд {name}: {BACKEND_FILES[name]} {exported[name]['size_kb']:.0f} КБ за {export_s:.1f} с, "
+              f"max |diff| на тесте {max_diff:.1e}")
+    return exported
+
+def main():
+    params = load_params()
+    categorical_columns = params['features']['categorical_columns']
+    if len(categorical_columns) != 1:
+        raise ValueError("Serving-бандл поддерживает одну категориальную колонку")
+    categorical_column = categorical_columns[0]
+
+    # compaction.use_for_serving: в бандл идёт сжатая модель стадии compact вместо исходной
+    source_model = 'models/model.joblib'
+    if params.get('compaction', {}).get('use_for_serving', False):
+        if not os.path.exists(COMPACT_MODEL_PATH):
+            raise ValueError("compaction.use_for_serving требует compaction.enabled: сжатой модели нет")
+        source_model = COMPACT_MODEL_PATH
+
+    print(f"Загрузка модели ({source_model}) и энкодера...")
+    model = joblib.load(source_model)
+    encoder = joblib.load('models/encoder.joblib')
+    feature_columns = list(joblib.load('models/feature_columns.joblib'))
+
+    # Бустер в нативном формате XGBoost (UBJSON) и схема признаков в JSON:
+    # API загружает их без pandas, scikit-learn и pickle
+    os.makedirs(SERVING_DIR, exist_ok=True)
+    model_path = os.path.join(SERVING_DIR, MODEL_FILE)
+    booster = model.get_booster()
+    booster.save_model(model_path)
+
+    # feature_columns, categorical_column, category_slots, iteration_range - как их собирает API
+    spec = {
+        'format_version': 1,
+        'model_file': MODEL_FILE,
+        **FeaturePlan.from_encoder(model, encoder, feature_columns, categorical_column).to_spec(),
+        'source_model': source_model,
+    }
+
+    # Проверка: выгруженный бустер на тестовой выборке совпадает с model.predict
+    data = load_processed(params['data']['processed_path'])
+    X_test = np.asarray(data['X_test'], dtype=np.float32)
+    exported = xgb.Booster(model_file=model_path)
+    exported_pred = exported.inplace_predict(X_test, iteration_range=tuple(spec['iteration_range']))
+    expected = model.predict(X_test)
+    max_diff = float(np.max(np.abs(exported_pred - expected))) if len(X_test) else 0.0
+    if max_diff > TOLERANCE:
+        raise ValueError(f"Выгруженная модель расходится с {source_model}: max |diff| = {max_diff:.3e}")
+
+    # Дополнительные бэкенды инференса (export.backends): API выбирает их через NPV_BACKEND
+    backends = export_backends(
+        booster, spec['iteration_range'], params.get('export', {}).get('backends', []), X_test, expected
+    )
+    if backends:
+        spec['backends'] = backends
+
+    # Опорная выборка обучающих строк: по ней API считает глобальную важность полей (/explain/global)
+    X_train = np.asarray(data['X_train'], dtype=np.float32)
+    rng = np.random.default_rng(params['preprocessing']['random_state'])
+    sample = np.sort(rng.choice(len(X_train), size=min(REFERENCE_SIZE, len(X_train)), replace=False))
+    np.save(os.path.join(SERVING_DIR, REFERENCE_FILE), X_train[sample])
+
+    # Квантильная модель (training.quantiles) кладётся в тот же бандл: API считает P10/P50/P90 без joblib
+    quantiles_path = os.path.join(SERVING_DIR, QUANTILES_FILE)
+    if os.path.exists(quantiles_path):
+        os.remove(quantiles_path)
+    quantiles = {}
+    if os.path.exists(os.path.join(QUANTILES_DIR, 'quantiles.json')):
+        with open(os.path.join(QUANTILES_DIR, 'quantiles.json'), 'r') as f:
+            quantiles = json.load(f)
+    if quantiles.get('enabled', False):
+        if quantiles['feature_columns'] != feature_columns:
+            raise ValueError("Признаки квантильной модели не совпадают с feature_columns")
+        shutil.copyfile(os.path.join(QUANTILES_DIR, quantiles['model_file']), quantiles_path)
+        spec['quantiles'] = {
+            'alphas': quantiles['alphas'],
+            'model_file': QUANTILES_FILE,
+            'iteration_range': quantiles['iteration_range'],
+        }
+
+    spec.update(
+        reference_file=REFERENCE_FILE,
+        reference_rows=len(sample),
+        parity_max_diff=max_diff,
+        model_sha1=file_sha1(model_path),
+        exported_at=datetime.now().isoformat()
+    )
+    with open(os.path.join(SERVING_DIR, 'bundle.json'), 'w') as f:
+        json.dump(spec, f, indent=2, ensure_ascii=False)
+
+    size_kb = os.path.getsize(model_path) / 1024
+    print(f"✅ Serving-бандл сохранён в {SERVING_DIR}: {MODEL_FILE} {size_kb:.0f} КБ, "
+          f"max |diff| на тесте {max_diff:.1e}")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import json
+import os
 import yaml
 import pandas as pd
 from datetime import datetime
@@ -13,13 +14,19 @@ def generate_report():
     
     with open('params.yaml', 'r') as f:
         params = yaml.safe_load(f)
+
+    # Итоговые гиперпараметры (после подбора могут отличаться от params.yaml)
+    hyperparameters = params['model']['hyperparameters']
+    if os.path.exists('models/best_params.json'):
+        with open('models/best_params.json', 'r') as f:
+            hyperparameters = json.load(f)['hyperparameters']
     
     # Создание отчета
     report = {
         'timestamp': datetime.now().isoformat(),
         'model_info': {
             'name': params['model']['name'],
-            'hyperparameters': params['model']['hyperparameters']
+            'hyperparameters': hyperparameters
         },
         'performance': {
             'cross_validation': {
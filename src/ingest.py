@@ -0,0 +1,89 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import yaml
+
+HASH_KEY = b'source_md5'
+
+def load_params():
+    with open("params.yaml", "r") as f:
+        return yaml.safe_load(f)
+
+def file_md5(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def stored_md5(path):
+    """Хэш исходника, из которого был собран columnar-файл (None, если файла нет)"""
+    if not os.path.exists(path):
+        return None
+    metadata = pq.read_schema(path).metadata or {}
+    value = metadata.get(HASH_KEY)
+    return value.decode() if value else None
+
+def check_integer_columns(df, schema):
+    """
+    Проверяет, что колонки с целочисленным типом в ingest.schema можно привести без потерь.
+
+    astype молча отбрасывает дробную часть (2.5 -> 2) и переполняется за пределами типа,
+    поэтому дробные, пропущенные или не влезающие в тип значения останавливают ingest.
+    """
+    errors = []
+    for column, dtype in schema.items():
+        dtype = pd.api.types.pandas_dtype(dtype)
+        if dtype.kind not in 'iu':
+            continue
+        values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+        info = np.iinfo(dtype)
+        bad = np.isnan(values) | (values != np.round(values)) | (values < info.min) | (values > info.max)
+        if bad.any():
+            rows = np.flatnonzero(bad)
+            examples = df[column].iloc[rows[:5]].tolist()
+            errors.append(f"{column} ({dtype}): {len(rows)} строк не целые или вне диапазона, например {examples}")
+    if errors:
+        raise ValueError(
+            "Значения не приводятся к целочисленным типам ingest.schema без потерь "
+            "(исправьте данные или укажите float32):\n  " + "\n  ".join(errors)
+        )
+
+def apply_schema(df, schema):
+    """Приводит колонки к типам из params.yaml (ingest.schema)"""
+    missing = [c for c in schema if c not in df.columns]
+    if missing:
+        raise ValueError(f"В исходных данных нет колонок из ingest.schema: {missing}")
+    extra = [c for c in df.columns if c not in schema]
+    if extra:
+        print(f"⚠️ Колонки без типа в ingest.schema, оставлены как есть: {extra}")
+    check_integer_columns(df, schema)
+    return df.astype({column: dtype for column, dtype in schema.items()})
+
+def main():
+    params = load_params()
+    raw_path = params['data']['raw_path']
+    output_path = params['data']['ingested_path']
+
+    source_md5 = file_md5(raw_path)
+    if stored_md5(output_path) == source_md5:
+        print(f"✅ {output_path} уже собран из текущей версии {raw_path} (md5 {source_md5})")
+        return
+
+    print(f"Конвертация {raw_path} -> {output_path}...")
+    df = apply_schema(pd.read_excel(raw_path), params['ingest']['schema'])
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), HASH_KEY: source_md5.encode()})
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    pq.write_table(table, output_path, compression=params['ingest'].get('compression', 'zstd'))
+
+    print(f"✅ Сохранено {len(df)} строк, {os.path.getsize(output_path) / 1024:.0f} КБ (md5 исходника {source_md5})")
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,186 @@
 import pandas as pd
+import numpy as np
 import joblib
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.model_selection import train_test_split
 import yaml
+import json
 import os
+import hashlib
+
+from dataset import load_processed, row_hashes, save_processed
+
+PROFILE_PATH = 'models/drift_profile.json'  # опорный профиль для мониторинга дрейфа в API (serving/drift.py)
+PROFILE_BINS = 10  # бины PSI: децили обучающей выборки
+PROFILE_QUANTILES = 101  # перцентили 0..100 для KS
 
 def load_params():
     with open("params.yaml", "r") as f:
         return yaml.safe_load(f)
 
+def encode(X, encoder, categorical_columns):
+    """OHE категориальных колонок с сохранением индекса строк"""
+    encoded_cols = encoder.transform(X[categorical_columns])
+    encoded_df = pd.DataFrame(
+        encoded_cols, 
+        columns=encoder.get_feature_names_out(categorical_columns),
+        index=X.index
+    )
+    return pd.concat([X.drop(categorical_columns, axis=1), encoded_df], axis=1)
+
+def hash_split(keys, test_size):
+    """Стабильное разбиение новых строк: попадание в test определяется хэшем строки"""
+    return (keys % np.uint64(1_000_000)) < np.uint64(int(test_size * 1_000_000))
+
+def incremental_update(X, y, keys, params):
+    """
+    Дополняет сохранённую выборку: кодирует только новые/изменённые строки
+    сохранённым encoder.joblib, разбиение уже обработанных строк не меняется.
+
+    Возвращает None, если инкрементальное обновление невозможно.
+    """
+    processed_path = params['data']['processed_path']
+    categorical_columns = params['features']['categorical_columns']
+    if not (os.path.exists(os.path.join(processed_path, 'train_hash.npy'))
+            and os.path.exists('models/encoder.joblib')):
+        print("Сохранённой выборки с хэшами строк нет - полная предобработка")
+        return None
+
+    # Без mmap: файлы будут перезаписаны
+    store = load_processed(processed_path, mmap_mode=None)
+    encoder = joblib.load('models/encoder.joblib')
+    feature_names = store['feature_names']
+
+    for column, categories in zip(categorical_columns, encoder.categories_):
+        unknown = set(X[column].astype(str).unique()) - set(categories)
+        if unknown:
+            print(f"Новые категории {column}: {sorted(unknown)} - полная предобработка")
+            return None
+
+    key_index = pd.Index(keys)
+    parts = {}
+    for part in ('train', 'test'):
+        old_keys = store[f'{part}_hash']
+        kept = np.isin(old_keys, keys)
+        parts[part] = {
+            'X': pd.DataFrame(store[f'X_{part}'][kept], columns=feature_names,
+                              index=key_index.get_indexer(old_keys[kept])),
+            'y': store[f'y_{part}'][kept],
+            'hash': old_keys[kept],
+            'removed': int((~kept).sum()),
+        }
+
+    is_new = ~np.isin(keys, np.concatenate([store['train_hash'], store['test_hash']]))
+    new_pos = np.flatnonzero(is_new)
+    new_X = encode(X.iloc[new_pos], encoder, categorical_columns)[feature_names]
+    new_is_test = hash_split(keys[new_pos], params['preprocessing']['test_size'])
+
+    result = []
+    for part, mask in (('train', ~new_is_test), ('test', new_is_test)):
+        old = parts[part]
+        result.append((
+            pd.concat([old['X'], new_X[mask]]),
+            np.concatenate([old['y'], y.to_numpy()[new_pos[mask]]]),
+            np.concatenate([old['hash'], keys[new_pos[mask]]]),
+        ))
+
+    stats = {
+        'mode': 'incremental',
+        'n_new_train': int((~new_is_test).sum()),
+        'n_new_test': int(new_is_test.sum()),
+        'n_removed': parts['train']['removed'] + parts['test']['removed'],
+    }
+    return result[0], result[1], feature_names, stats
+
+def drift_profile(X, categorical_columns, row_keys):
+    """
+    Распределения входных полей обучающей выборки в единицах запроса API (до OHE):
+    числовые - границы децилей, доли строк по ним, перцентили и среднее; категориальные - доли категорий.
+
+    Вместо времени создания профиль помечен хэшем строк обучающей части (row_keys),
+    поэтому повторный запуск на тех же данных даёт побайтно тот же файл.
+    """
+    data_hash = hashlib.sha1(np.sort(np.asarray(row_keys, dtype=np.uint64)).tobytes()).hexdigest()[:12]
+    profile = {'format_version': 1, 'n_rows': len(X), 'data_hash': data_hash,
+               'numeric': {}, 'categorical': {}}
+    for column in X.columns:
+        if column in categorical_columns:
+            shares = X[column].astype(str).value_counts(normalize=True)
+            profile['categorical'][column] = {'proportions': {str(k): float(v) for k, v in shares.items()}}
+            continue
+        values = X[column].to_numpy(dtype=np.float64)
+        values = values[~np.isnan(values)]
+        # Повторяющиеся границы (целочисленные поля) схлопываются: бин на каждое значение
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, PROFILE_BINS + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        profile['numeric'][column] = {
+            'edges': edges.tolist(),
+            'proportions': (counts / len(values)).tolist(),
+            'quantiles': np.quantile(values, np.linspace(0, 1, PROFILE_QUANTILES)).tolist(),
+            'mean': float(values.mean()),
+            'std': float(values.std()),
+        }
+    return profile
+
 def main():
     params = load_params()
+    categorical_columns = params['features']['categorical_columns']
     
     # Загрузка данных
     print("Загрузка данных...")
-    df = pd.read_excel(params['data']['raw_path'])
+    df = pd.read_parquet(params['data']['ingested_path'])
     
     # Предобработка
     print("Предобработка данных...")
     X = df.drop(params['features']['drop_columns'] + [params['features']['target']], axis=1)
     y = df[params['features']['target']]
+    keys = row_hashes(df)
+
+    update = None
+    if params['preprocessing'].get('incremental', False):
+        update = incremental_update(X, y, keys, params)
+
+    if update is not None:
+        (X_train, y_train, train_hash), (X_test, y_test, test_hash), feature_names, stats = update
+        print(f"Инкрементально: новых строк train/test {stats['n_new_train']}/{stats['n_new_test']}, "
+              f"удалено {stats['n_removed']}")
+    else:
+        # Кодирование категориальных переменных
+        encoder = OneHotEncoder(drop='first', sparse_output=False)
+        encoder.fit(X[categorical_columns])
+        X_processed = encode(X, encoder, categorical_columns)
+        feature_names = X_processed.columns.tolist()
+
+        # Разделение на train/test
+        X_train, X_test, y_train, y_test = train_test_split(
+            X_processed, y, 
+            test_size=params['preprocessing']['test_size'], 
+            random_state=params['preprocessing']['random_state']
+        )
+        train_hash, test_hash = keys[X_train.index], keys[X_test.index]
+        stats = {'mode': 'full', 'n_new_train': len(X_train), 'n_new_test': len(X_test), 'n_removed': 0}
+
+        os.makedirs('models', exist_ok=True)
+        joblib.dump(encoder, 'models/encoder.joblib')
+        joblib.dump(feature_names, 'models/feature_columns.joblib')
     
-    # Кодирование категориальных переменных
-    encoder = OneHotEncoder(drop='first', sparse_output=False)
-    encoded_cols = encoder.fit_transform(X[params['features']['categorical_columns']])
-    encoded_df = pd.DataFrame(
-        encoded_cols, 
-        columns=encoder.get_feature_names_out(params['features']['categorical_columns'])
-    )
-    
-    X_processed = pd.concat([X.drop(params['features']['categorical_columns'], axis=1), encoded_df], axis=1)
-    
-    # Разделение на train/test
-    X_train, X_test, y_train, y_test = train_test_split(
-        X_processed, y, 
-        test_size=params['preprocessing']['test_size'], 
-        random_state=params['preprocessing']['random_state']
+    # Сохранение: .npy-массивы float32 + meta.json, потребители открывают их через mmap
+    save_processed(
+        params['data']['processed_path'],
+        X_train, X_test, y_train, y_test,
+        feature_names=feature_names,
+        target=params['features']['target'],
+        train_hash=train_hash, test_hash=test_hash,
+        extra_meta=stats
     )
-    
-    # Сохранение
-    os.makedirs('data/processed', exist_ok=True)
-    joblib.dump({
-        'X_train': X_train, 'X_test': X_test, 
-        'y_train': y_train, 'y_test': y_test,
-        'feature_names': X_processed.columns.tolist()
-    }, params['data']['processed_path'])
-    
-    os.makedirs('models', exist_ok=True)
-    joblib.dump(encoder, 'models/encoder.joblib')
-    joblib.dump(X_processed.columns.tolist(), 'models/feature_columns.joblib')
+
+    # Профиль считается по исходным значениям строк обучающей части (индексы X_train - строки X)
+    profile = drift_profile(X.loc[X_train.index], categorical_columns, train_hash)
+    os.makedirs(os.path.dirname(PROFILE_PATH), exist_ok=True)
+    with open(PROFILE_PATH, 'w') as f:
+        json.dump(profile, f, indent=2, ensure_ascii=False)
     
     print("✅ Данные успешно предобработаны")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
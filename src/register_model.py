@@ -5,87 +5,92 @@ import json
 import os
 from datetime import datetime
 
+from tracking import EXPERIMENT_NAME, latest_training_run, timed, tracking_uri
+
 def load_params():
     with open("params.yaml", "r") as f:
         return yaml.safe_load(f)
 
+def save_registry_info(registry_info):
+    os.makedirs('registry', exist_ok=True)
+    with open('registry/model_info.json', 'w') as f:
+        json.dump(registry_info, f, indent=2)
+
 def main():
     params = load_params()
-    
-    # Настройка клиента MLflow
-    client = MlflowClient()
-    
+
+    # Настройка клиента MLflow: то же хранилище, что и у стадии train
+    client = MlflowClient(tracking_uri())
+    # Длительность каждой операции с реестром (секунды) - в registry/model_info.json
+    timings = {}
+
     try:
         # Поиск последнего запуска
-        experiment = client.get_experiment_by_name("NPV_Prediction_DVC")
+        with timed(timings, 'get_experiment_s'):
+            experiment = client.get_experiment_by_name(EXPERIMENT_NAME)
         if not experiment:
             print("❌ Эксперимент не найден")
             # Создаем файл с ошибкой
-            registry_info = {"error": "Experiment not found"}
-            os.makedirs('registry', exist_ok=True)
-            with open('registry/model_info.json', 'w') as f:
-                json.dump(registry_info, f, indent=2)
+            save_registry_info({"error": "Experiment not found"})
             return
-            
-        runs = client.search_runs(experiment.experiment_id, order_by=["attributes.start_time DESC"])
-        
-        if runs:
-            latest_run = runs[0]
+
+        # Один запрос с фильтром и max_results=1: время не растёт с историей эксперимента
+        with timed(timings, 'search_runs_s'):
+            latest_run = latest_training_run(client, experiment.experiment_id)
+
+        if latest_run:
             run_id = latest_run.info.run_id
-            
+
             # Регистрация модели
             model_name = f"{params['model']['name']}_NPV"
-            
+
             try:
                 # Пробуем найти существующую модель
-                client.get_registered_model(model_name)
+                with timed(timings, 'get_registered_model_s'):
+                    client.get_registered_model(model_name)
                 print(f"Модель {model_name} уже существует")
                 model_status = "existing"
-            except:
+            except mlflow.exceptions.MlflowException:
                 # Создаем новую зарегистрированную модель
-                client.create_registered_model(model_name)
+                with timed(timings, 'create_registered_model_s'):
+                    client.create_registered_model(model_name)
                 print(f"Создана новая модель: {model_name}")
                 model_status = "new"
-            
+
             # Добавляем версию
-            model_version = client.create_model_version(
-                name=model_name,
-                source=f"mlruns/{experiment.experiment_id}/{run_id}/artifacts/model",
-                run_id=run_id
-            )
-            
+            with timed(timings, 'create_model_version_s'):
+                model_version = client.create_model_version(
+                    name=model_name,
+                    source=f"runs:/{run_id}/model",
+                    run_id=run_id
+                )
+
             # Сохраняем информацию о регистрации
             registry_info = {
                 "model_name": model_name,
                 "model_version": model_version.version,
                 "run_id": run_id,
                 "status": model_status,
-                "timestamp": datetime.now().isoformat()  # ИСПРАВЛЕНО!
+                "timestamp": datetime.now().isoformat(),  # ИСПРАВЛЕНО!
+                "timings_s": timings
             }
-            
-            # Создаем папку registry если не существует
-            os.makedirs('registry', exist_ok=True)
-            
+
             # Сохраняем информацию в файл
-            with open('registry/model_info.json', 'w') as f:
-                json.dump(registry_info, f, indent=2)
-            
+            save_registry_info(registry_info)
+
             print(f"✅ Модель {model_name} зарегистрирована в MLflow Model Registry")
             print(f"📁 Информация сохранена в registry/model_info.json")
-            
+            print("⏱ " + ", ".join(f"{name} {value * 1000:.1f} мс" for name, value in timings.items()))
+
         else:
             print("❌ Не найдены запуски для регистрации")
             # Создаем файл с ошибкой
-            os.makedirs('registry', exist_ok=True)
-            with open('registry/model_info.json', 'w') as f:
-                json.dump({"error": "No runs found"}, f, indent=2)
-                
+            save_registry_info({"error": "No runs found", "timings_s": timings})
+
     except Exception as e:
         print(f"❌ Ошибка при регистрации модели: {e}")
         # Создаем файл с информацией об ошибке
-        os.makedirs('registry', exist_ok=True)
-        with open('registry/model_info.json', 'w') as f:
-            json.dump({"error": str(e)}, f, indent=2)
+        save_registry_info({"error": str(e), "timings_s": timings})
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import yaml
+
+PREDICTION_COLUMN = 'NPV_pred'
+
+def load_params():
+    with open("params.yaml", "r") as f:
+        return yaml.safe_load(f)
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.parquet', '.pq'):
+        return 'parquet'
+    if ext in ('.xlsx', '.xlsm'):
+        return 'xlsx'
+    return 'csv'
+
+def iter_chunks(path, chunk_size):
+    """Читает входной файл кусками по chunk_size строк, не загружая его целиком"""
+    fmt = detect_format(path)
+    if fmt == 'csv':
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif fmt == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+        header = list(next(rows))
+        buffer = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            buffer.append(row)
+            if len(buffer) == chunk_size:
+                yield pd.DataFrame(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header)
+        workbook.close()
+
+class ChunkWriter:
+    """Дописывает результаты в выходной файл по мере расчёта"""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self.parquet_writer = None
+        self.first = True
+
+    def write(self, df):
+        if self.fmt == 'csv':
+            df.to_csv(self.path, mode='w' if self.first else 'a', header=self.first, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self.parquet_writer.write_table(table.cast(self.parquet_writer.schema))
+        self.first = False
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+def encode_chunk(chunk, encoder, feature_columns, categorical_columns):
+    """Тот же OneHotEncoder и порядок признаков, что в src/preprocess.py"""
+    encoded_cols = encoder.transform(chunk[categorical_columns])
+    encoded_df = pd.DataFrame(
+        encoded_cols,
+        columns=encoder.get_feature_names_out(categorical_columns),
+        index=chunk.index
+    )
+    X_processed = pd.concat([chunk.drop(categorical_columns, axis=1), encoded_df], axis=1)
+    return X_processed[feature_columns]
+
+def feature_columns_raw(feature_columns, encoder, categorical_columns):
+    """Исходные колонки входного файла, нужные модели"""
+    encoded = set(encoder.get_feature_names_out(categorical_columns))
+    return [c for c in feature_columns if c not in encoded] + list(categorical_columns)
+
+def score_chunk(chunk, model, encoder, feature_columns, categorical_columns):
+    # Строки с неизвестной категорией или пропусками не считаются, прогноз для них - NaN
+    valid = chunk[feature_columns_raw(feature_columns, encoder, categorical_columns)].notna().all(axis=1)
+    for column, categories in zip(categorical_columns, encoder.categories_):
+        valid &= chunk[column].isin(categories)
+
+    predictions = np.full(len(chunk), np.nan)
+    if valid.any():
+        X = encode_chunk(chunk[valid], encoder, feature_columns, categorical_columns)
+        predictions[valid.to_numpy()] = model.predict(X)
+
+    result = chunk.copy()
+    result[PREDICTION_COLUMN] = predictions
+    return result, int((~valid).sum())
+
+def main():
+    params = load_params()
+    scoring = params.get('scoring', {})
+
+    parser = argparse.ArgumentParser(description="Потоковый расчёт NPV для файла скважин-кандидатов")
+    parser.add_argument('--input', default=scoring.get('input_path'), help="CSV/Parquet/XLSX со скважинами")
+    parser.add_argument('--output', default=scoring.get('output_path'), help="Файл с результатами")
+    parser.add_argument('--chunk-size', type=int, default=scoring.get('chunk_size', 50000))
+    parser.add_argument('--threads', type=int, default=scoring.get('n_jobs', 0), help="Потоки XGBoost (0 - все ядра)")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default=None,
+                        help="Формат результата (по умолчанию - по расширению --output)")
+    args = parser.parse_args()
+
+    fmt = args.format or ('parquet' if detect_format(args.output) == 'parquet' else 'csv')
+    categorical_columns = params['features']['categorical_columns']
+
+    model = joblib.load('models/model.joblib')
+    encoder = joblib.load('models/encoder.joblib')
+    feature_columns = joblib.load('models/feature_columns.joblib')
+    if args.threads > 0:
+        model.set_params(n_jobs=args.threads)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    print(f"Скоринг {args.input} -> {args.output} (чанк {args.chunk_size} строк)...")
+    start = time.perf_counter()
+    n_rows = 0
+    n_skipped = 0
+    writer = ChunkWriter(args.output, fmt)
+    try:
+        for chunk in iter_chunks(args.input, args.chunk_size):
+            result, skipped = score_chunk(chunk, model, encoder, feature_columns, categorical_columns)
+            writer.write(result)
+            n_rows += len(chunk)
+            n_skipped += skipped
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Обработано строк: {n_rows}, пропущено невалидных: {n_skipped}")
+    print(f"   Время: {elapsed:.2f} с, {n_rows / elapsed if elapsed > 0 else 0:,.0f} строк/с")
+
+if __name__ == "__main__":
+    main()
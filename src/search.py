@@ -0,0 +1,218 @@
+"""
+Параллельная кросс-валидация и подбор гиперпараметров XGBoost.
+
+Фолды выполняются в пуле процессов. Бюджет ядер делится между внешним
+параллелизмом (процессы) и потоками XGBoost внутри каждого обучения, чтобы
+ядра не простаивали и не переподписывались. Данные не передаются в процессы:
+каждый процесс сам открывает обработанную выборку через mmap.
+"""
+import itertools
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+from xgboost import XGBRegressor
+
+from dataset import load_processed
+
+SCORERS = {
+    'r2': r2_score,
+    'neg_mean_absolute_error': lambda y, p: -mean_absolute_error(y, p),
+    'neg_root_mean_squared_error': lambda y, p: -math.sqrt(mean_squared_error(y, p)),
+}
+
+# Доля обучающей части фолда, отводимая под early stopping: число деревьев
+# не подбирается на той же части, на которой фолд оценивается
+VALIDATION_SIZE = 0.15
+
+_worker_data = None
+
+
+def core_budget(n_jobs=0):
+    """Число доступных ядер (n_jobs <= 0 - все ядра процесса)"""
+    if n_jobs and n_jobs > 0:
+        return n_jobs
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def split_budget(n_jobs, n_tasks, outer_jobs=0):
+    """Делит ядра: (процессов, потоков XGBoost на процесс)"""
+    budget = core_budget(n_jobs)
+    outer = outer_jobs if outer_jobs and outer_jobs > 0 else min(budget, n_tasks)
+    outer = max(1, min(outer, budget, n_tasks))
+    return outer, max(1, budget // outer)
+
+
+def _init_worker(processed_path):
+    global _worker_data
+    _worker_data = load_processed(processed_path)
+
+
+def inner_split(train_idx, validation_size):
+    """Обучающая часть фолда -> (строки для обучения, последние строки для early stopping)"""
+    n_stop = min(max(1, int(round(len(train_idx) * validation_size))), len(train_idx) - 1)
+    return train_idx[:len(train_idx) - n_stop], train_idx[len(train_idx) - n_stop:]
+
+
+def _fit_fold(task):
+    """
+    Обучение на одном фолде; выполняется в процессе пула.
+
+    С early stopping останавливающая выборка берётся из train_idx (inner_split),
+    фолд val_idx используется только для оценки.
+    """
+    trial_id, train_idx, val_idx, model_params, nthread, early_stopping_rounds, scoring, validation_size = task
+    X, y = _worker_data['X_train'], _worker_data['y_train']
+
+    model = XGBRegressor(
+        objective='reg:squarederror',
+        n_jobs=nthread,
+        early_stopping_rounds=early_stopping_rounds,
+        **model_params
+    )
+    eval_set = None
+    if early_stopping_rounds:
+        train_idx, stop_idx = inner_split(train_idx, validation_size)
+        eval_set = [(X[stop_idx], y[stop_idx])]
+    model.fit(X[train_idx], y[train_idx], eval_set=eval_set, verbose=False)
+
+    score = SCORERS[scoring](y[val_idx], model.predict(X[val_idx]))
+    best_iteration = model.best_iteration if early_stopping_rounds else model_params.get('n_estimators')
+    return trial_id, float(score), best_iteration
+
+
+class FoldRunner:
+    """Пул процессов, в котором считаются фолды всех испытаний"""
+
+    def __init__(self, processed_path, cv_folds, scoring='r2', n_jobs=0, outer_jobs=0, random_state=None,
+                 n_candidates=1, validation_size=VALIDATION_SIZE):
+        self.processed_path = processed_path
+        self.scoring = scoring
+        self.validation_size = validation_size
+        n_train = load_processed(processed_path)['meta']['n_train']
+        self.folds = list(KFold(n_splits=cv_folds).split(np.arange(n_train)))
+        self.outer, self.nthread = split_budget(n_jobs, n_tasks=cv_folds * n_candidates, outer_jobs=outer_jobs)
+        self.random_state = random_state
+        self._pool = None
+
+    def __enter__(self):
+        # spawn: дочерние процессы не наследуют состояние OpenMP родителя
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.outer,
+            mp_context=get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.processed_path,)
+        )
+        return self
+
+    def __exit__(self, *exc):
+        self._pool.shutdown()
+
+    def evaluate(self, candidates, early_stopping_rounds=None):
+        """CV для списка наборов параметров: [(mean, std, best_iteration, fold_scores)]"""
+        tasks = []
+        for trial_id, model_params in enumerate(candidates):
+            model_params = {'random_state': self.random_state, **model_params}
+            for train_idx, val_idx in self.folds:
+                tasks.append((trial_id, train_idx, val_idx, model_params, self.nthread,
+                              early_stopping_rounds, self.scoring, self.validation_size))
+
+        scores = [[] for _ in candidates]
+        iterations = [[] for _ in candidates]
+        for trial_id, score, best_iteration in self._pool.map(_fit_fold, tasks):
+            scores[trial_id].append(score)
+            iterations[trial_id].append(best_iteration)
+
+        return [
+            (float(np.mean(s)), float(np.std(s)), int(np.median(it)) if it[0] is not None else None, s)
+            for s, it in zip(scores, iterations)
+        ]
+
+
+def count_candidates(search):
+    """Число наборов параметров, которые поиск оценит в первом раунде"""
+    if not search.get('enabled', False):
+        return 1
+    grid_size = math.prod(len(values) for values in search['space'].values())
+    if search.get('method', 'random') == 'grid':
+        return grid_size
+    return min(grid_size, search.get('n_trials', 20))
+
+
+def generate_candidates(space, method, n_trials, seed):
+    """Наборы параметров для grid/random-поиска по пространству из params.yaml"""
+    names = sorted(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+    if method == 'grid' or n_trials >= len(grid):
+        return grid
+    return random.Random(seed).sample(grid, n_trials)
+
+
+def halving_schedule(candidates, halving):
+    """Ресурс (n_estimators) по раундам successive halving"""
+    factor = halving.get('factor', 3)
+    resource = halving.get('min_resource', 50)
+    max_resource = max(c.get('n_estimators', 100) for c in candidates)
+    schedule = [min(resource, max_resource)]
+    while schedule[-1] < max_resource:
+        schedule.append(min(schedule[-1] * factor, max_resource))
+    return schedule
+
+
+def run_search(runner, base_params, search, seed, on_trial=None):
+    """
+    Подбор гиперпараметров: grid, random или successive halving.
+
+    При halving ресурс - число деревьев: после каждого раунда остаётся 1/factor
+    лучших кандидатов, а n_estimators растёт в factor раз. on_trial(params, mean,
+    std, best_iteration, round) вызывается для каждого испытания.
+    Возвращает (лучшие параметры, mean, std).
+    """
+    method = search.get('method', 'random')
+    early_stopping_rounds = search.get('early_stopping_rounds')
+    pool = [
+        {**base_params, **c}
+        for c in generate_candidates(search['space'], method, search.get('n_trials', 20), seed)
+    ]
+
+    if method == 'halving':
+        factor = search.get('halving', {}).get('factor', 3)
+        schedule = halving_schedule(pool, search.get('halving', {}))
+    else:
+        factor, schedule = 1, [None]
+
+    round_id = 0
+    while True:
+        resource = schedule[round_id]
+        trial_params = pool if resource is None else [
+            {**c, 'n_estimators': min(resource, c.get('n_estimators', resource))} for c in pool
+        ]
+        results = runner.evaluate(trial_params, early_stopping_rounds)
+        for params, (mean, std, best_iteration, _) in zip(trial_params, results):
+            if on_trial:
+                on_trial(params, mean, std, best_iteration, round_id)
+
+        ranked = sorted(range(len(pool)), key=lambda i: results[i][0], reverse=True)
+        if round_id == len(schedule) - 1:
+            best = ranked[0]
+            mean, std, best_iteration, _ = results[best]
+            return finalize(trial_params[best], best_iteration, early_stopping_rounds), mean, std
+
+        pool = [pool[i] for i in ranked[:max(1, len(pool) // factor)]]
+        # Единственный оставшийся кандидат сразу проверяется на полном ресурсе
+        round_id = len(schedule) - 1 if len(pool) == 1 else round_id + 1
+
+
+def finalize(params, best_iteration, early_stopping_rounds):
+    """С early stopping итоговое число деревьев - медиана лучших итераций по фолдам"""
+    if early_stopping_rounds and best_iteration is not None:
+        return {**params, 'n_estimators': best_iteration + 1}
+    return params
@@ -0,0 +1,160 @@
+"""
+Работа с MLflow для стадий пайплайна: адрес хранилища, пакетное логирование
+в фоновом потоке и поиск последнего обучающего ран-а для регистрации.
+"""
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import mlflow
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+
+EXPERIMENT_NAME = "NPV_Prediction_DVC"
+LOCAL_STORE = 'mlruns'  # файловое хранилище, если MLFLOW_TRACKING_URI не задан (офлайн-запуск)
+# Тег итогового ран-а train: регистрация ищет только такие раны, вложенные раны подбора не подходят
+ROLE_TAG = 'npv.role'
+TRAIN_ROLE = 'train'
+PARENT_TAG = 'mlflow.parentRunId'
+# Ограничения одного вызова log_batch в MLflow
+MAX_PARAMS_PER_BATCH = 100
+MAX_METRICS_PER_BATCH = 1000
+
+
+def tracking_uri():
+    """MLFLOW_TRACKING_URI из окружения или локальное файловое хранилище ./mlruns"""
+    return os.getenv("MLFLOW_TRACKING_URI") or Path(LOCAL_STORE).resolve().as_uri()
+
+
+def configure(experiment=EXPERIMENT_NAME):
+    """Настраивает MLflow (адрес и эксперимент), возвращает адрес хранилища"""
+    uri = tracking_uri()
+    mlflow.set_tracking_uri(uri)
+    mlflow.set_experiment(experiment)
+    return uri
+
+
+@contextmanager
+def timed(timings, name):
+    """Записывает длительность блока в timings[name] (секунды)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def batch_chunks(metrics, params, tags):
+    """Делит метрики/параметры/теги на порции в пределах ограничений log_batch"""
+    metrics, params, tags = list(metrics), list(params), list(tags)
+    while metrics or params or tags:
+        yield metrics[:MAX_METRICS_PER_BATCH], params[:MAX_PARAMS_PER_BATCH], tags[:MAX_PARAMS_PER_BATCH]
+        metrics = metrics[MAX_METRICS_PER_BATCH:]
+        params = params[MAX_PARAMS_PER_BATCH:]
+        tags = tags[MAX_PARAMS_PER_BATCH:]
+
+
+def to_entities(metrics=None, params=None, tags=None, step=0):
+    timestamp = int(time.time() * 1000)
+    return (
+        [Metric(key, float(value), timestamp, step) for key, value in (metrics or {}).items() if value is not None],
+        [Param(key, str(value)) for key, value in (params or {}).items()],
+        [RunTag(key, str(value)) for key, value in (tags or {}).items()],
+    )
+
+
+class BatchLogger:
+    """
+    Логирование в MLflow из фонового потока: каждый вызов log() - один log_batch
+    (а не запрос на каждую метрику), обучение не ждёт ответа хранилища.
+
+        with mlflow.start_run() as run, BatchLogger(run.info.run_id) as logger:
+            logger.log(params=hyperparameters, metrics=metrics)
+
+    При выходе очередь дописывается до конца (до закрытия ран-а). Ошибки хранилища
+    не прерывают обучение: они печатаются и сохраняются в errors.
+    """
+
+    def __init__(self, run_id, client=None):
+        self.run_id = run_id
+        self.client = client or MlflowClient()
+        self.experiment_id = self.client.get_run(run_id).info.experiment_id
+        self.calls = 0
+        self.busy_s = 0.0  # время фонового потока в запросах к хранилищу
+        self.wait_s = 0.0  # сколько вызывающий поток ждал в flush()
+        self.errors = []
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, name='mlflow-logger', daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _worker(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                start = time.perf_counter()
+                try:
+                    task()
+                except Exception as e:
+                    self.errors.append(str(e))
+                    print(f"❌ Ошибка логирования в MLflow: {e}")
+                self.busy_s += time.perf_counter() - start
+            finally:
+                self._queue.task_done()
+
+    def _log_batch(self, run_id, metrics, params, tags):
+        for metric_part, param_part, tag_part in batch_chunks(metrics, params, tags):
+            self.client.log_batch(run_id, metrics=metric_part, params=param_part, tags=tag_part)
+            self.calls += 1
+
+    def log(self, metrics=None, params=None, tags=None, step=0):
+        """Ставит в очередь один log_batch в текущий ран (None-значения метрик пропускаются)"""
+        entities = to_entities(metrics, params, tags, step)
+        self._queue.put(lambda: self._log_batch(self.run_id, *entities))
+
+    def log_child(self, metrics=None, params=None, tags=None):
+        """Вложенный ран (например, испытание подбора): создание, один log_batch и закрытие - в фоне"""
+        entities = to_entities(metrics, params, tags)
+
+        def task():
+            child = self.client.create_run(self.experiment_id, tags={PARENT_TAG: self.run_id})
+            self._log_batch(child.info.run_id, *entities)
+            self.client.set_terminated(child.info.run_id)
+
+        self._queue.put(task)
+
+    def flush(self):
+        """Ждёт, пока очередь будет записана"""
+        start = time.perf_counter()
+        self._queue.join()
+        self.wait_s += time.perf_counter() - start
+
+    def close(self):
+        if self._thread.is_alive():
+            self.flush()
+            self._queue.put(None)
+            self._thread.join()
+
+
+def latest_training_run(client, experiment_id):
+    """
+    Последний завершённый ран стадии train: один отфильтрованный запрос с max_results=1
+    вместо выгрузки всей истории эксперимента.
+    """
+    runs = client.search_runs(
+        [experiment_id],
+        filter_string=f"tags.`{ROLE_TAG}` = '{TRAIN_ROLE}' and attributes.status = 'FINISHED'",
+        order_by=["attributes.start_time DESC"],
+        max_results=1
+    )
+    return runs[0] if runs else None
@@ -1,44 +1,244 @@
 import joblib
 import json
+import os
+import resource
+import time
+import numpy as np
+import xgboost as xgb
 from xgboost import XGBRegressor
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score, mean_absolute_percentage_error
-from sklearn.model_selection import cross_val_score
 import yaml
 import mlflow
 
+from dataset import as_frame, load_processed, make_dmatrix
+from search import VALIDATION_SIZE, FoldRunner, count_candidates, run_search
+from tracking import ROLE_TAG, TRAIN_ROLE, BatchLogger, configure
+
+QUANTILES_DIR = 'models/quantiles'
+QUANTILES_MODEL_FILE = 'model.ubj'
+
 def load_params():
     with open("params.yaml", "r") as f:
         return yaml.safe_load(f)
 
+def peak_rss_mb():
+    """Пиковый RSS процесса (ru_maxrss в Linux - в КБ)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def fit_standard(X_train, y_train, hyperparameters, random_state):
+    """Обычное обучение XGBRegressor с фиксированным числом деревьев"""
+    model = XGBRegressor(
+        random_state=random_state,
+        objective='reg:squarederror',
+        **hyperparameters
+    )
+    model.fit(X_train, y_train)
+    return model, hyperparameters.get('n_estimators', 100) - 1
+
+def fit_fast(X_train, y_train, hyperparameters, fast, random_state, feature_names):
+    """
+    Быстрое обучение: tree_method='hist' на QuantileDMatrix и early stopping
+    по валидационной части, выделенной из обучающей выборки.
+    """
+    train_idx, val_idx = train_test_split(
+        range(len(y_train)), test_size=fast.get('validation_size', 0.1), random_state=random_state
+    )
+    dtrain = make_dmatrix(X_train[train_idx], y_train[train_idx], feature_names,
+                          quantile=True, max_bin=fast.get('max_bin', 256))
+    dval = make_dmatrix(X_train[val_idx], y_train[val_idx], feature_names, quantile=True, ref=dtrain)
+
+    booster_params = {k: v for k, v in hyperparameters.items() if k != 'n_estimators'}
+    booster_params.update(
+        objective='reg:squarederror',
+        tree_method='hist',
+        max_bin=fast.get('max_bin', 256),
+        seed=random_state
+    )
+    booster = xgb.train(
+        booster_params, dtrain,
+        num_boost_round=hyperparameters.get('n_estimators', 100),
+        evals=[(dval, 'validation')],
+        early_stopping_rounds=fast.get('early_stopping_rounds', 50),
+        verbose_eval=False
+    )
+
+    # Тот же тип артефакта, что и в обычном режиме: API и evaluate работают без изменений
+    model = XGBRegressor(objective='reg:squarederror', tree_method='hist', max_bin=fast.get('max_bin', 256))
+    model.load_model(bytearray(booster.save_raw(raw_format='ubj')))
+    return model, booster.best_iteration
+
+def fit_warm_start(X_new, y_new, hyperparameters, rounds, random_state, feature_names):
+    """Продолжение бустинга сохранённой модели на новых строках (xgb_model=)"""
+    previous = joblib.load('models/model.joblib')
+    if len(y_new) == 0:
+        return previous, previous.get_booster().num_boosted_rounds() - 1
+    # best_iteration модели быстрого режима переходит в продолженный бустер, и predict,
+    # iteration_range бандла и compact остановились бы на старых деревьях: атрибуты сбрасываются
+    booster = previous.get_booster().copy()
+    booster.set_attr(best_iteration=None, best_score=None)
+    model = XGBRegressor(
+        random_state=random_state,
+        objective='reg:squarederror',
+        **{**hyperparameters, 'n_estimators': rounds}
+    )
+    model.fit(as_frame(X_new, feature_names), y_new, xgb_model=booster)
+
+    # Проверка: прогноз дообученной модели использует все деревья, включая новые
+    fitted = model.get_booster()
+    n_rounds = fitted.num_boosted_rounds()
+    sample = as_frame(X_new[:100], feature_names)
+    if not np.allclose(model.predict(sample), fitted.inplace_predict(sample, iteration_range=(0, n_rounds))):
+        raise ValueError("Дообученная модель предсказывает не всеми деревьями (best_iteration предыдущей модели)")
+    return model, n_rounds - 1
+
+def fit_quantiles(X_train, y_train, hyperparameters, alphas, random_state):
+    """Квантильная модель: один бустер с выходом на каждый квантиль (quantile_alpha - список)"""
+    model = XGBRegressor(
+        random_state=random_state,
+        **{**hyperparameters, 'tree_method': 'hist'},
+        objective='reg:quantileerror',
+        quantile_alpha=list(alphas)
+    )
+    model.fit(X_train, y_train)
+    return model
+
+def save_quantiles(model, alphas, feature_names, directory=QUANTILES_DIR):
+    """
+    Сохраняет квантильный бустер в нативном формате и quantiles.json.
+
+    Каталог пишется всегда (это выход DVC-стадии): при выключенных квантилях в нём только
+    quantiles.json с enabled=false.
+    """
+    os.makedirs(directory, exist_ok=True)
+    model_path = os.path.join(directory, QUANTILES_MODEL_FILE)
+    if os.path.exists(model_path):
+        os.remove(model_path)
+    spec = {'enabled': model is not None}
+    if model is not None:
+        booster = model.get_booster()
+        booster.feature_names = feature_names
+        booster.save_model(model_path)
+        spec.update(alphas=list(alphas), model_file=QUANTILES_MODEL_FILE, iteration_range=[0, 0],
+                    feature_columns=list(feature_names))
+    with open(os.path.join(directory, 'quantiles.json'), 'w') as f:
+        json.dump(spec, f, indent=2)
+
+def cross_validate(params, hyperparameters, search, random_state, cv_early_stopping, logger,
+                   validation_size=VALIDATION_SIZE):
+    """
+    Кросс-валидация (и подбор параметров): (hyperparameters, cv_mean, cv_std).
+
+    С early stopping (быстрый режим, подбор) деревья останавливаются по validation_size
+    обучающей части каждого фолда, а не по оцениваемому фолду.
+    """
+    # Фолды считаются параллельно в пуле процессов
+    with FoldRunner(
+        params['data']['processed_path'],
+        cv_folds=params['training']['cv_folds'],
+        scoring=params['training']['scoring'],
+        n_jobs=search.get('n_jobs', 0),
+        outer_jobs=search.get('outer_jobs', 0),
+        random_state=random_state,
+        n_candidates=count_candidates(search),
+        validation_size=validation_size
+    ) as runner:
+        print(f"Кросс-валидация: {runner.outer} процессов x {runner.nthread} потоков XGBoost")
+        if search.get('enabled', False):
+            print(f"Подбор гиперпараметров ({search.get('method', 'random')})...")
+
+            def log_trial(trial_params, mean, std, best_iteration, round_id):
+                # Вложенный ран испытания пишется в фоне, подбор не ждёт хранилище
+                logger.log_child(
+                    params=trial_params,
+                    metrics={'cv_mean': mean, 'cv_std': std, 'round': round_id, 'best_iteration': best_iteration}
+                )
+
+            hyperparameters, cv_mean, cv_std = run_search(
+                runner, hyperparameters, search, random_state, on_trial=log_trial
+            )
+            print(f"Лучшие параметры: {hyperparameters} (CV {cv_mean:.4f} ± {cv_std:.4f})")
+        else:
+            [(cv_mean, cv_std, _, _)] = runner.evaluate([hyperparameters], cv_early_stopping)
+    return hyperparameters, cv_mean, cv_std
+
 def main():
     params = load_params()
     
     # Загрузка данных
     print("Загрузка обработанных данных...")
-    data = joblib.load(params['data']['processed_path'])
+    data = load_processed(params['data']['processed_path'])
     X_train, X_test, y_train, y_test = data['X_train'], data['X_test'], data['y_train'], data['y_test']
     
-    # Настройка MLflow
-    mlflow.set_tracking_uri("http://localhost:5000")
-    mlflow.set_experiment("NPV_Prediction_DVC")
+    # Настройка MLflow: MLFLOW_TRACKING_URI или локальное хранилище ./mlruns
+    print(f"MLflow: {configure()}")
     
-    with mlflow.start_run():
-        # Обучение модели
-        print("Обучение модели...")
-        model = XGBRegressor(
-            random_state=params['preprocessing']['random_state'],
-            objective='reg:squarederror',
-            **params['model']['hyperparameters']
-        )
-        
-        model.fit(X_train, y_train)
-        
-        # Кросс-валидация
-        cv_scores = cross_val_score(
-            model, X_train, y_train, 
-            cv=params['training']['cv_folds'],
-            scoring=params['training']['scoring']
-        )
+    search = params.get('search', {})
+    random_state = params['preprocessing']['random_state']
+    hyperparameters = dict(params['model']['hyperparameters'])
+
+    # Режим обучения: standard или fast (hist + QuantileDMatrix + early stopping)
+    mode = params['training'].get('mode', 'standard')
+    fast = params['training'].get('fast', {})
+    cv_early_stopping = None
+    cv_validation_size = search.get('validation_size', VALIDATION_SIZE)
+    if mode == 'fast':
+        hyperparameters.update(tree_method='hist', max_bin=fast.get('max_bin', 256))
+        cv_early_stopping = fast.get('early_stopping_rounds', 50)
+        if not search.get('enabled', False):
+            # Как у итоговой модели fit_fast: останавливающая часть - доля обучающей выборки фолда
+            cv_validation_size = fast.get('validation_size', 0.1)
+
+    # Дообучение (xgb_model=) после инкрементальной предобработки вместо обучения с нуля
+    warm_start = (
+        params['training'].get('warm_start', False)
+        and data['meta'].get('mode') == 'incremental'
+        and os.path.exists('models/model.joblib')
+        and os.path.exists('models/metrics.json')
+    )
+
+    with mlflow.start_run(tags={ROLE_TAG: TRAIN_ROLE}) as run, BatchLogger(run.info.run_id) as logger:
+        if warm_start:
+            # Дообучение: CV не пересчитывается, метрики CV - от предыдущего полного обучения
+            with open('models/metrics.json', 'r') as f:
+                previous_metrics = json.load(f)
+            cv_mean, cv_std = previous_metrics['cv_mean'], previous_metrics['cv_std']
+        else:
+            hyperparameters, cv_mean, cv_std = cross_validate(
+                params, hyperparameters, search, random_state, cv_early_stopping, logger, cv_validation_size
+            )
+
+        # Обучение итоговой модели
+        print(f"Обучение модели (режим {'warm start' if warm_start else mode})...")
+        start = time.perf_counter()
+        if warm_start:
+            n_new = data['meta']['n_new_train']
+            print(f"Дообучение существующей модели на {n_new} новых строках...")
+            model, best_iteration = fit_warm_start(
+                X_train[len(X_train) - n_new:], y_train[len(y_train) - n_new:], hyperparameters,
+                params['training'].get('warm_start_rounds', 50), random_state, data['feature_names']
+            )
+        elif mode == 'fast':
+            model, best_iteration = fit_fast(
+                X_train, y_train, hyperparameters, fast, random_state, data['feature_names']
+            )
+        else:
+            model, best_iteration = fit_standard(X_train, y_train, hyperparameters, random_state)
+        train_time = time.perf_counter() - start
+        # Массивы без имён колонок: имена признаков сохраняем в бустере для инференса
+        model.get_booster().feature_names = data['feature_names']
+
+        # Квантили всегда обучаются заново на всей обучающей выборке (и при warm start)
+        quantiles = params['training'].get('quantiles', {})
+        quantile_model = None
+        extra_metrics = {}
+        if quantiles.get('enabled', False):
+            alphas = quantiles.get('alphas', [0.1, 0.5, 0.9])
+            print(f"Обучение квантильной модели {alphas}...")
+            start = time.perf_counter()
+            quantile_model = fit_quantiles(X_train, y_train, hyperparameters, alphas, random_state)
+            extra_metrics['quantile_train_time_s'] = time.perf_counter() - start
+        save_quantiles(quantile_model, quantiles.get('alphas'), data['feature_names'])
         
         # Предсказания и метрики
         y_pred = model.predict(X_test)
@@ -46,14 +246,15 @@ def main():
             'mae': mean_absolute_error(y_test, y_pred),
             'r2': r2_score(y_test, y_pred),
             'mape': mean_absolute_percentage_error(y_test, y_pred),
-            'cv_mean': cv_scores.mean(),
-            'cv_std': cv_scores.std()
+            'cv_mean': cv_mean,
+            'cv_std': cv_std,
+            'train_time_s': train_time,
+            'peak_rss_mb': peak_rss_mb(),
+            'best_iteration': best_iteration
         }
         
-        # Логирование в MLflow
-        mlflow.log_params(params['model']['hyperparameters'])
-        for metric, value in metrics.items():
-            mlflow.log_metric(metric, value)
+        # Логирование в MLflow: параметры и метрики одним log_batch в фоне
+        logger.log(params=hyperparameters, metrics={**metrics, **extra_metrics})
         
         mlflow.sklearn.log_model(model, "model")
         
@@ -61,8 +262,22 @@ def main():
         joblib.dump(model, 'models/model.joblib')
         with open('models/metrics.json', 'w') as f:
             json.dump(metrics, f, indent=2)
+        with open('models/best_params.json', 'w') as f:
+            json.dump({
+                'source': 'warm_start' if warm_start else 'search' if search.get('enabled', False) else 'params',
+                'hyperparameters': hyperparameters,
+                'cv_mean': cv_mean,
+                'cv_std': cv_std
+            }, f, indent=2)
         
         print(f"✅ Модель обучена. R2: {metrics['r2']:.4f}")
+        print(f"   Время обучения: {train_time:.2f} с, пик RSS: {metrics['peak_rss_mb']:.0f} МБ, "
+              f"лучшая итерация: {best_iteration}")
+
+        # Дописываем очередь до закрытия ран-а
+        logger.flush()
+        print(f"   MLflow: {logger.calls} вызовов log_batch, {logger.busy_s:.2f} с в фоне, "
+              f"ожидание {logger.wait_s:.2f} с")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
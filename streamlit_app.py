@@ -1,10 +1,27 @@
 import streamlit as st
-import requests
 import pandas as pd
+import numpy as np
+import hashlib
+import io
 import json
 import os
 from datetime import datetime
 
+from npv_client import NPVAPIError, NPVClient, PredictionHistory
+from npv_client.base import to_columns
+from serving.features import field_specs, validate_columns
+from serving.schemas import InputData
+
+# Поля скважины и их ограничения - из схемы API, чтобы файл проверялся по тем же правилам
+INPUT_SPECS = field_specs(InputData)
+INPUT_FIELDS = tuple(INPUT_SPECS)
+CATEGORICAL_FIELD = next(name for name, (annotation, _, _) in INPUT_SPECS.items() if annotation is str)
+
+HISTORY_SIZE = 1000  # записей в истории одиночных предсказаний
+HISTORY_SHOWN = 50  # последних записей в таблице
+PAGE_SIZES = [25, 50, 100, 500]  # строк на странице результатов пакета
+MAX_ERRORS_SHOWN = 1000  # строк в таблице ошибок валидации
+
 # Настройки страницы
 st.set_page_config(
     page_title="NPV Prediction App",
@@ -30,61 +47,119 @@ MLFLOW_URL = st.sidebar.text_input(
     help="Введите URL MLflow сервера"
 )
 
+# Один клиент с пулом соединений на URL: переживает перерисовки и общий для всех сессий
+@st.cache_resource
+def get_client(api_url):
+    return NPVClient(api_url, timeout=10, cache_ttl_s=30)
+
+client = get_client(API_URL)
+
 # Функция для проверки соединения с API
 def check_api_health():
-    try:
-        response = requests.get(f"{API_URL}/health", timeout=5)
-        return response.status_code == 200
-    except:
-        return False
+    return client.health()
 
 # Функция для получения прогноза
 def get_prediction(data):
     try:
-        response = requests.post(
-            f"{API_URL}/predict",
-            json=data,
-            timeout=10
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return {"error": f"Ошибка API: {response.status_code} - {response.text}"}
-    except Exception as e:
-        return {"error": f"Ошибка соединения: {str(e)}"}
+        return client.predict(data)
+    except NPVAPIError as e:
+        if e.status_code is None:
+            return {"error": str(e)}
+        return {"error": f"Ошибка API: {e.status_code} - {e.detail}"}
 
-# Функция для получения информации о модели
+# Функция для получения информации о модели (клиент кэширует ответ на 30 с)
 def get_model_info():
     try:
-        response = requests.get(f"{API_URL}/model_info", timeout=5)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-    except:
+        return client.model_info()
+    except NPVAPIError:
         return None
 
-# Функция для получения метрик из DVC
-def get_dvc_metrics():
+# Файлы на диске перечитываются, только когда меняется их mtime (ключ кэша)
+def file_mtime(path):
     try:
-        if os.path.exists('models/metrics.json'):
-            with open('models/metrics.json', 'r') as f:
-                return json.load(f)
-        return None
-    except:
+        return os.path.getmtime(path)
+    except OSError:
         return None
 
-# Функция для получения параметров модели
-def get_model_params():
+@st.cache_data
+def read_json(path, mtime):
     try:
-        if os.path.exists('params.yaml'):
-            import yaml
-            with open('params.yaml', 'r') as f:
-                return yaml.safe_load(f)
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
         return None
-    except:
+
+@st.cache_data
+def read_yaml(path, mtime):
+    try:
+        import yaml
+        with open(path, 'r') as f:
+            return yaml.safe_load(f)
+    except (OSError, ValueError):
         return None
 
+# Функция для получения метрик из DVC
+def get_dvc_metrics():
+    mtime = file_mtime('models/metrics.json')
+    return read_json('models/metrics.json', mtime) if mtime is not None else None
+
+# Функция для получения параметров модели
+def get_model_params():
+    mtime = file_mtime('params.yaml')
+    return read_yaml('params.yaml', mtime) if mtime is not None else None
+
+# Пакетный режим: чтение, проверка и сборка результатов кэшируются по хэшу содержимого файла
+@st.cache_data(max_entries=4)
+def read_wells(name, digest, _content):
+    if name.lower().endswith('.xlsx'):
+        return pd.read_excel(io.BytesIO(_content))
+    return pd.read_csv(io.BytesIO(_content))
+
+@st.cache_data(max_entries=4)
+def validate_wells(digest, _wells, categories):
+    """Проверка таблицы целиком по колонкам (как в /predict_batch); строки с ошибками в API не уходят"""
+    n_rows = len(_wells)
+    missing = [name for name in INPUT_FIELDS if name not in _wells.columns]
+    if missing:
+        return {"n_rows": n_rows, "n_valid": 0, "missing": missing, "errors": [], "valid_index": []}
+    columns, _ = to_columns(_wells[list(INPUT_FIELDS)])
+    if not categories:
+        # API без списка категорий: неизвестные значения отклонит сам API
+        categories = sorted({v for v in columns[CATEGORICAL_FIELD] if isinstance(v, str)})
+    _, errors = validate_columns(columns, INPUT_SPECS, list(categories), n_rows)
+    valid_index = [i for i in range(n_rows) if i not in errors]
+    return {
+        "n_rows": n_rows,
+        "n_valid": len(valid_index),
+        "missing": [],
+        "errors": [{"индекс": i, "ошибки": "; ".join(errors[i])} for i in sorted(errors)],
+        "valid_index": valid_index,
+    }
+
+def batch_frame(wells, report, result):
+    """Исходная таблица + прогноз (и квантили) + ошибки; невалидные строки получают NaN"""
+    frame = wells.copy()
+    valid_index = np.asarray(report["valid_index"], dtype=int)
+
+    def column(values):
+        full = np.full(len(frame), np.nan)
+        full[valid_index] = np.asarray(values, dtype=float)
+        return full
+
+    frame["NPV_pred"] = column(result["predicted_NPV"])
+    for label, values in result.get("quantiles", {}).items():
+        frame[f"NPV_{label}"] = column(values)
+
+    errors = {e["индекс"]: e["ошибки"] for e in report["errors"]}
+    for e in result["errors"]:
+        errors[int(valid_index[e["index"]])] = "; ".join(e["errors"])
+    frame["errors"] = pd.Series(errors, dtype=object).reindex(range(len(frame))).to_numpy()
+    return frame
+
+@st.cache_data(max_entries=4)
+def frame_to_csv(key, _frame):
+    return _frame.to_csv(index=False).encode('utf-8')
+
 # Проверка соединения с API
 st.sidebar.header("🔗 Соединение")
 if st.sidebar.button("Проверить соединение с API"):
@@ -93,93 +168,164 @@ if st.sidebar.button("Проверить соединение с API"):
     else:
         st.sidebar.error("❌ API недоступен")
 
-# Основная форма для ввода данных
-st.header("📝 Ввод параметров")
-
-col1, col2 = st.columns(2)
-
-with col1:
-    st.subheader("Геологические параметры")
-    heff = st.number_input("Эффективная высота (Heff)", min_value=0.0, value=10.0, step=0.1, 
-                          help="Эффективная высота пласта")
-    perm = st.number_input("Проницаемость (Perm)", min_value=0.0, value=100.0, step=1.0,
-                          help="Проницаемость породы")
-    sg = st.slider("Газонасыщенность (Sg)", min_value=0.0, max_value=1.0, value=0.8, step=0.01,
-                  help="Доля газа в пласте")
-    c5 = st.number_input("Содержание C5+", min_value=0.0, value=0.5, step=0.1,
-                        help="Содержание тяжелых углеводородов")
-
-with col2:
-    st.subheader("Технологические параметры")
-    l_hor = st.number_input("Горизонтальная длина (L_hor)", min_value=0.0, value=500.0, step=10.0,
-                           help="Длина горизонтального участка")
-    gs = st.selectbox("Тип проводки ствола", ["S-TYPE", "U-TYPE", "VGS", "GS", "NGS"],
-                     help="Конфигурация скважины")
-    temp = st.number_input("Темп падения", min_value=0.0, value=20.0, step=0.1,
-                          help="Температура в пласте")
-    grp = st.number_input("Количество стадий ГРП", min_value=0, value=1, step=1,
-                         help="Количество стадий гидроразрыва пласта")
-    ngs = st.number_input("Количество горизонтальных стволов", min_value=0, value=2, step=1,
-                         help="Количество ветвей скважины")
-
-# Кнопка предсказания
-if st.button("🎯 Рассчитать NPV", type="primary"):
-    # Подготовка данных для API
-    input_data = {
-        "Heff": heff,
-        "Perm": perm,
-        "Sg": sg,
-        "L_hor": l_hor,
-        "GS": gs,
-        "temp": temp,
-        "C5": c5,
-        "GRP": grp,
-        "nGS": ngs
-    }
+# История одиночных предсказаний: не больше HISTORY_SIZE записей по колонкам
+if 'prediction_history' not in st.session_state:
+    st.session_state.prediction_history = PredictionHistory(capacity=HISTORY_SIZE)
+
+tab_single, tab_batch = st.tabs(["🎯 Одна скважина", "📂 Пакет скважин"])
+
+with tab_single:
+    # Основная форма для ввода данных
+    st.subheader("📝 Ввод параметров")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("**Геологические параметры**")
+        heff = st.number_input("Эффективная высота (Heff)", min_value=0.0, value=10.0, step=0.1, 
+                              help="Эффективная высота пласта")
+        perm = st.number_input("Проницаемость (Perm)", min_value=0.0, value=100.0, step=1.0,
+                              help="Проницаемость породы")
+        sg = st.slider("Газонасыщенность (Sg)", min_value=0.0, max_value=1.0, value=0.8, step=0.01,
+                      help="Доля газа в пласте")
+        c5 = st.number_input("Содержание C5+", min_value=0.0, value=0.5, step=0.1,
+                            help="Содержание тяжелых углеводородов")
+
+    with col2:
+        st.markdown("**Технологические параметры**")
+        l_hor = st.number_input("Горизонтальная длина (L_hor)", min_value=0.0, value=500.0, step=10.0,
+                               help="Длина горизонтального участка")
+        gs = st.selectbox("Тип проводки ствола", ["S-TYPE", "U-TYPE", "VGS", "GS", "NGS"],
+                         help="Конфигурация скважины")
+        temp = st.number_input("Темп падения", min_value=0.0, value=20.0, step=0.1,
+                              help="Температура в пласте")
+        grp = st.number_input("Количество стадий ГРП", min_value=0, value=1, step=1,
+                             help="Количество стадий гидроразрыва пласта")
+        ngs = st.number_input("Количество горизонтальных стволов", min_value=0, value=2, step=1,
+                             help="Количество ветвей скважины")
+
+    # Кнопка предсказания
+    if st.button("🎯 Рассчитать NPV", type="primary"):
+        # Подготовка данных для API
+        input_data = {
+            "Heff": heff,
+            "Perm": perm,
+            "Sg": sg,
+            "L_hor": l_hor,
+            "GS": gs,
+            "temp": temp,
+            "C5": c5,
+            "GRP": grp,
+            "nGS": ngs
+        }
     
-    # Получение прогноза
-    with st.spinner("Получение прогноза..."):
-        result = get_prediction(input_data)
+        # Получение прогноза
+        with st.spinner("Получение прогноза..."):
+            result = get_prediction(input_data)
     
-    # Отображение результатов
-    if "predicted_NPV" in result:
-        # Красивое отображение результата
-        st.success(f"## Прогнозируемый NPV: **${result['predicted_NPV']:,.2f}**")
+        # Отображение результатов
+        if "predicted_NPV" in result:
+            # Красивое отображение результата
+            st.success(f"## Прогнозируемый NPV: **${result['predicted_NPV']:,.2f}**")
+            if "interval" in result:
+                st.caption(" · ".join(f"{label}: ${value:,.2f}" for label, value in result["interval"].items()))
         
-        # Дополнительная аналитика
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("NPV", f"${result['predicted_NPV']:,.2f}")
-        with col2:
-            # Пример дополнительной метрики
-            st.metric("Статус", "✅ Успешно")
-        with col3:
-            st.metric("Время", datetime.now().strftime("%H:%M:%S"))
+            # Дополнительная аналитика
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("NPV", f"${result['predicted_NPV']:,.2f}")
+            with col2:
+                # Пример дополнительной метрики
+                st.metric("Статус", "✅ Успешно")
+            with col3:
+                st.metric("Время", datetime.now().strftime("%H:%M:%S"))
         
-        # Детальная информация
-        with st.expander("📊 Детали запроса и ответа"):
-            st.subheader("Входные параметры")
-            st.json(input_data)
+            # Детальная информация
+            with st.expander("📊 Детали запроса и ответа"):
+                st.subheader("Входные параметры")
+                st.json(input_data)
             
-            st.subheader("Ответ API")
-            st.json(result)
+                st.subheader("Ответ API")
+                st.json(result)
             
-            # История предсказаний (в сессии)
-            if 'prediction_history' not in st.session_state:
-                st.session_state.prediction_history = []
+                # История предсказаний (в сессии): кольцевой буфер, старые записи вытесняются
+                history = st.session_state.prediction_history
+                history.append(input_data, result['predicted_NPV'])
             
-            st.session_state.prediction_history.append({
-                'timestamp': datetime.now().isoformat(),
-                'input': input_data,
-                'prediction': result['predicted_NPV']
-            })
-            
-            st.subheader("История предсказаний")
-            if st.session_state.prediction_history:
-                history_df = pd.DataFrame(st.session_state.prediction_history)
-                st.dataframe(history_df)
-    else:
-        st.error(f"Ошибка: {result.get('error', 'Неизвестная ошибка')}")
+                st.subheader(f"История предсказаний (последние {HISTORY_SHOWN} из {len(history)})")
+                st.dataframe(history.to_frame(last=HISTORY_SHOWN))
+        else:
+            st.error(f"Ошибка: {result.get('error', 'Неизвестная ошибка')}")
+
+with tab_batch:
+    st.subheader("📂 Пакетный расчёт из файла")
+    st.markdown(
+        "CSV или XLSX, одна строка - одна скважина, колонки: "
+        + ", ".join(f"`{name}`" for name in INPUT_FIELDS)
+    )
+    uploaded = st.file_uploader("Файл со скважинами", type=["csv", "xlsx"])
+
+    if uploaded is not None:
+        content = uploaded.getvalue()
+        digest = hashlib.sha1(content).hexdigest()
+        try:
+            wells_df = read_wells(uploaded.name, digest, content)
+        except Exception as e:
+            st.error(f"Не удалось прочитать файл: {e}")
+            st.stop()
+
+        info = get_model_info() or {}
+        report = validate_wells(digest, wells_df, tuple(info.get("categories") or ()))
+
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Строк", report["n_rows"])
+        c2.metric("Валидных", report["n_valid"])
+        c3.metric("С ошибками", report["n_rows"] - report["n_valid"])
+
+        if report["missing"]:
+            st.error(f"В файле нет колонок: {', '.join(report['missing'])}")
+            st.stop()
+        if report["errors"]:
+            with st.expander(f"⚠️ Ошибки валидации ({len(report['errors'])} строк)"):
+                st.dataframe(pd.DataFrame(report["errors"][:MAX_ERRORS_SHOWN]), use_container_width=True)
+            st.caption("Строки с ошибками не отправляются в API")
+
+        if st.button("🚀 Рассчитать пакет", type="primary", disabled=report["n_valid"] == 0):
+            valid = wells_df.iloc[report["valid_index"]][list(INPUT_FIELDS)]
+            progress = st.progress(0.0, text="Расчёт...")
+            try:
+                result = client.predict_batch(
+                    valid,
+                    on_progress=lambda done, total: progress.progress(done / total, text=f"Рассчитано {done} из {total}")
+                )
+            except NPVAPIError as e:
+                progress.empty()
+                st.error(f"Ошибка API: {e}")
+                st.stop()
+            progress.progress(1.0, text=f"✅ Рассчитано {result['n_valid']} строк")
+            st.session_state.batch_result = {
+                "digest": digest,
+                "scored_at": datetime.now().isoformat(),
+                "frame": batch_frame(wells_df, report, result),
+                "name": os.path.splitext(uploaded.name)[0],
+            }
+
+        batch = st.session_state.get("batch_result")
+        if batch is not None and batch["digest"] == digest:
+            frame = batch["frame"]
+            st.markdown("**Результаты**")
+            p1, p2 = st.columns(2)
+            page_size = p1.selectbox("Строк на странице", PAGE_SIZES, index=1)
+            n_pages = max(1, -(-len(frame) // page_size))
+            page = p2.number_input(f"Страница (из {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+            st.dataframe(frame.iloc[(page - 1) * page_size:page * page_size], use_container_width=True)
+            st.download_button(
+                "💾 Скачать CSV",
+                data=frame_to_csv((digest, batch["scored_at"]), frame),
+                file_name=f"{batch['name']}_npv.csv",
+                mime="text/csv"
+            )
+
 
 # Боковая панель с информацией
 st.sidebar.header("ℹ️ Информация о системе")
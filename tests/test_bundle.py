@@ -0,0 +1,24 @@
+"""Набор артефактов ModelBundle без быстрого пути (NPV_FAST_PATH=0)."""
+import os
+
+import pytest
+
+from serving.bundle import MODEL_ARTIFACTS, REGISTRY_PATH, ModelBundle
+from serving.quantiles import QUANTILES_SPEC
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(
+    not all(os.path.exists(os.path.join(ROOT, path)) for path in MODEL_ARTIFACTS),
+    reason="нет артефактов модели (dvc pull / dvc repro)"
+)
+
+
+def test_fallback_plan_is_built_once_per_bundle():
+    paths = [os.path.join(ROOT, path) for path in MODEL_ARTIFACTS]
+    bundle = ModelBundle.load(paths, os.path.join(ROOT, REGISTRY_PATH), os.path.join(ROOT, QUANTILES_SPEC))
+    bundle.prepare(fast_path=False)
+
+    assert bundle.plan is None
+    plan = bundle.feature_plan()
+    assert bundle.feature_plan() is plan
@@ -0,0 +1,97 @@
+"""Совпадение быстрого пути FeaturePlan с эталонным DataFrame-путём (serving.parity) в пределах TOLERANCE."""
+import os
+
+import joblib
+import numpy as np
+import pytest
+import yaml
+
+from serving.bundle import SERVING_BUNDLE_SPEC, SERVING_MODEL_PATH, load_serving_plan
+from serving.features import FeaturePlan, InvalidInputError
+from serving.parity import TOLERANCE, check_parity, dataset_rows, predict_dataframe, synthetic_rows
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATHS = [os.path.join(ROOT, 'models', name)
+               for name in ('model.joblib', 'encoder.joblib', 'feature_columns.joblib')]
+
+pytestmark = [
+    pytest.mark.skipif(not all(os.path.exists(path) for path in MODEL_PATHS),
+                       reason="нет артефактов модели (dvc pull / dvc repro)"),
+    # Эталонный путь кодирует GS списком без имён колонок - предупреждение scikit-learn ожидаемо
+    pytest.mark.filterwarnings("ignore:X does not have valid feature names"),
+]
+
+
+def encoder_categories():
+    if not os.path.exists(MODEL_PATHS[1]):
+        return []
+    return [str(category) for category in joblib.load(MODEL_PATHS[1]).categories_[0]]
+
+
+@pytest.fixture(scope='module')
+def artifacts():
+    model, encoder, feature_columns = (joblib.load(path) for path in MODEL_PATHS)
+    return model, encoder, feature_columns
+
+
+@pytest.fixture(scope='module')
+def plan(artifacts):
+    return FeaturePlan.from_encoder(*artifacts)
+
+
+@pytest.fixture(scope='module')
+def test_rows(artifacts, plan):
+    from src.dataset import as_frame, load_processed
+
+    with open(os.path.join(ROOT, 'params.yaml'), 'r') as f:
+        params = yaml.safe_load(f)
+    path = os.path.join(ROOT, params['data']['processed_path'])
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        pytest.skip("нет обработанной выборки (dvc repro preprocess)")
+    data = load_processed(path)
+    return dataset_rows(as_frame(data['X_test'], data['feature_names']), artifacts[1], plan)
+
+
+def assert_parity(plan, artifacts, rows):
+    max_diff, mismatches = check_parity(plan, *artifacts, rows)
+    assert not mismatches, f"{len(mismatches)} из {len(rows)} строк расходятся, max |diff| = {max_diff:.3e}"
+
+
+def test_plan_covers_every_category(artifacts, plan):
+    assert plan.categories == list(artifacts[1].categories_[0])
+
+
+@pytest.mark.parametrize('category', encoder_categories())
+def test_synthetic_rows_match(artifacts, plan, category):
+    rows = [row for row in synthetic_rows(plan, n_per_category=50) if row[plan.categorical_column] == category]
+    assert rows
+    assert_parity(plan, artifacts, rows)
+
+
+def test_test_split_matches(artifacts, plan, test_rows):
+    categories = {row[plan.categorical_column] for row in test_rows}
+    assert categories == set(plan.categories)
+    assert_parity(plan, artifacts, test_rows)
+
+
+def test_predict_matrix_matches_batch(artifacts, plan, test_rows):
+    """Пакетный путь /predict_batch: одна матрица на все строки"""
+    expected = np.array([predict_dataframe(*artifacts, row) for row in test_rows])
+    np.testing.assert_allclose(plan.predict_matrix(plan.fill_rows(test_rows)), expected, rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.skipif(not os.path.exists(os.path.join(ROOT, SERVING_BUNDLE_SPEC)),
+                    reason="serving-бандл не экспортирован (dvc repro export_serving)")
+def test_serving_bundle_matches(artifacts, plan, test_rows):
+    bundle_plan = load_serving_plan(os.path.join(ROOT, SERVING_BUNDLE_SPEC), os.path.join(ROOT, SERVING_MODEL_PATH))
+    assert bundle_plan.to_spec()['category_slots'] == plan.to_spec()['category_slots']
+    assert_parity(bundle_plan, artifacts, synthetic_rows(plan) + test_rows)
+
+
+def test_unknown_category_is_rejected(plan):
+    row = synthetic_rows(plan, n_per_category=1)[0]
+    row[plan.categorical_column] = '__unknown__'
+    with pytest.raises(InvalidInputError):
+        plan.predict_one(row)
+    with pytest.raises(InvalidInputError):
+        plan.fill_rows([row])
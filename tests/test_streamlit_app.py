@@ -0,0 +1,50 @@
+"""Smoke-тест вкладки пакетного расчёта Streamlit: загрузка файла, чтение и валидация без API."""
+import io
+import os
+from unittest import mock
+
+import pytest
+
+pytest.importorskip('streamlit')
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'streamlit_app.py')
+
+WELLS_CSV = (
+    "Heff,Perm,Sg,L_hor,GS,temp,C5,GRP,nGS\n"
+    "10,1.5,0.5,1000,VGS,80,350,5,1\n"
+    "12,2.0,0.6,800,VGS,-1,350,5,1\n"
+)
+
+
+class FakeUpload(io.BytesIO):
+    """Замена UploadedFile: AppTest не умеет загружать файлы через st.file_uploader"""
+
+    def __init__(self, name, content):
+        super().__init__(content)
+        self.name = name
+
+
+def run_batch_tab(name, content):
+    # API недоступен: клиент получает отказ в соединении и вкладка работает без списка категорий
+    with mock.patch.dict(os.environ, {'API_URL': 'http://127.0.0.1:9'}), \
+            mock.patch('streamlit.file_uploader', return_value=FakeUpload(name, content)):
+        app = AppTest.from_file(APP_PATH, default_timeout=30)
+        app.run()
+    return app
+
+
+def test_batch_upload_reads_and_validates_file():
+    app = run_batch_tab('wells.csv', WELLS_CSV.encode())
+
+    assert not app.exception
+    assert not [e.value for e in app.error if 'Не удалось прочитать файл' in e.value]
+    metrics = {m.label: m.value for m in app.metric}
+    assert metrics == {'Строк': '2', 'Валидных': '1', 'С ошибками': '1'}
+
+
+def test_batch_upload_reports_unreadable_file():
+    app = run_batch_tab('wells.xlsx', b'not an excel file')
+
+    assert not app.exception
+    assert any('Не удалось прочитать файл' in e.value for e in app.error)